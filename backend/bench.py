@@ -0,0 +1,279 @@
+"""
+Reproducible benchmark suite: micro-benchmarks per catalogue size plus
+end-to-end /recommendations and /chat/stream runs against a fake Groq.
+==========================================
+Everything runs in-process on a synthetic catalogue (synthetic.py) with
+fixed seeds — no network, no Groq key, nothing written except --output.
+
+Micro (per size): filter_colleges, score_college over the filtered rows,
+the vectorized CollegeTable.recommend, a 20 x 20 CollegeTable.sweep,
+VectorStore.build and VectorStore.query. End-to-end: rule-based and AI /recommendations through
+an in-process httpx ASGI client and /chat/stream time-to-first-event via a
+direct ASGI call, with the LLM replaced by fake_llm.FakeAsyncGroq at
+--latency seconds (+ --token-interval per streamed word).
+
+Each timing is the median and p95 over repeats (at least --min-repeat, or
+until --min-time seconds have been spent). Results are JSON; pass an
+earlier results file as --baseline and any median more than --tolerance
+slower than it fails the run (exit status 1). Medians are compared rather
+than p95/min, which are too noisy on shared machines to gate on.
+
+Usage:
+  python bench.py --output bench_results.json
+  python bench.py --sizes 1000 10000 100000 1000000 --skip-e2e
+  python bench.py --baseline bench_results.json --tolerance 0.25
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import contextlib
+import platform
+
+import httpx
+import numpy as np
+
+os.environ.setdefault("GROQ_API_KEY", "offline-bench")
+os.environ.setdefault("EXPLANATION_CACHE_PATH", "")
+os.environ.setdefault("CHAT_SESSION_PATH", "")
+
+import main
+import fake_llm
+from synthetic import generate_colleges
+
+CHAT_COLLEGE = {
+    "college_name": "IIT Bombay", "state": "Maharashtra", "city": "Mumbai", "course": "BTech",
+    "exam": "JEE", "closing_rank": 66, "average_fees": 220000, "college_type": "Government",
+    "nirf_ranking": 3, "placement_rate": 98, "matchScore": 92, "admissionChance": "Target",
+}
+
+
+def make_prefs(colleges: list, n: int, seed: int = 1) -> list:
+    """
+    Student profiles drawn around real catalogue rows: a template college's
+    exam and course, a rank near its closing rank, a budget at or above its
+    fees, and a state filter one time in four — so most profiles match.
+    """
+    rng = random.Random(seed)
+    prefs = []
+    for _ in range(n):
+        c = rng.choice(colleges)
+        prefs.append(main.StudentPreferences(
+            exam=c.exam, course=c.course,
+            rank=max(1, int(c.closing_rank * rng.uniform(0.3, 1.2))),
+            budgetMax=int(c.average_fees * rng.uniform(1.0, 2.0)),
+            state=c.state if rng.random() < 0.25 else "Any",
+        ))
+    return prefs
+
+
+def measure(fn, min_repeat: int, min_time: float) -> dict:
+    """Median / p95 / min wall time of fn() in ms."""
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < min_repeat or time.perf_counter() - started < min_time:
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+        if len(samples) >= 10000:
+            break
+    arr = np.array(samples)
+    return {
+        "median_ms": round(float(np.median(arr)), 4),
+        "p95_ms": round(float(np.percentile(arr, 95)), 4),
+        "min_ms": round(float(arr.min()), 4),
+        "repeats": len(samples),
+    }
+
+
+def micro(n: int, n_queries: int, min_repeat: int, min_time: float) -> dict:
+    colleges = generate_colleges(n)
+    prefs = make_prefs(colleges, n_queries)
+    table = main.CollegeTable(colleges)
+    p0 = main.StudentPreferences(exam="JEE", course="BTech", rank=20000, budgetMax=500000)
+    filtered = main.filter_colleges(colleges, p0)
+    queries = [
+        f"Student with rank {p.rank} looking for {p.course} via {p.exam} in {p.state}, "
+        f"budget ₹{p.budgetMax:,}, considering {colleges[i].college_name}"
+        for i, p in enumerate(prefs)
+    ]
+
+    sweep_ranks = np.linspace(1000, 60000, 20).astype(int).tolist()
+    sweep_budgets = np.linspace(100000, 2000000, 20).astype(int).tolist()
+
+    store = main.VectorStore(query_cache_size=0)
+    out = {
+        "filter_colleges": measure(lambda: main.filter_colleges(colleges, p0), min_repeat, min_time),
+        "score_college": measure(lambda: [main.score_college(c, p0) for c in filtered], min_repeat, min_time),
+        "table_recommend": measure(lambda: [table.recommend(p, k=10) for p in prefs], min_repeat, min_time),
+        # One profile's 20 x 20 rank/budget grid, as a slider-driven UI requests it
+        "table_sweep": measure(lambda: table.sweep(p0, sweep_ranks, sweep_budgets, k=10), min_repeat, min_time),
+        # Builds take seconds at 1M rows: 3 repeats up to 100k, then one
+        "vector_store_build": measure(lambda: store.build(colleges), 3 if n <= 100000 else 1, 0.0),
+    }
+    out["vector_store_query"] = measure(lambda: [store.query(q, k=3) for q in queries], min_repeat, min_time)
+    out["table_recommend"]["per_query_ms"] = round(out["table_recommend"]["median_ms"] / len(prefs), 4)
+    out["vector_store_query"]["per_query_ms"] = round(out["vector_store_query"]["median_ms"] / len(queries), 4)
+    out["filtered_rows"] = len(filtered)
+    return out
+
+
+def _percentiles(values: list) -> dict:
+    arr = np.array(values) * 1000
+    return {"median_ms": round(float(np.median(arr)), 3), "p95_ms": round(float(np.percentile(arr, 95)), 3)}
+
+
+async def stream_timings(path: str, payload: dict) -> tuple:
+    """
+    POST straight into the ASGI app and time the first SSE data event and the
+    end of the body (test clients buffer the whole body, hiding the former).
+    """
+    body = json.dumps(payload).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    sent = False
+    finished = asyncio.Event()
+    first_at = None
+    t0 = time.perf_counter()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal first_at
+        if message["type"] == "http.response.body":
+            if first_at is None and message.get("body", b"").startswith(b"data: "):
+                first_at = time.perf_counter() - t0
+            if not message.get("more_body", False):
+                finished.set()
+
+    await main.app(scope, receive, send)
+    return first_at or 0.0, time.perf_counter() - t0
+
+
+async def end_to_end(n_requests: int, size: int, latency: float, token_interval: float) -> dict:
+    main.async_client = fake_llm.FakeAsyncGroq(latency, seed=0, token_interval=token_interval)
+    # No explanation/response caching between requests: every request does the full work
+    main.explanation_cache = main.ExplanationCache(None, main.EXPLANATION_CACHE_SIZE, 0)
+    main.response_cache = main.ResponseCache(0)
+    with contextlib.redirect_stdout(sys.stderr):  # keep stdout pure JSON
+        await main.startup()
+    if size:
+        colleges = generate_colleges(size)
+        store = main.new_vector_store()
+        store.build(colleges)
+        main._publish(main.CollegeTable(colleges), store, time.time())
+    colleges = main.catalogue.table.colleges
+    out = {"catalogue_size": len(colleges)}
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, use_ai in (("recommendations_rule", False), ("recommendations_ai", True)):
+            latencies, matched = [], 0
+            for p in make_prefs(colleges, n_requests, seed=2):
+                t0 = time.perf_counter()
+                r = await client.post("/recommendations", json=dict(p.model_dump(), useAI=use_ai))
+                latencies.append(time.perf_counter() - t0)
+                r.raise_for_status()
+                matched += bool(r.json()["total_filtered"])
+            out[name] = dict(_percentiles(latencies), matched_requests=matched)
+
+    first, total = [], []
+    for i in range(n_requests):
+        payload = {"college": CHAT_COLLEGE, "system_prompt": "You are an expert Indian college admission counselor.",
+                   "user_message": f"Question {i}"}
+        first_at, done_at = await stream_timings("/chat/stream", payload)
+        first.append(first_at)
+        total.append(done_at)
+    out["chat_stream_first_event"] = _percentiles(first)
+    out["chat_stream_total"] = _percentiles(total)
+    return out
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        else:
+            flat[path] = value
+    return flat
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    """Median timings slower than baseline * (1 + tolerance)."""
+    current, previous = flatten(results), flatten(baseline)
+    out = []
+    for key, before in previous.items():
+        after = current.get(key)
+        if not key.endswith("median_ms") or after is None or not before:
+            continue
+        if after > before * (1 + tolerance):
+            out.append({"metric": key, "baseline": before, "current": after,
+                        "change": f"+{(after / before - 1) * 100:.0f}%"})
+    return out
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=100, help="student profiles / RAG queries per size")
+    parser.add_argument("--requests", type=int, default=50, help="end-to-end requests per endpoint")
+    parser.add_argument("--e2e-size", type=int, default=0, help="synthetic catalogue for e2e (0 = built-in)")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake Groq latency (s)")
+    parser.add_argument("--token-interval", type=float, default=0.001, help="fake Groq seconds per streamed word")
+    parser.add_argument("--min-repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds spent per micro-benchmark")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-e2e", action="store_true")
+    parser.add_argument("--output", default=None, help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", default=None, help="earlier results JSON to check against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs --baseline")
+    args = parser.parse_args()
+
+    results = {
+        "environment": {
+            "python": platform.python_version(), "numpy": np.__version__,
+            "machine": platform.machine(), "cpus": os.cpu_count(),
+            "explanation_mode": main.EXPLANATION_MODE, "vector_index": main.VECTOR_INDEX,
+        },
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+    }
+    if not args.skip_micro:
+        results["micro"] = {str(n): micro(n, args.queries, args.min_repeat, args.min_time) for n in args.sizes}
+    if not args.skip_e2e:
+        results["e2e"] = asyncio.run(end_to_end(args.requests, args.e2e_size, args.latency, args.token_interval))
+
+    failed = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            failed = regressions(results, json.load(f), args.tolerance)
+        results["regressions"] = failed
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    for r in failed:
+        print(f"REGRESSION {r['metric']}: {r['baseline']} -> {r['current']} ms ({r['change']})", file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main_cli()
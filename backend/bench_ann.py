@@ -0,0 +1,87 @@
+"""
+Recall@k report for the IVF index against the exact scan.
+==========================================
+Builds one vector store per synthetic catalogue size, then for each
+(nlist, nprobe) setting reports build time, mean query latency and recall@k
+relative to the exact top-k, so settings can be picked per catalogue size.
+
+Usage:
+  python bench_ann.py --sizes 10000 100000 --nprobe 1 4 8 16 32 --k 3
+"""
+
+import os
+import time
+import random
+import argparse
+
+import numpy as np
+
+os.environ.setdefault("GROQ_API_KEY", "offline-bench")
+os.environ.setdefault("EXPLANATION_CACHE_PATH", "")
+
+from main import VectorStore, IVFIndex
+from synthetic import generate_colleges
+
+STATES = ["Any", "Delhi", "Maharashtra", "Tamil Nadu", "Karnataka", "Uttar Pradesh"]
+
+
+def make_queries(colleges, n: int, seed: int = 1):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n):
+        c = rng.choice(colleges)
+        queries.append(
+            f"Student with rank {rng.randint(1, 60000)} looking for {c.course} via {c.exam} "
+            f"in {rng.choice(STATES)}, budget ₹{rng.randint(1, 40) * 50000:,}, considering {c.college_name}"
+        )
+    return queries
+
+
+def timed_queries(store: VectorStore, queries, k: int):
+    results = []
+    t0 = time.perf_counter()
+    for q in queries:
+        idx, _ = store.query_many([q], k)
+        results.append(idx[0])
+    return results, (time.perf_counter() - t0) / len(queries) * 1000
+
+
+def report(n: int, nlists, nprobes, k: int, n_queries: int):
+    colleges = generate_colleges(n)
+    queries = make_queries(colleges, n_queries)
+
+    exact = VectorStore(query_cache_size=0)
+    exact.build(colleges)
+    truth, exact_ms = timed_queries(exact, queries, k)
+    print({"colleges": n, "index": "exact", "query_ms": round(exact_ms, 3)})
+
+    for nlist in nlists:
+        index = IVFIndex(nlist=nlist or None)
+        t0 = time.perf_counter()
+        index.build(exact.embeddings)
+        build_s = time.perf_counter() - t0
+        store = VectorStore(query_cache_size=0, index=index)
+        store.colleges, store.vocab, store.idf, store.embeddings = (
+            exact.colleges, exact.vocab, exact.idf, exact.embeddings
+        )
+        for nprobe in nprobes:
+            index.nprobe = nprobe
+            found, ms = timed_queries(store, queries, k)
+            recall = np.mean([len(set(a.tolist()) & set(b.tolist())) / k for a, b in zip(found, truth)])
+            print({
+                "colleges": n, "index": "ivf", "nlist": len(index.centroids), "nprobe": nprobe,
+                "build_s": round(build_s, 2), "query_ms": round(ms, 3),
+                f"recall@{k}": round(float(recall), 4), "speedup": round(exact_ms / ms, 1),
+            })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--nlist", type=int, nargs="+", default=[0], help="0 = ~sqrt(N)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    for n in args.sizes:
+        report(n, args.nlist, args.nprobe, args.k, args.queries)
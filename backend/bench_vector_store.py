@@ -0,0 +1,76 @@
+"""
+VectorStore build/query report at several synthetic corpus sizes.
+==========================================
+For each size and mode (vocabulary / hashing) reports build time, peak
+allocation during build, resident set size, sparse embedding bytes next to
+what the old dense float64 matrix would have needed, and mean query latency.
+
+Usage:
+  python bench_vector_store.py --sizes 1000 10000 100000
+"""
+
+import os
+import time
+import argparse
+import tracemalloc
+
+os.environ.setdefault("GROQ_API_KEY", "offline-bench")
+os.environ.setdefault("EXPLANATION_CACHE_PATH", "")
+
+from main import VectorStore
+from synthetic import generate_colleges
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def report(n: int, hashing: bool, n_queries: int = 200) -> dict:
+    colleges = generate_colleges(n)
+
+    store = VectorStore(hashing=hashing)
+    t0 = time.perf_counter()
+    store.build(colleges)
+    build_s = time.perf_counter() - t0
+
+    tracemalloc.start()
+    VectorStore(hashing=hashing).build(colleges)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    queries = [
+        f"Student with rank {c.closing_rank} looking for {c.course} via {c.exam} "
+        f"in {c.state}, budget ₹{c.average_fees:,}, considering {c.college_name}"
+        for c in colleges[:n_queries]
+    ]
+    t0 = time.perf_counter()
+    for q in queries:
+        store.query(q, k=3)
+    query_ms = (time.perf_counter() - t0) / len(queries) * 1000
+
+    emb = store.embeddings
+    return {
+        "colleges": n,
+        "mode": "hashing" if hashing else "vocab",
+        "features": emb.shape[1],
+        "nnz": emb.nnz,
+        "build_s": round(build_s, 3),
+        "build_peak_alloc_mb": round(peak / 2 ** 20, 1),
+        "rss_mb": round(rss_mb(), 1),
+        "sparse_mb": round(emb.nbytes / 2 ** 20, 2),
+        "dense_f64_mb": round(emb.shape[0] * emb.shape[1] * 8 / 2 ** 20, 1),
+        "query_ms": round(query_ms, 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+    for n in args.sizes:
+        for hashing in (False, True):
+            print(report(n, hashing))
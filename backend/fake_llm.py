@@ -0,0 +1,124 @@
+"""
+Deterministic stand-ins for the Groq clients, used for offline load testing.
+==========================================
+Latency is configurable: every call sleeps `latency` seconds, and a
+`tail_ratio` fraction of calls sleeps `tail_latency` instead, which is what
+makes deadline/fallback behaviour visible in p95/p99 numbers.
+
+Usage:
+  import main, fake_llm
+  main.async_client = fake_llm.FakeAsyncGroq(latency=0.3)
+
+For an out-of-process stand-in (real HTTP, streaming) see fake_llm_server.py.
+"""
+
+import re
+import json
+import time
+import random
+import asyncio
+from types import SimpleNamespace
+from typing import Optional
+
+FAKE_REPLY = (
+    "This college is a strong fit for your rank and budget, with a solid "
+    "placement record and a good national standing."
+)
+
+
+def fake_content(messages: list, response_format: Optional[dict] = None) -> str:
+    """Reply text for a request: FAKE_REPLY, or a JSON object for JSON-mode batched prompts."""
+    if response_format and response_format.get("type") == "json_object":
+        # Batched explanation prompts list colleges as "[id N]"
+        ids = re.findall(r"\[id (\d+)\]", messages[-1].get("content", ""))
+        return json.dumps({"explanations": {i: FAKE_REPLY for i in ids}})
+    return FAKE_REPLY
+
+
+def fake_tokens(n: int) -> list:
+    """`n` streamed pieces, one word each, cycling through FAKE_REPLY."""
+    words = FAKE_REPLY.split(" ")
+    return [words[i % len(words)] + " " for i in range(n)]
+
+
+def _fake_response(messages: list, response_format: Optional[dict] = None) -> SimpleNamespace:
+    prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+    content = fake_content(messages, response_format)
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=len(content) // 4,
+            total_tokens=prompt_tokens + len(content) // 4,
+        ),
+    )
+
+
+class _FakeAsyncStream:
+    """Async iterator of `chat.completion.chunk`-shaped deltas, with `close()` like the SDK stream."""
+
+    def __init__(self, first_delay: float, token_interval: float, tokens: int):
+        self._first_delay = first_delay
+        self._token_interval = token_interval
+        self._pieces = fake_tokens(tokens)
+        self.closed = False
+
+    async def __aiter__(self):
+        await asyncio.sleep(self._first_delay)
+        for i, piece in enumerate(self._pieces):
+            if self.closed:
+                return
+            if i:
+                await asyncio.sleep(self._token_interval)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+    async def close(self):
+        self.closed = True
+
+
+class _LatencyModel:
+    def __init__(self, latency: float, tail_latency: Optional[float], tail_ratio: float, seed: int):
+        self.latency = latency
+        self.tail_latency = tail_latency if tail_latency is not None else latency
+        self.tail_ratio = tail_ratio
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    def next_delay(self) -> float:
+        self.calls += 1
+        return self.tail_latency if self._rng.random() < self.tail_ratio else self.latency
+
+
+class FakeGroq:
+    """Blocking fake with the `client.chat.completions.create` shape."""
+
+    def __init__(self, latency: float = 0.5, tail_latency: Optional[float] = None,
+                 tail_ratio: float = 0.0, seed: int = 0):
+        self.model = _LatencyModel(latency, tail_latency, tail_ratio, seed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, messages: list, response_format: Optional[dict] = None, **kwargs) -> SimpleNamespace:
+        time.sleep(self.model.next_delay())
+        return _fake_response(messages, response_format)
+
+
+class FakeAsyncGroq:
+    """
+    Async fake with the `AsyncGroq.chat.completions.create` shape. With
+    stream=True the first delta arrives after the sampled latency and then
+    one word every `token_interval` seconds, `stream_tokens` words in all.
+    """
+
+    def __init__(self, latency: float = 0.5, tail_latency: Optional[float] = None,
+                 tail_ratio: float = 0.0, seed: int = 0, token_interval: float = 0.0, stream_tokens: int = 50):
+        self.model = _LatencyModel(latency, tail_latency, tail_ratio, seed)
+        self.token_interval = token_interval
+        self.stream_tokens = stream_tokens
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, messages: list, response_format: Optional[dict] = None, stream: bool = False,
+                      **kwargs):
+        if stream:
+            return _FakeAsyncStream(self.model.next_delay(), self.token_interval, self.stream_tokens)
+        await asyncio.sleep(self.model.next_delay())
+        return _fake_response(messages, response_format)
@@ -0,0 +1,106 @@
+"""
+Local fake of the Groq chat completions API, for offline load testing.
+==========================================
+Serves POST /openai/v1/chat/completions (the path the Groq SDK calls), both
+plain and streaming. Streams send OpenAI-style `chat.completion.chunk` SSE
+events: the first after `--latency` seconds, then one word every
+`--token-interval` seconds. GET /stats reports how many streams finished
+and how many were abandoned by the caller, which is how upstream
+cancellation on client disconnect can be checked.
+
+Usage:
+  python fake_llm_server.py --port 9000 --latency 0.3 --token-interval 0.02 --tokens 200
+  GROQ_BASE_URL=http://127.0.0.1:9000 GROQ_API_KEY=offline uvicorn main:app --port 8000
+  python loadtest.py --chat --url http://127.0.0.1:8000 --requests 2000 --concurrency 2000
+"""
+
+import json
+import time
+import uuid
+import asyncio
+import argparse
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from fake_llm import fake_content, fake_tokens
+
+app = FastAPI(title="Fake Groq")
+settings = {"latency": 0.3, "token_interval": 0.02, "tokens": 200}
+stats = {"requests": 0, "streams_started": 0, "streams_completed": 0, "streams_cancelled": 0, "streams_open": 0}
+
+
+def _chunk(completion_id: str, model: str, delta: dict, finish_reason=None) -> str:
+    return "data: " + json.dumps({
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }) + "\n\n"
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    messages = body.get("messages", [])
+    model = body.get("model", "fake")
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+
+    if not body.get("stream"):
+        await asyncio.sleep(settings["latency"])
+        content = fake_content(messages, body.get("response_format"))
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4,
+            },
+        }
+
+    async def stream():
+        stats["streams_started"] += 1
+        stats["streams_open"] += 1
+        try:
+            await asyncio.sleep(settings["latency"])
+            yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+            for i, piece in enumerate(fake_tokens(settings["tokens"])):
+                if i:
+                    await asyncio.sleep(settings["token_interval"])
+                yield _chunk(completion_id, model, {"content": piece})
+            yield _chunk(completion_id, model, {}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+            stats["streams_completed"] += 1
+        except asyncio.CancelledError:
+            stats["streams_cancelled"] += 1
+            raise
+        finally:
+            stats["streams_open"] -= 1
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+def get_stats():
+    return stats
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first token / full reply")
+    parser.add_argument("--token-interval", type=float, default=0.02, help="seconds between streamed words")
+    parser.add_argument("--tokens", type=int, default=200, help="words per streamed reply")
+    args = parser.parse_args()
+    settings.update(latency=args.latency, token_interval=args.token_interval, tokens=args.tokens)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,209 @@
+"""
+Offline load test for POST /recommendations and /chat/stream against a stubbed LLM.
+==========================================
+Drives the ASGI app in-process (no network, no Groq key) and reports
+requests/second and latency percentiles. With --chat it opens concurrent
+/chat/stream sessions instead and reports time-to-first-event and stream
+duration; point --url at a running server (with GROQ_BASE_URL aimed at
+fake_llm_server.py) to measure real streaming behaviour.
+
+Usage:
+  python loadtest.py --requests 200 --concurrency 50 --latency 0.4 \
+      --tail-latency 5 --tail-ratio 0.05 --deadline 1.5
+
+  # per-college vs batched explanations, token usage side by side
+  python loadtest.py --explanation-mode both --distinct
+
+  # 2000 concurrent chat streams against a live server, half abandoned early
+  python loadtest.py --chat --url http://127.0.0.1:8000 --requests 2000 \
+      --concurrency 2000 --disconnect-after 5
+"""
+
+import os
+import time
+import asyncio
+import argparse
+from typing import Optional
+
+import httpx
+import numpy as np
+
+# Offline run: the real Groq client is never called, and nothing touches disk.
+os.environ.setdefault("GROQ_API_KEY", "offline-loadtest")
+os.environ.setdefault("EXPLANATION_CACHE_PATH", "")
+
+import main
+import fake_llm
+
+DEFAULT_PAYLOAD = {
+    "exam": "JEE", "rank": 5000, "budgetMax": 300000,
+    "state": "Any", "course": "BTech", "collegeType": "Any", "useAI": True,
+}
+
+
+async def run(n_requests: int, concurrency: int, payload: dict, distinct: bool = False) -> dict:
+    transport = httpx.ASGITransport(app=main.app)
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as http:
+        async def one(i: int):
+            body = dict(payload, rank=payload["rank"] + i) if distinct else payload
+            async with sem:
+                t0 = time.perf_counter()
+                r = await http.post("/recommendations", json=body)
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - t0)
+
+        t_start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(n_requests)))
+        elapsed = time.perf_counter() - t_start
+
+    lat = np.array(latencies) * 1000
+    return {
+        "requests": n_requests,
+        "concurrency": concurrency,
+        "rps": round(n_requests / elapsed, 1),
+        "p50_ms": round(float(np.percentile(lat, 50)), 1),
+        "p95_ms": round(float(np.percentile(lat, 95)), 1),
+        "p99_ms": round(float(np.percentile(lat, 99)), 1),
+        "max_ms": round(float(lat.max()), 1),
+    }
+
+
+CHAT_PAYLOAD = {
+    "college": {
+        "college_name": "IIT Bombay", "state": "Maharashtra", "city": "Mumbai", "course": "BTech",
+        "exam": "JEE", "closing_rank": 66, "average_fees": 220000, "college_type": "Government",
+        "nirf_ranking": 3, "placement_rate": 98, "matchScore": 92, "admissionChance": "Target",
+    },
+    "student_rank": 60, "student_budget": 300000,
+    "system_prompt": "You are an expert Indian college admission counselor.",
+    "user_message": "Is this college a good fit for me?",
+}
+
+
+def _percentiles(values: list, prefix: str) -> dict:
+    arr = np.array(values) * 1000 if values else np.zeros(1)
+    return {f"{prefix}_p{p}_ms": round(float(np.percentile(arr, p)), 1) for p in (50, 95, 99)}
+
+
+async def run_chat(n_streams: int, concurrency: int, url: Optional[str], disconnect_after: int) -> dict:
+    """Open `n_streams` chat streams; abandon every other one after `disconnect_after` events (0 = never)."""
+    transport = None if url else httpx.ASGITransport(app=main.app)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    first_event, durations, events, heartbeats, errors = [], [], [], [0], [0]
+    sem = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url=url or "http://loadtest",
+                                 limits=limits, timeout=None) as http:
+        async def one(i: int):
+            abandon = disconnect_after and i % 2 == 0
+            async with sem:
+                t0 = time.perf_counter()
+                count = 0
+                try:
+                    async with http.stream("POST", "/chat/stream", json=CHAT_PAYLOAD) as r:
+                        r.raise_for_status()
+                        async for line in r.aiter_lines():
+                            if line.startswith(":"):
+                                heartbeats[0] += 1
+                                continue
+                            if not line.startswith("data: "):
+                                continue
+                            if count == 0:
+                                first_event.append(time.perf_counter() - t0)
+                            if line == "data: [DONE]":
+                                break
+                            count += 1
+                            if abandon and count >= disconnect_after:
+                                break
+                except httpx.HTTPError:
+                    errors[0] += 1
+                    return
+                durations.append(time.perf_counter() - t0)
+                events.append(count)
+
+        t_start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(n_streams)))
+        elapsed = time.perf_counter() - t_start
+
+    return {
+        "streams": n_streams,
+        "concurrency": concurrency,
+        "errors": errors[0],
+        "elapsed_s": round(elapsed, 2),
+        **_percentiles(first_event, "first_event"),
+        **_percentiles(durations, "duration"),
+        "mean_events_per_stream": round(float(np.mean(events)), 1) if events else 0.0,
+        "heartbeats": heartbeats[0],
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.4, help="stub LLM latency (s)")
+    parser.add_argument("--tail-latency", type=float, default=None, help="latency of slow calls (s)")
+    parser.add_argument("--tail-ratio", type=float, default=0.0, help="fraction of slow calls")
+    parser.add_argument("--deadline", type=float, default=None, help="override LLM_DEADLINE_SECONDS")
+    parser.add_argument("--llm-concurrency", type=int, default=None, help="override LLM_MAX_CONCURRENCY")
+    parser.add_argument("--no-ai", action="store_true", help="benchmark the rule-based path only")
+    parser.add_argument("--cache", action="store_true", help="keep the (in-memory) explanation cache enabled")
+    parser.add_argument("--explanation-mode", choices=["per_college", "batched", "both"], default=None,
+                        help="override EXPLANATION_MODE; 'both' runs each and reports them side by side")
+    parser.add_argument("--llm-rpm", type=int, default=None, help="override LLM_REQUESTS_PER_MINUTE")
+    parser.add_argument("--llm-tpm", type=int, default=None, help="override LLM_TOKENS_PER_MINUTE")
+    parser.add_argument("--chat", action="store_true", help="load-test /chat/stream instead of /recommendations")
+    parser.add_argument("--url", default=None, help="target a running server instead of the in-process app")
+    parser.add_argument("--disconnect-after", type=int, default=0,
+                        help="with --chat, abandon every other stream after this many events")
+    parser.add_argument("--token-interval", type=float, default=0.02, help="stub LLM seconds per streamed word")
+    parser.add_argument("--distinct", action="store_true",
+                        help="vary the rank per request so prompts are not cached or coalesced")
+    args = parser.parse_args()
+
+    main.async_client = fake_llm.FakeAsyncGroq(args.latency, args.tail_latency, args.tail_ratio,
+                                               token_interval=args.token_interval)
+    if args.deadline is not None:
+        main.LLM_DEADLINE_SECONDS = args.deadline
+    if args.llm_concurrency is not None:
+        main.LLM_MAX_CONCURRENCY = args.llm_concurrency
+    if args.chat:
+        print(asyncio.run(run_chat(args.requests, args.concurrency, args.url, args.disconnect_after)))
+        return
+    main.catalogue.store.build(main.COLLEGES_RAW)
+
+    payload = dict(DEFAULT_PAYLOAD, useAI=not args.no_ai)
+    modes = [args.explanation_mode] if args.explanation_mode in ("per_college", "batched") else [main.EXPLANATION_MODE]
+    if args.explanation_mode == "both":
+        modes = ["per_college", "batched"]
+    for mode in modes:
+        main.EXPLANATION_MODE = mode
+        main.llm_usage = main.LLMUsage()
+        main.llm_scheduler = main.LLMScheduler(
+            main.LLM_REQUESTS_PER_MINUTE if args.llm_rpm is None else args.llm_rpm,
+            main.LLM_TOKENS_PER_MINUTE if args.llm_tpm is None else args.llm_tpm,
+            main.LLM_QUEUE_DEPTH,
+        )
+        main.explanation_cache = main.ExplanationCache(
+            None, main.EXPLANATION_CACHE_SIZE, main.EXPLANATION_CACHE_TTL_SECONDS if args.cache else 0
+        )
+        result = asyncio.run(run(args.requests, args.concurrency, payload, args.distinct))
+        usage = main.llm_usage.stats()
+        calls = sum(u["calls"] for u in usage.values())
+        tokens = sum(u["prompt_tokens"] + u["completion_tokens"] for u in usage.values())
+        print({
+            "explanation_mode": mode, **result,
+            "llm_calls": calls,
+            "prompt_tokens": sum(u["prompt_tokens"] for u in usage.values()),
+            "completion_tokens": sum(u["completion_tokens"] for u in usage.values()),
+            "tokens_per_request": round(tokens / args.requests, 1),
+            "llm_mean_latency_ms": round(sum(u["seconds"] for u in usage.values()) / calls * 1000, 1) if calls else 0.0,
+            "llm_shed": main.llm_scheduler.stats()["shed"],
+        })
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -15,18 +15,51 @@ Setup:
 """
 
 import os
+import io
+import csv
 import math
 import json
-from typing import List, Optional
-from dataclasses import dataclass, field
+import time
+import zlib
+import copy
+import bisect
+import shutil
+import hashlib
+import hmac
+import contextvars
+import functools
+import sqlite3
+import tempfile
+import asyncio
+import threading
+import weakref
+import multiprocessing
+import concurrent.futures
+from array import array
+from collections import OrderedDict, deque
+from collections.abc import Mapping, Sequence
+from typing import Annotated, AsyncIterator, Awaitable, Callable, Iterator, List, Optional
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from dataclasses import dataclass, field, replace
 from dotenv import load_dotenv
 
+import httpx
 import numpy as np
-from groq import Groq
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
+from groq import APITimeoutError, AsyncGroq, Groq
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, run a single worker
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:  # stdlib encoder instead: same bytes, slower
+    orjson = None
 
 load_dotenv()
 
@@ -41,7 +74,121 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Async Groq calls share one pooled keep-alive HTTP client. GROQ_BASE_URL
+# (read by the SDK) can point both clients at fake_llm_server.py offline.
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "2000"))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "200"))
+
 client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+async_client = AsyncGroq(
+    api_key=os.getenv("GROQ_API_KEY"),
+    http_client=httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=30.0,
+        ),
+        timeout=httpx.Timeout(60.0, connect=5.0),
+    ),
+)
+
+# Chat streams: SSE comment sent after this many idle seconds so proxies keep
+# the connection open, and deltas are buffered into one write until this many
+# characters or milliseconds have accumulated.
+CHAT_HEARTBEAT_SECONDS = float(os.getenv("CHAT_HEARTBEAT_SECONDS", "15"))
+CHAT_COALESCE_CHARS = int(os.getenv("CHAT_COALESCE_CHARS", "24"))
+CHAT_COALESCE_MS = float(os.getenv("CHAT_COALESCE_MS", "40"))
+
+# Chat sessions: conversation history lives on the server (in-memory LRU,
+# optionally backed by SQLite) and expires after CHAT_SESSION_TTL_SECONDS idle.
+# Turns that no longer fit CHAT_CONTEXT_TOKENS are folded into a short summary.
+CHAT_SESSION_PATH = os.getenv("CHAT_SESSION_PATH", "")
+CHAT_SESSION_MAX = int(os.getenv("CHAT_SESSION_MAX", "1000"))
+CHAT_SESSION_TTL_SECONDS = float(os.getenv("CHAT_SESSION_TTL_SECONDS", str(24 * 3600)))
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "2000"))
+
+# Explanation fan-out: max concurrent Groq calls per request, and the latency
+# budget after which unfinished explanations fall back to the rule-based text.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "5"))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "6.0"))
+
+# LLM scheduler: every Groq call reserves a request and an estimated token
+# count from per-minute token buckets (0 = unlimited; set these to your Groq
+# plan limits). Chat is served before explanations; at most LLM_QUEUE_DEPTH
+# calls of each kind wait, and explanations beyond that use the rule-based text.
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+LLM_QUEUE_DEPTH = int(os.getenv("LLM_QUEUE_DEPTH", "100"))
+
+# Explanation mode: "per_college" sends one Groq prompt per shortlisted college;
+# "batched" sends the whole shortlist in one prompt and parses a JSON reply.
+EXPLANATION_MODE = os.getenv("EXPLANATION_MODE", "per_college")
+
+# Explanation cache: in-memory LRU in front of a SQLite file shared by workers.
+# Set EXPLANATION_CACHE_PATH to a file to enable the SQLite level; by default
+# the cache is in memory only and nothing is written next to the code.
+EXPLANATION_CACHE_PATH = os.getenv("EXPLANATION_CACHE_PATH", "")
+EXPLANATION_CACHE_SIZE = int(os.getenv("EXPLANATION_CACHE_SIZE", "10000"))
+EXPLANATION_CACHE_TTL_SECONDS = float(os.getenv("EXPLANATION_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Vector store: set VECTOR_STORE_HASHING=1 to use the vocabulary-free hashing
+# vectorizer with VECTOR_STORE_FEATURES buckets.
+VECTOR_STORE_HASHING = os.getenv("VECTOR_STORE_HASHING", "0") == "1"
+VECTOR_STORE_FEATURES = int(os.getenv("VECTOR_STORE_FEATURES", str(2 ** 18)))
+# Retrieval index: "exact" scan or "ivf" approximate search (NLIST 0 = ~sqrt(N)).
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "exact")
+VECTOR_INDEX_NLIST = int(os.getenv("VECTOR_INDEX_NLIST", "0"))
+VECTOR_INDEX_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", "8"))
+# Relative IDF drift tolerated on incremental catalogue updates before the
+# stored embeddings are re-weighted (0 = always re-weight).
+VECTOR_STORE_REWEIGHT_TOLERANCE = float(os.getenv("VECTOR_STORE_REWEIGHT_TOLERANCE", "0.01"))
+
+# Catalogue source: a .csv / .jsonl file with College columns (default: the
+# built-in COLLEGES_RAW). Its parsed columns, embeddings and index are
+# published once to SNAPSHOT_DIR and memory-mapped read-only by every worker
+# (put it on /dev/shm to keep it in RAM). Workers check the published version
+# every CATALOGUE_SYNC_SECONDS and swap to it.
+COLLEGES_PATH = os.getenv("COLLEGES_PATH", "")
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", f"{COLLEGES_PATH}.snapshot" if COLLEGES_PATH else "")
+CATALOGUE_SYNC_SECONDS = float(os.getenv("CATALOGUE_SYNC_SECONDS", "1"))
+# Hot reload: poll COLLEGES_PATH for changes every N seconds (0 = off), and
+# the token required by POST /admin/catalogue (unset = endpoint disabled).
+CATALOGUE_WATCH_SECONDS = float(os.getenv("CATALOGUE_WATCH_SECONDS", "0"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Cut-off history: a .csv / .jsonl of (college_id, year, round, closing_rank)
+# rows. Each college's closing rank for the target round is projected from it
+# (weighted trend over years) and used in place of closing_rank for
+# filtering, scoring and Safe/Target/Dream. Rows appended to the file are
+# picked up every CUTOFF_WATCH_SECONDS (0 = read once at startup).
+CUTOFF_HISTORY_PATH = os.getenv("CUTOFF_HISTORY_PATH", "")
+CUTOFF_WATCH_SECONDS = float(os.getenv("CUTOFF_WATCH_SECONDS", "0"))
+# Round projected for the latest year in the history (0 = its latest round
+# with data), how fast older years lose weight, and the fewest years a trend
+# is fitted on (fewer = weighted mean, no slope).
+CUTOFF_TARGET_ROUND = int(os.getenv("CUTOFF_TARGET_ROUND", "0"))
+CUTOFF_HALF_LIFE_YEARS = float(os.getenv("CUTOFF_HALF_LIFE_YEARS", "2"))
+CUTOFF_MIN_TREND_YEARS = int(os.getenv("CUTOFF_MIN_TREND_YEARS", "3"))
+
+# Whole-response cache for deterministic responses (useAI=false), bounded by
+# the total size of the cached bodies. 0 disables it.
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 2 ** 20)))
+
+# Metrics: per-stage histograms served on /metrics (Prometheus text format).
+# With METRICS_ENABLED=0 nothing is recorded and /metrics returns 404; the
+# Server-Timing header is still sent.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# Cohort batches: students scored per block, worker processes for scoring
+# (0 = in-process thread), and students being explained / Groq calls in
+# flight across all batches when explanations are requested.
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "1000"))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "0"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "2"))
+
+# What-if sweeps: largest ranks x budgets grid one /recommendations/sweep call
+# may evaluate (each scenario is a full pass over the profile's candidates).
+SWEEP_MAX_SCENARIOS = int(os.getenv("SWEEP_MAX_SCENARIOS", "2500"))
 
 # ---------------------------------------------------------------------------
 # Data Layer — mirrors frontend/src/data/colleges.ts
@@ -62,6 +209,22 @@ class College:
     placement_rate: int
     # Vector embedding computed at startup
     embedding: List[float] = field(default_factory=list)
+    # Closing rank projected for the current round (cut-off history), set on
+    # ranked results when it differs from closing_rank
+    projected_closing_rank: Optional[int] = None
+
+
+def closing_rank_text(c) -> str:
+    """
+    The closing rank the chance label was computed against, for prompts and
+    explanations: the projected one (with the listed one alongside) if any.
+    `c` is a College or a dict of College fields.
+    """
+    get = c.get if isinstance(c, dict) else lambda name: getattr(c, name)
+    projected = get("projected_closing_rank")
+    if projected is None:
+        return f"{get('closing_rank'):,}"
+    return f"{projected:,} (projected for this round; last listed {get('closing_rank'):,})"
 
 
 COLLEGES_RAW: List[College] = [
@@ -190,67 +353,517 @@ def build_college_text(c: College) -> str:
     )
 
 
-def simple_tfidf_embed(text: str, vocab: dict, idf: np.ndarray) -> np.ndarray:
-    """Lightweight TF-IDF based embedding (no external model needed)."""
-    words = text.lower().split()
-    tf = {}
-    for w in words:
-        tf[w] = tf.get(w, 0) + 1
-    vec = np.zeros(len(vocab))
-    for w, count in tf.items():
-        if w in vocab:
-            vec[vocab[w]] = (count / len(words)) * idf[vocab[w]]
-    norm = np.linalg.norm(vec)
-    return vec / norm if norm > 0 else vec
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the k largest scores, descending, ties broken by position
+    (same order as a stable sort). argpartition finds the k-th value in O(n),
+    so only the k winners get sorted.
+    """
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    if n > k:
+        kth = scores[np.argpartition(scores, n - k)[n - k]]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[: k - len(above)]
+        candidates = np.concatenate([above, ties])
+    else:
+        candidates = np.arange(n)
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+def _row_positions(indptr: np.ndarray, row_ids: np.ndarray) -> tuple:
+    """Flat positions of every stored value in the given CSR rows, plus per-row lengths."""
+    starts = indptr[row_ids]
+    lengths = indptr[row_ids + 1] - starts
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts - offsets, lengths) + np.arange(lengths.sum()), lengths
+
+
+def _hash_token(word: str, n_features: int) -> int:
+    """Stable (process-independent) feature index for the hashing vectorizer."""
+    return zlib.crc32(word.encode("utf-8")) % n_features
+
+
+class CSRMatrix:
+    """
+    Minimal compressed-sparse-row matrix (NumPy only) — just what the vector
+    store needs: row-wise storage and a sparse matrix-vector product.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, shape: tuple,
+                 rows: Optional[np.ndarray] = None):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.shape = shape
+        # Row id of every stored value, so products reduce with one bincount.
+        if rows is None:
+            rows = np.repeat(np.arange(shape[0], dtype=np.int32), np.diff(indptr))
+        self.rows = rows
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+    @property
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.indices.nbytes + self.data.nbytes + self.rows.nbytes
+
+    def matmul(self, q_cols: np.ndarray, q_block: np.ndarray) -> np.ndarray:
+        """
+        Product with a sparse query matrix given in compact form: `q_cols` are
+        the sorted, unique columns used by any query and `q_block` holds their
+        weights (len(q_cols) x n_queries). Returns dense float64 scores of
+        shape (n_rows, n_queries).
+        """
+        out = np.zeros((self.shape[0], q_block.shape[1]))
+        if not self.nnz or not len(q_cols):
+            return out
+        lookup = np.full(self.shape[1], -1, dtype=np.int32)
+        lookup[q_cols] = np.arange(len(q_cols), dtype=np.int32)
+        pos = lookup[self.indices]
+        hit = np.flatnonzero(pos >= 0)
+        if not len(hit):
+            return out
+        # Stored values are in row order, so each row's hits are contiguous.
+        rows = self.rows[hit]
+        contrib = self.data[hit, None] * q_block[pos[hit]]
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        out[rows[starts]] = np.add.reduceat(contrib, starts, axis=0)
+        return out
+
+    def dot(self, q_indices: np.ndarray, q_values: np.ndarray) -> np.ndarray:
+        """Product with a single sparse vector given as (sorted indices, values)."""
+        return self.matmul(q_indices, q_values[:, None])[:, 0]
+
+    def dot_rows(self, row_ids: np.ndarray, q_indices: np.ndarray, q_values: np.ndarray) -> np.ndarray:
+        """Product of a subset of rows with a sparse vector (sorted indices, values)."""
+        pos, lengths = _row_positions(self.indptr, row_ids)
+        if not len(q_indices) or not len(pos):
+            return np.zeros(len(row_ids))
+        cols = self.indices[pos]
+        q_pos = np.minimum(np.searchsorted(q_indices, cols), len(q_indices) - 1)
+        contrib = np.where(q_indices[q_pos] == cols, self.data[pos] * q_values[q_pos], 0.0)
+        segment = np.repeat(np.arange(len(row_ids)), lengths)
+        return np.bincount(segment, weights=contrib, minlength=len(row_ids))
+
+    def toarray(self) -> np.ndarray:
+        dense = np.zeros(self.shape, dtype=self.data.dtype)
+        dense[self.rows, self.indices] = self.data
+        return dense
+
+
+class IVFIndex:
+    """
+    Approximate nearest-neighbour index over the sparse embeddings (NumPy only).
+
+    Rows are count-sketched down to `dim` dense dimensions and clustered with
+    spherical k-means into `nlist` inverted lists. A query probes the
+    `nprobe` lists with the closest centroids and re-ranks only their rows
+    with the exact sparse dot product, so scores are exact and only recall is
+    approximate. Raise `nprobe` for recall, lower it for speed; `nlist`
+    defaults to ~sqrt(N).
+    """
+
+    def __init__(self, nlist: Optional[int] = None, nprobe: int = 8, dim: int = 256,
+                 n_iter: int = 10, sample_size: int = 50000, seed: int = 0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.dim = dim
+        self.n_iter = n_iter
+        self.sample_size = sample_size
+        self.seed = seed
+        self.n_rows = 0
+        self.n_cols = 0
+        self.centroids = np.zeros((0, dim), dtype=np.float32)
+        self.list_offsets = np.zeros(1, dtype=np.int64)
+        self.list_rows = np.zeros(0, dtype=np.int64)
+
+    def _sketch(self, cols: np.ndarray) -> tuple:
+        """Count-sketch bucket and sign per column id — a stateless hash, so new columns just work."""
+        with np.errstate(over="ignore"):
+            h = (cols.astype(np.uint64) + np.uint64(self.seed + 1)) * np.uint64(0x9E3779B97F4A7C15)
+            h ^= h >> np.uint64(31)
+            h *= np.uint64(0xBF58476D1CE4E5B9)
+            h ^= h >> np.uint64(29)
+        return (h % np.uint64(self.dim)).astype(np.int64), np.where(h >> np.uint64(63), 1.0, -1.0)
+
+    def _project(self, embeddings: CSRMatrix, row_ids: np.ndarray) -> np.ndarray:
+        """Count-sketch + L2-normalize a set of rows -> (len(row_ids), dim) float32."""
+        pos, lengths = _row_positions(embeddings.indptr, row_ids)
+        bucket, sign = self._sketch(embeddings.indices[pos])
+        segment = np.repeat(np.arange(len(row_ids), dtype=np.int64), lengths)
+        flat = np.bincount(
+            segment * self.dim + bucket,
+            weights=embeddings.data[pos] * sign,
+            minlength=len(row_ids) * self.dim,
+        ).reshape(len(row_ids), self.dim)
+        norms = np.linalg.norm(flat, axis=1, keepdims=True)
+        return (flat / np.where(norms > 0, norms, 1)).astype(np.float32)
+
+    def _project_query(self, q_indices: np.ndarray, q_values: np.ndarray) -> np.ndarray:
+        bucket, sign = self._sketch(q_indices)
+        vec = np.bincount(bucket, weights=q_values * sign, minlength=self.dim)
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm > 0 else vec).astype(np.float32)
+
+    def _assign(self, embeddings: CSRMatrix, row_ids: np.ndarray, chunk_rows: int = 65536) -> np.ndarray:
+        """Nearest centroid for each row, a chunk at a time."""
+        assign = np.empty(len(row_ids), dtype=np.int64)
+        for lo in range(0, len(row_ids), chunk_rows):
+            chunk = row_ids[lo:lo + chunk_rows]
+            assign[lo:lo + len(chunk)] = np.argmax(self._project(embeddings, chunk) @ self.centroids.T, axis=1)
+        return assign
+
+    def _set_lists(self, rows: np.ndarray, lists: np.ndarray):
+        order = np.lexsort((rows, lists))
+        self.list_rows = rows[order]
+        self.list_offsets = np.zeros(len(self.centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(lists, minlength=len(self.centroids)), out=self.list_offsets[1:])
+
+    def build(self, embeddings: CSRMatrix, chunk_rows: int = 65536):
+        self.n_rows, self.n_cols = embeddings.shape
+        rng = np.random.default_rng(self.seed)
+        nlist = self.nlist or int(np.clip(np.sqrt(self.n_rows), 1, 4096))
+        nlist = max(1, min(nlist, self.n_rows))
+
+        # Spherical k-means on a sample of the projected rows
+        sample = np.sort(rng.choice(self.n_rows, min(self.sample_size, self.n_rows), replace=False))
+        points = self._project(embeddings, sample)
+        centroids = points[rng.choice(len(points), nlist, replace=False)].copy()
+        for _ in range(self.n_iter):
+            assign = np.argmax(points @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, points)
+            empty = np.bincount(assign, minlength=nlist) == 0
+            sums[empty] = points[rng.choice(len(points), int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.where(norms > 0, norms, 1)
+        self.centroids = centroids.astype(np.float32)
+
+        # Assign every row, then group rows by list
+        rows = np.arange(self.n_rows)
+        self._set_lists(rows, self._assign(embeddings, rows, chunk_rows))
+
+    def updated(self, embeddings: CSRMatrix, source_rows: np.ndarray) -> "IVFIndex":
+        """
+        Copy of this index for a changed catalogue without re-clustering.
+        `source_rows[i]` is the old row that new row i was carried over from,
+        or -1 for new/changed rows, which are assigned to their nearest
+        existing centroid. Rows that are not carried over drop out.
+        """
+        index = copy.copy(self)
+        index.n_rows, index.n_cols = embeddings.shape
+        old_to_new = np.full(self.n_rows, -1, dtype=np.int64)
+        carried = np.flatnonzero(source_rows >= 0)
+        old_to_new[source_rows[carried]] = carried
+        old_lists = np.repeat(np.arange(len(self.centroids)), np.diff(self.list_offsets))
+        moved = old_to_new[self.list_rows]
+        keep = moved >= 0
+        fresh = np.flatnonzero(source_rows < 0)
+        index._set_lists(
+            np.concatenate([moved[keep], fresh]),
+            np.concatenate([old_lists[keep], self._assign(embeddings, fresh)]),
+        )
+        return index
+
+    def candidates(self, q_indices: np.ndarray, q_values: np.ndarray) -> np.ndarray:
+        """Row ids in the `nprobe` closest lists, sorted ascending."""
+        q = self._project_query(q_indices, q_values)
+        probe = top_k_indices(self.centroids @ q, self.nprobe)
+        rows = [self.list_rows[self.list_offsets[p]:self.list_offsets[p + 1]] for p in probe.tolist()]
+        return np.sort(np.concatenate(rows)) if rows else np.zeros(0, dtype=np.int64)
+
+    def search(self, embeddings: CSRMatrix, q_indices: np.ndarray, q_values: np.ndarray, k: int) -> tuple:
+        """Approximate top-k (row ids, exact scores); falls back to a full scan if too few candidates."""
+        rows = self.candidates(q_indices, q_values)
+        if len(rows) < k:
+            sims = embeddings.dot(q_indices, q_values)
+            top = top_k_indices(sims, k)
+            return top, sims[top]
+        sims = embeddings.dot_rows(rows, q_indices, q_values)
+        top = top_k_indices(sims, k)
+        return rows[top], sims[top]
+
+    def save(self, path: str):
+        """Write the index as `{path}.<array>.npy` files, so load() can memory-map them."""
+        for name in ("centroids", "list_offsets", "list_rows"):
+            np.save(f"{path}.{name}.npy", getattr(self, name))
+        np.save(f"{path}.params.npy",
+                np.array([self.nprobe, self.dim, self.seed, self.n_rows, self.n_cols], dtype=np.int64))
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """Memory-map an index written by save(); the count sketch is rebuilt from the seed."""
+        nprobe, dim, seed, n_rows, n_cols = np.load(f"{path}.params.npy").tolist()
+        centroids = np.load(f"{path}.centroids.npy", mmap_mode="r")
+        index = cls(nlist=len(centroids), nprobe=nprobe, dim=dim, seed=seed)
+        index.centroids = centroids
+        index.list_offsets = np.load(f"{path}.list_offsets.npy", mmap_mode="r")
+        index.list_rows = np.load(f"{path}.list_rows.npy", mmap_mode="r")
+        index.n_rows, index.n_cols = n_rows, n_cols
+        return index
 
 
 class VectorStore:
-    def __init__(self):
-        self.colleges: List[College] = []
+    """
+    TF-IDF vector store backed by a sparse CSR matrix.
+
+    With `hashing=True` tokens are mapped to `n_features` buckets with a
+    stable hash instead of a vocabulary, so build needs no vocabulary pass and
+    memory does not depend on vocabulary size. Embeddings are stored as float32.
+
+    Retrieval is an exact scan unless an ANN `index` (e.g. IVFIndex) is
+    given; it is (re)built together with the embeddings.
+    """
+
+    def __init__(self, hashing: bool = False, n_features: int = 2 ** 18, dtype=np.float32,
+                 query_cache_size: int = 1024, index: Optional[IVFIndex] = None,
+                 reweight_tolerance: float = 0.01):
+        self.index = index
+        self.reweight_tolerance = reweight_tolerance
+        self.hashing = hashing
+        self.n_features = n_features
+        self.dtype = dtype
+        self.query_cache_size = query_cache_size
+        self._query_cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+        self.colleges: Sequence[College] = []
         self.vocab: dict = {}
         self.idf: np.ndarray = np.array([])
-        self.embeddings: np.ndarray = np.array([])
+        self.df: np.ndarray = np.array([], dtype=np.int64)
+        self.embeddings: Optional[CSRMatrix] = None
+
+    def _feature_id(self, word: str) -> int:
+        if self.hashing:
+            return _hash_token(word, self.n_features)
+        return self.vocab.get(word, -1)
+
+    def clear_query_cache(self):
+        with self._query_cache_lock:
+            self._query_cache.clear()
+
+    @staticmethod
+    def _tokenize(colleges: Sequence[College]) -> tuple:
+        """
+        Tokenize one document at a time, interning tokens to first-seen ids in
+        a compact int array (no per-document token lists are kept).
+        Returns (seen word -> first-seen id, token ids, document lengths).
+        """
+        seen: dict = {}
+        first_seen_ids = array("q")
+        lengths = np.empty(len(colleges), dtype=np.int64)
+        for i, c in enumerate(colleges):
+            words = build_college_text(c).lower().split()
+            lengths[i] = len(words)
+            first_seen_ids.extend([seen.setdefault(w, len(seen)) for w in words])
+        return seen, np.frombuffer(first_seen_ids, dtype=np.int64), lengths
 
-    def build(self, colleges: List[College]):
+    @staticmethod
+    def _count_terms(term_ids: np.ndarray, lengths: np.ndarray, n_terms: int) -> tuple:
+        """
+        Term counts per (doc, term) — np.unique on a combined key yields them
+        already sorted by doc then term, i.e. in CSR order.
+        """
+        doc_ids = np.repeat(np.arange(len(lengths), dtype=np.int64), lengths)
+        pairs, counts = np.unique(doc_ids * n_terms + term_ids, return_counts=True)
+        return pairs // n_terms, pairs % n_terms, counts
+
+    @staticmethod
+    def _idf(n_docs: int, df: np.ndarray) -> np.ndarray:
+        return np.log((n_docs + 1) / (df + 1)) + 1
+
+    @staticmethod
+    def _weights(rows: np.ndarray, cols: np.ndarray, counts: np.ndarray, lengths: np.ndarray,
+                 idf: np.ndarray) -> np.ndarray:
+        """TF-IDF weights, L2-normalized per row (computed in float64)."""
+        data = (counts / lengths[rows]) * idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=data ** 2, minlength=len(lengths)))
+        return data / np.where(norms > 0, norms, 1)[rows]
+
+    def build(self, colleges: Sequence[College]):
         self.colleges = colleges
-        texts = [build_college_text(c) for c in colleges]
-
-        # Build vocabulary
-        all_words = set()
-        for t in texts:
-            all_words.update(t.lower().split())
-        self.vocab = {w: i for i, w in enumerate(sorted(all_words))}
-
-        # Compute IDF
-        df = np.zeros(len(self.vocab))
-        for t in texts:
-            words = set(t.lower().split())
-            for w in words:
-                if w in self.vocab:
-                    df[self.vocab[w]] += 1
-        self.idf = np.log((len(texts) + 1) / (df + 1)) + 1
-
-        # Embed all colleges
-        self.embeddings = np.array([
-            simple_tfidf_embed(t, self.vocab, self.idf) for t in texts
-        ])
+        n_docs = len(colleges)
+        self.clear_query_cache()
+        seen, first_seen_ids, lengths = self._tokenize(colleges)
+
+        # Remap to sorted-vocabulary ids (as before) or hashed feature ids —
+        # one lookup per unique token.
+        if self.hashing:
+            self.vocab = {}
+            n_terms = self.n_features
+        else:
+            self.vocab = {w: i for i, w in enumerate(sorted(seen))}
+            n_terms = len(self.vocab)
+        remap = np.fromiter((self._feature_id(w) for w in seen), dtype=np.int64, count=len(seen))
+        rows, cols, counts = self._count_terms(remap[first_seen_ids], lengths, n_terms)
+
+        # IDF from document frequencies
+        self.df = np.bincount(cols, minlength=n_terms)
+        self.idf = self._idf(n_docs, self.df)
+        data = self._weights(rows, cols, counts, lengths, self.idf)
+
+        indptr = np.zeros(n_docs + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_docs), out=indptr[1:])
+        self.embeddings = CSRMatrix(
+            indptr, cols.astype(np.int32), data.astype(self.dtype), (n_docs, n_terms)
+        )
+        if self.index is not None and n_docs:
+            self.index.build(self.embeddings)
+
+    def with_changes(self, colleges: Sequence[College], source_rows: np.ndarray) -> "VectorStore":
+        """
+        New store for a changed catalogue; this one is left untouched so the
+        two can be swapped atomically. `source_rows[i]` is the row of this
+        store that `colleges[i]` is unchanged from, or -1 if it is new or
+        edited — only those rows are tokenized and embedded.
+
+        Document frequencies are updated incrementally. Carried-over rows keep
+        their stored weights until the IDF has drifted by more than
+        `reweight_tolerance` (relative), and are then re-weighted in one
+        vectorized pass over their values — no re-tokenization.
+        """
+        old = self.embeddings
+        n_docs = len(colleges)
+        carried = np.flatnonzero(source_rows >= 0)
+        fresh = np.flatnonzero(source_rows < 0)
+
+        new = copy.copy(self)
+        new._query_cache = OrderedDict()
+        new._query_cache_lock = threading.Lock()
+        new.colleges = colleges
+
+        # Document frequencies without the rows that are dropped or replaced
+        dropped = np.ones(old.shape[0], dtype=bool)
+        dropped[source_rows[carried]] = False
+        dropped_pos, _ = _row_positions(old.indptr, np.flatnonzero(dropped))
+        df = self.df - np.bincount(old.indices[dropped_pos], minlength=len(self.df))
+
+        # Tokenize only the new/edited rows; unseen words get appended ids
+        seen, first_seen_ids, lengths = self._tokenize([colleges[i] for i in fresh.tolist()])
+        if self.hashing:
+            n_terms = self.n_features
+        else:
+            new.vocab = dict(self.vocab.items())
+            for w in seen:
+                new.vocab.setdefault(w, len(new.vocab))
+            n_terms = len(new.vocab)
+        remap = np.fromiter((new._feature_id(w) for w in seen), dtype=np.int64, count=len(seen))
+        rows_f, cols_f, counts_f = self._count_terms(remap[first_seen_ids], lengths, n_terms)
+        df = np.concatenate([df, np.zeros(n_terms - len(df), dtype=df.dtype)])
+        df += np.bincount(cols_f, minlength=n_terms)
+        new.df = df
+
+        # IDF: adopt the exact value once it drifts past the tolerance (lazy re-weighting)
+        target = self._idf(n_docs, df)
+        ratio = target[:len(self.idf)] / self.idf
+        reweight = bool(len(ratio)) and float(np.abs(ratio - 1).max()) > self.reweight_tolerance
+        new.idf = target if reweight else np.concatenate([self.idf, target[len(self.idf):]])
+        data_f = self._weights(rows_f, cols_f, counts_f, lengths, new.idf)
+
+        carried_pos, carried_len = _row_positions(old.indptr, source_rows[carried])
+        cols_c = old.indices[carried_pos]
+        data_c = old.data[carried_pos]
+        if reweight:
+            segment = np.repeat(np.arange(len(carried)), carried_len)
+            data_c = data_c * ratio[cols_c]
+            norms = np.sqrt(np.bincount(segment, weights=data_c ** 2, minlength=len(carried)))
+            data_c = data_c / np.where(norms > 0, norms, 1)[segment]
+
+        # Assemble the new CSR in catalogue order
+        row_len = np.zeros(n_docs, dtype=np.int64)
+        row_len[carried] = carried_len
+        row_len[fresh] = np.bincount(rows_f, minlength=len(fresh))
+        indptr = np.zeros(n_docs + 1, dtype=np.int64)
+        np.cumsum(row_len, out=indptr[1:])
+        indices = np.empty(indptr[-1], dtype=np.int32)
+        data = np.empty(indptr[-1], dtype=self.dtype)
+        dest, _ = _row_positions(indptr, carried)
+        indices[dest], data[dest] = cols_c, data_c
+        dest, _ = _row_positions(indptr, fresh)
+        indices[dest], data[dest] = cols_f, data_f
+        new.embeddings = CSRMatrix(indptr, indices, data, (n_docs, n_terms))
+
+        if self.index is not None:
+            new.index = self.index.updated(new.embeddings, source_rows)
+        return new
+
+    def embed_query(self, query_text: str) -> tuple:
+        """
+        Sparse, L2-normalized TF-IDF embedding of a query: (sorted indices,
+        values). Results are kept in a small LRU — retrieval queries are
+        templated, so the same strings recur.
+        """
+        with self._query_cache_lock:
+            cached = self._query_cache.get(query_text)
+            if cached is not None:
+                self._query_cache.move_to_end(query_text)
+                return cached
+
+        words = query_text.lower().split()
+        if not words or self.embeddings is None:
+            return np.array([], dtype=np.int64), np.array([])
+        term_ids = np.array([self._feature_id(w) for w in words], dtype=np.int64)
+        ids, counts = np.unique(term_ids[term_ids >= 0], return_counts=True)
+        values = (counts / len(words)) * self.idf[ids]
+        norm = np.linalg.norm(values)
+        embedded = (ids, values / norm) if norm > 0 else (ids[:0], values[:0])
+
+        with self._query_cache_lock:
+            self._query_cache[query_text] = embedded
+            while len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+        return embedded
+
+    def query_many(self, query_texts: List[str], k: int = 5) -> tuple:
+        """
+        Batched retrieval: embeds all queries into one compact matrix, scores
+        them with a single sparse matmul and keeps the top-k of each with
+        argpartition (or asks the ANN index, one query at a time). Returns
+        (indices, scores), both len(query_texts) x k.
+        Queries with no known terms get the first k colleges with score 0.
+        """
+        k = min(k, len(self.colleges))
+        indices = np.tile(np.arange(k, dtype=np.int64), (len(query_texts), 1))
+        scores = np.zeros((len(query_texts), k))
+        if not query_texts or not k:
+            return indices, scores
+
+        embedded = [self.embed_query(t) for t in query_texts]
+        if self.index is not None:
+            for j, (ids, values) in enumerate(embedded):
+                if len(ids):
+                    indices[j], scores[j] = self.index.search(self.embeddings, ids, values, k)
+            return indices, scores
+
+        q_cols = np.unique(np.concatenate([ids for ids, _ in embedded]))
+        q_block = np.zeros((len(q_cols), len(embedded)))
+        for j, (ids, values) in enumerate(embedded):
+            q_block[np.searchsorted(q_cols, ids), j] = values
+        sims = np.ascontiguousarray(self.embeddings.matmul(q_cols, q_block).T)
+
+        for j, (ids, _) in enumerate(embedded):
+            if len(ids):
+                top = top_k_indices(sims[j], k)
+                indices[j], scores[j] = top, sims[j, top]
+        return indices, scores
 
     def query(self, query_text: str, k: int = 5) -> List[College]:
         """Retrieve top-k semantically similar colleges."""
-        qvec = simple_tfidf_embed(query_text, self.vocab, self.idf)
-        if np.linalg.norm(qvec) == 0:
-            return self.colleges[:k]
-        sims = self.embeddings @ qvec
-        top_k = np.argsort(sims)[::-1][:k]
-        return [self.colleges[i] for i in top_k]
-
+        indices, _ = self.query_many([query_text], k)
+        return [self.colleges[i] for i in indices[0]]
 
-vector_store = VectorStore()
 
-@app.on_event("startup")
-async def startup():
-    vector_store.build(COLLEGES_RAW)
-    print(f"✅ Vector store built with {len(COLLEGES_RAW)} colleges")
+def new_vector_store() -> VectorStore:
+    """An empty VectorStore with the configured vectorizer and index."""
+    return VectorStore(
+        hashing=VECTOR_STORE_HASHING,
+        n_features=VECTOR_STORE_FEATURES,
+        index=IVFIndex(nlist=VECTOR_INDEX_NLIST or None, nprobe=VECTOR_INDEX_NPROBE) if VECTOR_INDEX == "ivf" else None,
+        reweight_tolerance=VECTOR_STORE_REWEIGHT_TOLERANCE,
+    )
 
 # ---------------------------------------------------------------------------
 # Scoring & Filtering Logic (mirrors frontend logic, enhanced)
@@ -294,279 +907,3274 @@ def filter_colleges(all_colleges: List[College], prefs: "StudentPreferences") ->
     return filtered
 
 # ---------------------------------------------------------------------------
-# LLM Explanation (RAG + Groq)
+# Columnar College Table (vectorized filter / score / classify)
 # ---------------------------------------------------------------------------
 
-def build_rag_context(colleges: List[College], prefs: "StudentPreferences") -> str:
-    """Build the retrieval context string for LLM."""
-    lines = []
-    for c in colleges:
-        lines.append(
-            f"- {c.college_name} ({c.state}): Exam={c.exam}, Course={c.course}, "
-            f"ClosingRank={c.closing_rank}, Fees=₹{c.average_fees:,}, "
-            f"NIRF=#{c.nirf_ranking}, Placement={c.placement_rate}%, Type={c.college_type}"
-        )
-    return "\n".join(lines)
+CHANCE_LABELS = np.array(["Safe", "Target", "Dream"])
+COLLEGE_COLUMNS = (
+    "id", "college_name", "state", "city", "course", "exam",
+    "closing_rank", "average_fees", "college_type", "nirf_ranking", "placement_rate",
+)
+CATEGORICAL_COLUMNS = ("exam", "course", "state", "college_type")
+# Numeric College fields -> CollegeTable array attributes
+_TABLE_ATTRS = {
+    "id": "ids", "closing_rank": "closing_rank", "average_fees": "fees",
+    "nirf_ranking": "nirf", "placement_rate": "placement",
+}
 
 
-def generate_llm_explanation(college: College, prefs: "StudentPreferences", chance: str, score: int) -> str:
-    """Use Groq to generate a personalized, context-aware explanation."""
-    # Use RAG to retrieve semantically similar colleges for richer context
-    query = (
-        f"Student with rank {prefs.rank} looking for {prefs.course} via {prefs.exam} "
-        f"in {prefs.state}, budget ₹{prefs.budgetMax:,}, considering {college.college_name}"
-    )
-    similar = vector_store.query(query, k=3)
-    rag_context = build_rag_context(similar, prefs)
+class CollegeRows(Sequence):
+    """Read-only list view over a CollegeTable; College objects are built on access."""
 
-    prompt = f"""You are an expert Indian college admission counselor.
+    def __init__(self, table: "CollegeTable"):
+        self.table = table
 
-Student Profile:
-- Exam: {prefs.exam}
-- Rank: {prefs.rank:,}
-- Budget: ₹{prefs.budgetMax:,}/year
-- Preferred State: {prefs.state}
-- Course: {prefs.course}
-- College Type: {prefs.collegeType}
+    def __len__(self) -> int:
+        return len(self.table)
 
-College Being Evaluated:
-- Name: {college.college_name}
-- Location: {college.city}, {college.state}
-- Closing Rank: {college.closing_rank:,}
-- Annual Fees: ₹{college.average_fees:,}
-- NIRF Ranking: #{college.nirf_ranking}
-- Placement Rate: {college.placement_rate}%
-- Match Score: {score}/100
-- Admission Chance: {chance}
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.table.college(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.table.college(i)
 
-Similar Colleges (RAG context for comparison):
-{rag_context}
 
-Write a concise, personalized 2-3 sentence explanation for why this college is recommended for this student. 
-Mention: rank compatibility, fees vs budget, placement strength, and any notable advantage.
-Be specific, encouraging, and honest about risks if it's a Dream college.
-Do NOT use bullet points. Write in flowing prose. Keep it under 60 words."""
+class CollegeTable:
+    """
+    Column-oriented view of the catalogue. Numeric fields are NumPy arrays and
+    categorical fields are integer codes into a per-column value list, so the
+    filter is a boolean mask and scoring is one vectorized expression.
+    Produces exactly the same results as filter_colleges / score_college /
+    classify_chance. `cutoff` is the closing rank those use: `closing_rank`
+    itself unless projected cut-offs are attached (with_cutoffs).
+    """
 
-    try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            max_tokens=150,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        # Fallback to rule-based explanation
-        return _fallback_explanation(college, prefs, chance, score)
+    def __init__(self, colleges: Sequence[College]):
+        self._set_columns({name: [getattr(c, name) for c in colleges] for name in COLLEGE_COLUMNS})
+        self.colleges = colleges
 
+    @classmethod
+    def from_columns(cls, columns: dict) -> "CollegeTable":
+        """
+        Build from column data (lists or arrays keyed by College field name).
+        Categorical columns may be given pre-encoded as (codes, labels).
+        Rows are exposed as College objects materialized on access.
+        """
+        table = cls.__new__(cls)
+        table._set_columns(columns)
+        table.colleges = CollegeRows(table)
+        return table
 
-def _fallback_explanation(college: College, prefs: "StudentPreferences", chance: str, score: int) -> str:
-    parts = []
-    if chance == "Safe":
-        parts.append(f"Your rank ({prefs.rank:,}) is comfortably within the closing rank of {college.closing_rank:,}, giving you a strong chance.")
-    elif chance == "Target":
-        parts.append(f"Your rank ({prefs.rank:,}) is close to the closing rank of {college.closing_rank:,} — competitive but achievable.")
-    else:
-        parts.append(f"Your rank ({prefs.rank:,}) is above the closing rank of {college.closing_rank:,} — an aspirational pick worth monitoring.")
-    if college.average_fees <= prefs.budgetMax * 0.7:
-        parts.append(f"The fees of ₹{college.average_fees:,} are well within your budget.")
-    if college.placement_rate >= 90:
-        parts.append(f"Outstanding placement record of {college.placement_rate}%.")
-    if college.nirf_ranking <= 10:
-        parts.append(f"Ranked #{college.nirf_ranking} nationally by NIRF.")
-    return " ".join(parts)
+    def _set_columns(self, columns: dict):
+        self.ids = np.asarray(columns["id"], dtype=np.int64)
+        self.names = columns["college_name"]
+        self.cities = columns["city"]
+        self.closing_rank = np.asarray(columns["closing_rank"], dtype=np.int64)
+        self.cutoff = self.closing_rank
+        self.fees = np.asarray(columns["average_fees"], dtype=np.int64)
+        self.nirf = np.asarray(columns["nirf_ranking"], dtype=np.int64)
+        self.placement = np.asarray(columns["placement_rate"], dtype=np.int64)
+        self.exam, self.exam_values = self._encode(columns["exam"])
+        self.course, self.course_values = self._encode(columns["course"])
+        self.state, self.state_values = self._encode(columns["state"])
+        self.college_type, self.college_type_values = self._encode(columns["college_type"])
+        self.labels = {
+            "exam": list(self.exam_values), "course": list(self.course_values),
+            "state": list(self.state_values), "college_type": list(self.college_type_values),
+        }
+        self._fragments: dict = {}
+        self._id_index = None
 
-# ---------------------------------------------------------------------------
-# API Models & Endpoints
-# ---------------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.ids)
 
-class StudentPreferences(BaseModel):
-    exam: str = Field(..., example="JEE")
-    rank: int = Field(..., gt=0, example=5000)
-    budgetMin: int = Field(default=0, ge=0)
-    budgetMax: int = Field(..., gt=0, example=300000)
-    state: str = Field(default="Any", example="Any")
-    course: str = Field(..., example="BTech")
-    collegeType: str = Field(default="Any", example="Any")
-    useAI: bool = Field(default=True, description="Use Claude AI for explanations (slower but richer)")
+    @staticmethod
+    def _encode(values):
+        if isinstance(values, tuple):
+            codes, labels = values
+            return np.asarray(codes, dtype=np.int32), {v: i for i, v in enumerate(labels)}
+        labels = sorted(set(values))
+        index = {v: i for i, v in enumerate(labels)}
+        return np.array([index[v] for v in values], dtype=np.int32), index
 
+    def college(self, i: int) -> College:
+        """Materialize row `i` as a College."""
+        return College(
+            id=int(self.ids[i]),
+            college_name=self.names[i],
+            state=self.labels["state"][self.state[i]],
+            city=self.cities[i],
+            course=self.labels["course"][self.course[i]],
+            exam=self.labels["exam"][self.exam[i]],
+            closing_rank=int(self.closing_rank[i]),
+            average_fees=int(self.fees[i]),
+            college_type=self.labels["college_type"][self.college_type[i]],
+            nirf_ranking=int(self.nirf[i]),
+            placement_rate=int(self.placement[i]),
+        )
 
-class RecommendedCollege(BaseModel):
-    id: int
-    college_name: str
-    state: str
-    city: str
-    course: str
-    exam: str
-    closing_rank: int
-    average_fees: int
-    college_type: str
-    nirf_ranking: int
-    placement_rate: int
-    matchScore: int
-    admissionChance: str
-    explanation: str
+    @staticmethod
+    def _code(index: dict, value: str) -> int:
+        return index.get(value, -1)
 
+    def fragment(self, c: College) -> bytes:
+        """
+        The static fields of college `c` serialized as the opening of a
+        RecommendedCollege object (`{"id":...,"placement_rate":...,`).
+        Built on first use and kept for the life of this table, i.e. one
+        catalogue version.
+        """
+        frag = self._fragments.get(c.id)
+        if frag is None:
+            frag = self._fragments[c.id] = json_bytes({name: getattr(c, name) for name in COLLEGE_COLUMNS})[:-1] + b","
+        return frag
 
-class RecommendationResponse(BaseModel):
-    total_filtered: int
-    results: List[RecommendedCollege]
-    student_summary: str
+    def filter_mask(self, prefs: "StudentPreferences") -> np.ndarray:
+        margin = prefs.rank * 0.3
+        mask = (
+            (self.exam == self._code(self.exam_values, prefs.exam))
+            & (self.course == self._code(self.course_values, prefs.course))
+            & (self.fees <= prefs.budgetMax)
+            & (prefs.rank <= self.cutoff + margin)
+        )
+        if prefs.state and prefs.state != "Any":
+            mask &= self.state == self._code(self.state_values, prefs.state)
+        if prefs.collegeType != "Any":
+            mask &= self.college_type == self._code(self.college_type_values, prefs.collegeType)
+        return mask
 
+    def score(self, prefs: "StudentPreferences", idx: np.ndarray) -> np.ndarray:
+        """Match scores (0-100) for the rows in `idx`."""
+        margin = prefs.rank * 0.3
+        rank_proximity = np.clip(1 - (prefs.rank / (self.cutoff[idx] + margin)), 0, 1)
+        nirf_score = np.maximum(0, (100 - self.nirf[idx]) / 100)
+        placement_score = self.placement[idx] / 100
+        if prefs.budgetMax > 0:
+            budget_fit = np.maximum(0, 1 - (self.fees[idx] / prefs.budgetMax))
+        else:
+            budget_fit = np.zeros(len(idx))
+        raw = (0.4 * rank_proximity + 0.2 * nirf_score + 0.2 * placement_score + 0.2 * budget_fit) * 100
+        return np.round(raw).astype(np.int64)
 
-@app.get("/")
-def root():
-    return {"message": "College Admission Assistant API", "status": "running", "version": "1.0.0"}
+    def classify(self, student_rank: int, idx: np.ndarray) -> np.ndarray:
+        """Safe / Target / Dream labels for the rows in `idx`."""
+        ratio = student_rank / self.cutoff[idx]
+        return CHANCE_LABELS[np.where(ratio <= 0.7, 0, np.where(ratio <= 1.0, 1, 2))]
 
+    @staticmethod
+    def top_k(idx: np.ndarray, scores: np.ndarray, k: int):
+        """Top-k rows by score, descending, ties broken by catalogue order."""
+        order = top_k_indices(scores, k)
+        return idx[order], scores[order]
 
-@app.get("/health")
-def health():
-    return {"status": "ok", "colleges_loaded": len(COLLEGES_RAW)}
+    @staticmethod
+    def _top_k_keys(key: np.ndarray, k: int) -> np.ndarray:
+        """Column positions of the k smallest keys in each row of a 2-D array, smallest first."""
+        n = key.shape[1]
+        kk = min(k, n)
+        top = np.argpartition(key, kk - 1, axis=1)[:, :kk] if kk < n else np.broadcast_to(np.arange(n), key.shape)
+        return np.take_along_axis(top, np.argsort(np.take_along_axis(key, top, 1), axis=1, kind="stable"), 1)
 
+    def recommend(self, prefs: "StudentPreferences", k: int = 10):
+        """Filter, score, take top-k and classify. Returns (total_filtered, [(college, score, chance)])."""
+        with timed("filter"):
+            idx = np.flatnonzero(self.filter_mask(prefs))
+        if not len(idx):
+            return 0, []
+        with timed("score"):
+            top_idx, top_scores = self.top_k(idx, self.score(prefs, idx), k)
+            chances = self.classify(prefs.rank, top_idx)
+        return len(idx), [
+            (self.ranked_college(i), s, ch)
+            for i, s, ch in zip(top_idx.tolist(), top_scores.tolist(), chances.tolist())
+        ]
 
-@app.get("/meta")
-def get_meta():
-    """Return available exams, courses, states for the frontend dropdowns."""
-    exams = list(set(c.exam for c in COLLEGES_RAW))
-    courses_by_exam: dict = {}
-    for c in COLLEGES_RAW:
-        courses_by_exam.setdefault(c.exam, set()).add(c.course)
-    states = sorted(set(c.state for c in COLLEGES_RAW))
-    return {
-        "exams": sorted(exams),
-        "courses": {k: sorted(v) for k, v in courses_by_exam.items()},
-        "states": states,
-        "college_types": ["Any", "Government", "Private"],
-    }
+    def recommend_many(self, prefs_list: Sequence["StudentPreferences"], k: int = 10,
+                       max_cells: int = 1 << 20) -> List[tuple]:
+        """
+        recommend() for many students. Students are grouped by (exam, course)
+        and each group is filtered, scored and ranked as 2-D blocks of
+        (students x that group's candidate rows), at most `max_cells` cells
+        at a time. Returns one (total_filtered, [(college, score, chance)])
+        per student, in input order, identical to calling recommend().
+        """
+        out = [(0, [])] * len(prefs_list)
+        groups: dict = {}
+        for i, p in enumerate(prefs_list):
+            groups.setdefault((p.exam, p.course), []).append(i)
 
+        for (exam, course), members in groups.items():
+            rows = np.flatnonzero(
+                (self.exam == self._code(self.exam_values, exam))
+                & (self.course == self._code(self.course_values, course))
+            )
+            n = len(rows)
+            if not n:
+                continue
+            closing, fees = self.cutoff[rows], self.fees[rows]
+            state, college_type = self.state[rows], self.college_type[rows]
+            nirf_score = np.maximum(0, (100 - self.nirf[rows]) / 100)
+            placement_score = self.placement[rows] / 100
+            # Tie-break by catalogue order: a larger key wins, equal scores favour lower positions
+            position_key = n - 1 - np.arange(n)
 
-@app.post("/recommendations", response_model=RecommendationResponse)
-def get_recommendations(prefs: StudentPreferences):
-    # Step 1: Filter
-    filtered = filter_colleges(COLLEGES_RAW, prefs)
-
-    if not filtered:
-        return RecommendationResponse(
-            total_filtered=0,
-            results=[],
-            student_summary=f"No colleges found matching your criteria. Try increasing your budget or removing the state filter."
+            step = max(1, max_cells // n)
+            for start in range(0, len(members), step):
+                block = [prefs_list[i] for i in members[start:start + step]]
+                rank = np.array([p.rank for p in block], dtype=np.int64)[:, None]
+                budget = np.array([p.budgetMax for p in block], dtype=np.int64)[:, None]
+                state_code = np.array(
+                    [self._code(self.state_values, p.state) if p.state and p.state != "Any" else -2 for p in block]
+                )[:, None]
+                type_code = np.array(
+                    [self._code(self.college_type_values, p.collegeType) if p.collegeType != "Any" else -2 for p in block]
+                )[:, None]
+
+                margin = rank * 0.3
+                mask = (
+                    (fees <= budget)
+                    & (rank <= closing + margin)
+                    & ((state_code == -2) | (state == state_code))
+                    & ((type_code == -2) | (college_type == type_code))
+                )
+                rank_proximity = np.clip(1 - (rank / (closing + margin)), 0, 1)
+                budget_fit = np.where(budget > 0, np.maximum(0, 1 - (fees / np.maximum(budget, 1))), 0)
+                raw = (0.4 * rank_proximity + 0.2 * nirf_score + 0.2 * placement_score + 0.2 * budget_fit) * 100
+                scores = np.round(raw).astype(np.int64)
+
+                top = self._top_k_keys(np.where(mask, -(scores * n + position_key), 1), k)
+                totals = mask.sum(axis=1)
+
+                for j, p in enumerate(block):
+                    total = int(totals[j])
+                    if not total:
+                        continue
+                    picked = top[j, :min(top.shape[1], total)]
+                    idx = rows[picked]
+                    chances = self.classify(p.rank, idx)
+                    out[members[start + j]] = (total, [
+                        (self.ranked_college(i), s, ch)
+                        for i, s, ch in zip(idx.tolist(), scores[j, picked].tolist(), chances.tolist())
+                    ])
+        return out
+
+    def sweep(self, prefs: "StudentPreferences", ranks: Sequence[int], budgets: Sequence[int], k: int = 10,
+              max_cells: int = 1 << 22) -> List[tuple]:
+        """
+        What-if grid for one profile: every (rank, budget) pair is evaluated
+        against the profile's candidate rows in one broadcast of
+        (ranks x budgets x rows) cells, chunked by rank to at most
+        `max_cells`. `prefs.rank` / `prefs.budgetMax` are ignored. Returns one
+        (total_filtered, [safe, target, dream] counts, [(row, score, chance)])
+        per scenario in rank-major order, with the eligibility, scores and
+        labels recommend() gives for that rank and budget.
+        """
+        mask = (
+            (self.exam == self._code(self.exam_values, prefs.exam))
+            & (self.course == self._code(self.course_values, prefs.course))
         )
+        if prefs.state and prefs.state != "Any":
+            mask &= self.state == self._code(self.state_values, prefs.state)
+        if prefs.collegeType != "Any":
+            mask &= self.college_type == self._code(self.college_type_values, prefs.collegeType)
+        # Rows no scenario can reach: over the largest budget, or a closing
+        # rank below what even the best rank needs (rank <= closing + 0.3 * rank)
+        all_ranks = np.asarray(ranks, dtype=np.int64)
+        all_budgets = np.asarray(budgets, dtype=np.int64)
+        mask &= (self.fees <= all_budgets.max()) & (all_ranks.min() * 0.7 <= self.cutoff)
+        rows = np.flatnonzero(mask)
+        n = len(rows)
+        if not n:
+            return [(0, [0, 0, 0], [])] * (len(all_ranks) * len(all_budgets))
 
-    # Step 2: Score & Sort
-    scored = []
-    for c in filtered:
-        score = score_college(c, prefs)
-        chance = classify_chance(prefs.rank, c.closing_rank)
-        scored.append((c, score, chance))
+        closing, fees = self.cutoff[rows], self.fees[rows]
+        nirf_score = np.maximum(0, (100 - self.nirf[rows]) / 100)
+        placement_score = self.placement[rows] / 100
+        budget = all_budgets[:, None]  # (B, 1)
+        budget_ok = fees <= budget  # (B, n)
+        budget_fit = 0.2 * np.maximum(0, 1 - (fees / budget))
+        # Keys of eligible cells lie in [-(101 * n), 0]; each failed condition
+        # adds more than that range, so ineligible cells sort last
+        ineligible = 1.0 + 101 * n
+        budget_penalty = np.where(budget_ok, 0, ineligible) - (n - 1 - np.arange(n))
+        n_budgets = len(all_budgets)
 
-    scored.sort(key=lambda x: x[1], reverse=True)
-    top10 = scored[:10]
+        out = []
+        step = max(1, max_cells // (n_budgets * n))
+        for start in range(0, len(all_ranks), step):
+            rank = all_ranks[start:start + step, None]  # (R, 1)
+            margin = rank * 0.3
+            rank_ok = rank <= closing + margin  # (R, n)
+            ratio = rank / closing
+            chance = np.where(ratio <= 0.7, 0, np.where(ratio <= 1.0, 1, 2))
+            # Counts and totals per (rank, budget) are (R x n) @ (n x B) products of the two masks
+            budget_ok_t = budget_ok.T.astype(np.float32)
+            totals = (rank_ok.astype(np.float32) @ budget_ok_t).astype(np.int64)
+            counts = np.stack(
+                [((rank_ok & (chance == c)).astype(np.float32) @ budget_ok_t).astype(np.int64) for c in range(3)],
+                axis=-1,
+            )  # (R, B, 3)
 
-    # Step 3: Generate explanations (AI or fallback)
-    results = []
-    for c, score, chance in top10:
-        if prefs.useAI:
-            explanation = generate_llm_explanation(c, prefs, chance, score)
-        else:
-            explanation = _fallback_explanation(c, prefs, chance, score)
-
-        results.append(RecommendedCollege(
-            id=c.id,
-            college_name=c.college_name,
-            state=c.state,
-            city=c.city,
-            course=c.course,
-            exam=c.exam,
-            closing_rank=c.closing_rank,
-            average_fees=c.average_fees,
-            college_type=c.college_type,
-            nirf_ranking=c.nirf_ranking,
-            placement_rate=c.placement_rate,
-            matchScore=score,
-            admissionChance=chance,
-            explanation=explanation,
-        ))
+            # Same operand order as score() so rounding matches exactly; the
+            # rank-only terms stay (R, 1, n) and only the last add is a full cube
+            rank_part = 0.4 * np.clip(1 - (rank / (closing + margin)), 0, 1) + 0.2 * nirf_score + 0.2 * placement_score
+            key = rank_part[:, None, :] + budget_fit[None, :, :]  # (R, B, n)
+            key *= 100
+            np.rint(key, out=key)
+            # Ascending sort key -(score * n + position), built in place; the
+            # penalties are broadcast adds, cheaper than a masked store into the cube
+            key *= -n
+            key += np.where(rank_ok, 0, ineligible)[:, None, :]
+            key += budget_penalty[None, :, :]
+            key = key.reshape(-1, n)
+            top = self._top_k_keys(key, k)
 
-    # Step 4: Summary
-    safe = sum(1 for r in results if r.admissionChance == "Safe")
-    target = sum(1 for r in results if r.admissionChance == "Target")
-    dream = sum(1 for r in results if r.admissionChance == "Dream")
-    summary = (
-        f"Found {len(filtered)} eligible colleges from {len(COLLEGES_RAW)} in our database. "
-        f"Showing top {len(results)}: {safe} Safe, {target} Target, {dream} Dream colleges."
-    )
+            for j in range(len(key)):
+                r, b = divmod(j, n_budgets)
+                total = int(totals[r, b])
+                picked = top[j, :min(top.shape[1], total)]
+                out.append((total, counts[r, b].tolist(), list(zip(
+                    rows[picked].tolist(),
+                    (-key[j, picked] // n).astype(np.int64).tolist(),
+                    CHANCE_LABELS[chance[r, picked]].tolist(),
+                ))))
+        return out
 
-    return RecommendationResponse(
-        total_filtered=len(filtered),
-        results=results,
-        student_summary=summary,
-    )
+    def ranked_college(self, i: int) -> College:
+        """Row `i` as returned in results: with projected_closing_rank set where the cut-off differs."""
+        c = self.colleges[i]
+        if self.cutoff is self.closing_rank or self.cutoff[i] == self.closing_rank[i]:
+            return c
+        return replace(c, projected_closing_rank=int(self.cutoff[i]))
+
+    def rows_of(self, ids: np.ndarray) -> np.ndarray:
+        """Row of each college id in `ids`, -1 where it is not in this table."""
+        if not len(self):
+            return np.full(len(ids), -1, dtype=np.int64)
+        if self._id_index is None:
+            order = np.argsort(self.ids, kind="stable")
+            self._id_index = (order, self.ids[order])
+        order, sorted_ids = self._id_index
+        pos = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+        return np.where(sorted_ids[pos] == ids, order[pos], -1)
+
+    def with_cutoffs(self, ids: np.ndarray, cutoffs: np.ndarray) -> "CollegeTable":
+        """
+        Copy of this table that filters, scores and classifies colleges `ids`
+        against `cutoffs` (-1 = back to their listed closing_rank). Every
+        other column is shared with this table, which is unchanged.
+        """
+        table = copy.copy(self)
+        table.cutoff = np.array(self.cutoff)
+        rows = self.rows_of(ids)
+        hit = rows >= 0
+        rows, cutoffs = rows[hit], cutoffs[hit]
+        table.cutoff[rows] = np.where(cutoffs > 0, cutoffs, self.closing_rank[rows])
+        return table
+
+    def with_rows(self, source_rows: np.ndarray, fresh: List[College]) -> "CollegeTable":
+        """
+        New table where row i is this table's row `source_rows[i]`, or — where
+        that is -1 — the next College from `fresh`. This table is unchanged.
+        """
+        n = len(source_rows)
+        carried = np.flatnonzero(source_rows >= 0)
+        new_rows = np.flatnonzero(source_rows < 0)
+        columns = {}
+        for name, attr in _TABLE_ATTRS.items():
+            col = np.empty(n, dtype=np.int64)
+            col[carried] = getattr(self, attr)[source_rows[carried]]
+            col[new_rows] = [getattr(c, name) for c in fresh]
+            columns[name] = col
+        for name, attr in (("college_name", "names"), ("city", "cities")):
+            old = getattr(self, attr)
+            fresh_iter = iter(fresh)
+            columns[name] = [old[i] if i >= 0 else getattr(next(fresh_iter), name) for i in source_rows.tolist()]
+        for name in CATEGORICAL_COLUMNS:
+            # Re-encode against the union of old and new labels, remapping old codes
+            old_labels = self.labels[name]
+            labels = sorted(set(old_labels) | {getattr(c, name) for c in fresh})
+            index = {v: i for i, v in enumerate(labels)}
+            codes = np.empty(n, dtype=np.int32)
+            codes[carried] = np.array([index[v] for v in old_labels], dtype=np.int32)[getattr(self, name)[source_rows[carried]]]
+            codes[new_rows] = [index[getattr(c, name)] for c in fresh]
+            columns[name] = (codes, labels)
+        return CollegeTable.from_columns(columns)
 
+    def with_changes(self, upsert: List[College], delete: List[int]) -> tuple:
+        """
+        Apply a change set (upserts by id, deletes by id; delete wins).
+        Edited rows stay in place, new ones are appended. Returns
+        (new table, source_rows) — see VectorStore.with_changes.
+        """
+        position = {cid: i for i, cid in enumerate(self.ids.tolist())}
+        deleted = {position[cid] for cid in delete if cid in position}
+        edited = {position[c.id]: c for c in upsert if c.id in position and position[c.id] not in deleted}
+        added = list({c.id: c for c in upsert if c.id not in position and c.id not in set(delete)}.values())
+
+        source_rows = np.arange(len(self), dtype=np.int64)
+        source_rows[list(edited)] = -1
+        keep = np.ones(len(self), dtype=bool)
+        keep[list(deleted)] = False
+        source_rows = np.concatenate([source_rows[keep], np.full(len(added), -1, dtype=np.int64)])
+        fresh = [edited[p] for p in sorted(edited)] + added
+        return self.with_rows(source_rows, fresh), source_rows
+
+    def diff(self, new: "CollegeTable") -> np.ndarray:
+        """source_rows mapping each row of `new` to an identical row of this table (or -1)."""
+        position = {cid: i for i, cid in enumerate(self.ids.tolist())}
+        source_rows = np.array([position.get(cid, -1) for cid in new.ids.tolist()], dtype=np.int64)
+        matched = np.flatnonzero(source_rows >= 0)
+        old_rows = source_rows[matched]
+        same = np.ones(len(matched), dtype=bool)
+        for attr in _TABLE_ATTRS.values():
+            same &= getattr(self, attr)[old_rows] == getattr(new, attr)[matched]
+        for name in CATEGORICAL_COLUMNS:
+            old_labels = np.array(self.labels[name], dtype=object)[getattr(self, name)[old_rows]]
+            new_labels = np.array(new.labels[name], dtype=object)[getattr(new, name)[matched]]
+            same &= old_labels == new_labels
+        for attr in ("names", "cities"):
+            old_col, new_col = getattr(self, attr), getattr(new, attr)
+            same &= np.array([old_col[o] == new_col[m] for o, m in zip(old_rows.tolist(), matched.tolist())], dtype=bool)
+        source_rows[matched[~same]] = -1
+        return source_rows
 
 # ---------------------------------------------------------------------------
-# Chat Streaming Endpoint (ChatGPT-style SSE)
+# Cut-off History & Projection
 # ---------------------------------------------------------------------------
 
-class CollegeInfo(BaseModel):
-    college_name: str
-    state: str
-    city: str
-    course: str
-    exam: str
-    closing_rank: int
-    average_fees: int
-    college_type: str
-    nirf_ranking: int
-    placement_rate: int
-    matchScore: int
-    admissionChance: str
+CUTOFF_COLUMNS = ("college_id", "year", "round", "closing_rank")
 
 
-class ChatStreamRequest(BaseModel):
-    college: CollegeInfo
-    student_rank: Optional[int] = None
-    student_budget: Optional[int] = None
-    system_prompt: str
-    user_message: str
+def read_cutoff_lines(path: str, offset: int = 0, header: Optional[list] = None) -> tuple:
+    """
+    (college_id, year, round, closing_rank) rows written to a .csv / .jsonl
+    file after byte `offset`, as an (n, 4) int64 array. Returns
+    (rows, new offset, csv header). Only complete lines are consumed, so a
+    row still being appended is read on the next call.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    lines = data[:end].decode("utf-8").splitlines()
+    if path.endswith(".csv"):
+        if header is None and lines:
+            header, lines = next(csv.reader(lines[:1])), lines[1:]
+        records = (dict(zip(header, row)) for row in csv.reader(lines) if row)
+    elif path.endswith((".jsonl", ".ndjson")):
+        records = (json.loads(line) for line in lines if line.strip())
+    else:
+        raise ValueError(f"Unsupported cut-off history format: {path} (expected .csv or .jsonl)")
+    rows = np.array([[int(r[name]) for name in CUTOFF_COLUMNS] for r in records], dtype=np.int64).reshape(-1, 4)
+    return rows, offset + end, header
 
 
-@app.post("/chat/stream")
-async def chat_stream(req: ChatStreamRequest):
+class CutoffHistory:
     """
-    Streams a Groq LLM response as Server-Sent Events (SSE).
-    The frontend reads chunks token-by-token and appends them — ChatGPT style.
+    Closing ranks per (college id, year, counselling round) in four parallel
+    arrays sorted by (college_id, year, round), indexed by college id CSR
+    style: the rows of college ids[j] are indptr[j]:indptr[j + 1].
+
+    `projected[j]` is the expected closing rank of ids[j] in the target round
+    (`target` = (year, round)): for every year up to the target year, take
+    the college's closing rank in the latest round up to the target round,
+    then fit a linear trend over years, weighting each year by
+    0.5 ** (age / half_life_years), and read it at the target year. An
+    observed closing rank for the target round itself is used as is. -1 where
+    a college has no usable rows.
     """
 
-    def generate():
-        try:
-            stream = client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                max_tokens=800,
-                stream=True,
-                messages=[
-                    {"role": "system", "content": req.system_prompt},
-                    {"role": "user", "content": req.user_message},
-                ],
-            )
+    def __init__(self, half_life_years: float = CUTOFF_HALF_LIFE_YEARS,
+                 min_trend_years: int = CUTOFF_MIN_TREND_YEARS, target_round: int = CUTOFF_TARGET_ROUND):
+        self.half_life_years = half_life_years
+        self.min_trend_years = min_trend_years
+        self.target_round = target_round
+        self.revision = 0
+        self.last_projection_ms: Optional[float] = None
+        # (inode, byte offset, csv header) of the backing file (see tail())
+        self._file = None
+        self._clear()
 
-            for chunk in stream:
-                delta = chunk.choices[0].delta
-                if delta.content:
-                    data = {"choices": [{"delta": {"content": delta.content}}]}
-                    yield f"data: {json.dumps(data)}\n\n"
+    def _clear(self):
+        self.college_id = np.empty(0, dtype=np.int64)
+        self.year = np.empty(0, dtype=np.int32)
+        self.round = np.empty(0, dtype=np.int32)
+        self.closing_rank = np.empty(0, dtype=np.int64)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.projected = np.empty(0, dtype=np.int64)
+        self.target: Optional[tuple] = None
 
-            yield "data: [DONE]\n\n"
+    def __len__(self) -> int:
+        return len(self.college_id)
 
-        except Exception as e:
-            error_data = {"choices": [{"delta": {"content": f"\n\n[Error: {str(e)}]"}}]}
-            yield f"data: {json.dumps(error_data)}\n\n"
-            yield "data: [DONE]\n\n"
-
-    return StreamingResponse(
-        generate(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "X-Accel-Buffering": "no",
-            "Access-Control-Allow-Origin": "*",
-        },
-    )
\ No newline at end of file
+    def lookup(self, ids: np.ndarray) -> np.ndarray:
+        """Projected closing rank for each college id, -1 where there is none."""
+        if not len(self.ids):
+            return np.full(len(ids), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+        return np.where(self.ids[pos] == ids, self.projected[pos], -1)
+
+    def add(self, rows: np.ndarray) -> tuple:
+        """
+        Merge (college_id, year, round, closing_rank) rows; a later row for
+        the same (college, year, round) replaces the stored one. Only the
+        colleges in `rows` are re-projected, unless the target round moved.
+        Returns (college ids, their projected closing ranks) for the colleges
+        whose projection was recomputed.
+        """
+        t0 = time.perf_counter()
+        college_id = np.concatenate([self.college_id, rows[:, 0]])
+        year = np.concatenate([self.year, rows[:, 1].astype(np.int32)])
+        rnd = np.concatenate([self.round, rows[:, 2].astype(np.int32)])
+        closing = np.concatenate([self.closing_rank, rows[:, 3]])
+        # Stable sort, so for equal keys the newest row comes last and is kept
+        order = np.lexsort((rnd, year, college_id))
+        college_id, year, rnd, closing = college_id[order], year[order], rnd[order], closing[order]
+        keep = np.ones(len(order), dtype=bool)
+        keep[:-1] = (college_id[1:] != college_id[:-1]) | (year[1:] != year[:-1]) | (rnd[1:] != rnd[:-1])
+        self.college_id, self.year, self.round, self.closing_rank = (
+            college_id[keep], year[keep], rnd[keep], closing[keep],
+        )
+        previous_ids, previous = self.ids, self.projected
+        self.ids, starts = np.unique(self.college_id, return_index=True)
+        self.indptr = np.append(starts, len(self.college_id)).astype(np.int64)
+
+        target = self._target()
+        if target != self.target:
+            self.target = target
+            self.projected = self._project(np.arange(len(self.ids)))
+            changed = np.union1d(previous_ids, self.ids)
+        else:
+            # Carry every other projection over, then redo only the touched colleges
+            self.projected = np.full(len(self.ids), -1, dtype=np.int64)
+            if len(previous_ids):
+                self.projected[np.searchsorted(self.ids, previous_ids)] = previous
+            changed = np.unique(rows[:, 0])
+            touched = np.searchsorted(self.ids, changed)
+            self.projected[touched] = self._project(touched)
+        self.revision += 1
+        self.last_projection_ms = round((time.perf_counter() - t0) * 1000, 1)
+        return changed, self.lookup(changed)
+
+    def _target(self) -> Optional[tuple]:
+        if not len(self):
+            return None
+        latest = int(self.year.max())
+        return latest, self.target_round or int(self.round[self.year == latest].max())
+
+    def _project(self, slots: np.ndarray) -> np.ndarray:
+        """Projected closing ranks for ids[slots] (see the class docstring)."""
+        target_year, target_round = self.target
+        positions, lengths = _row_positions(self.indptr, slots)
+        group = np.repeat(np.arange(len(slots)), lengths)
+        usable = (self.year[positions] <= target_year) & (self.round[positions] <= target_round)
+        positions, group = positions[usable], group[usable]
+        year = self.year[positions]
+        # Rows are sorted by round within a year: the last row of each (college, year) run is its latest round
+        last = np.ones(len(positions), dtype=bool)
+        last[:-1] = (group[1:] != group[:-1]) | (year[1:] != year[:-1])
+        positions, group, year = positions[last], group[last], year[last]
+
+        x = (year - target_year).astype(np.float64)
+        y = self.closing_rank[positions].astype(np.float64)
+        w = 0.5 ** (-x / self.half_life_years)
+        n = len(slots)
+        sw = np.bincount(group, w, minlength=n)
+        sx = np.bincount(group, w * x, minlength=n)
+        sy = np.bincount(group, w * y, minlength=n)
+        sxx = np.bincount(group, w * x * x, minlength=n)
+        sxy = np.bincount(group, w * x * y, minlength=n)
+        years = np.bincount(group, minlength=n)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            denom = sw * sxx - sx * sx
+            slope = np.where((years >= self.min_trend_years) & (denom > 0), (sw * sxy - sx * sy) / denom, 0.0)
+            level = (sy - slope * sx) / sw  # the trend at x = 0, i.e. the target year
+        projected = np.where(sw > 0, np.maximum(1, np.rint(np.nan_to_num(level))), -1).astype(np.int64)
+
+        observed = (year == target_year) & (self.round[positions] == target_round)
+        projected[group[observed]] = self.closing_rank[positions[observed]]
+        return projected
+
+    def tail(self, path: str) -> Optional[tuple]:
+        """
+        Add the rows appended to `path` since the last call. A file that was
+        replaced or truncated is read again from the start, dropping the old
+        rows. Returns add()'s (ids, projected) — including -1 for colleges no
+        longer in the history — or None if nothing changed.
+        """
+        st = os.stat(path)
+        inode, offset, header = self._file or (st.st_ino, 0, None)
+        dropped = None
+        if inode != st.st_ino or st.st_size < offset:
+            dropped = self.ids
+            self._clear()
+            offset, header = 0, None
+        rows, offset, header = read_cutoff_lines(path, offset, header)
+        self._file = (st.st_ino, offset, header)
+        if dropped is None:
+            return self.add(rows) if len(rows) else None
+        if len(rows):
+            self.add(rows)
+        else:
+            self.revision += 1
+        ids = np.union1d(dropped, self.ids)
+        return ids, self.lookup(ids)
+
+    def stats(self) -> dict:
+        return {
+            "rows": len(self),
+            "colleges": len(self.ids),
+            "target_year": self.target[0] if self.target else None,
+            "target_round": self.target[1] if self.target else None,
+            "projected": int((self.projected > 0).sum()),
+            "revision": self.revision,
+            "last_projection_ms": self.last_projection_ms,
+        }
+
+
+cutoff_history = CutoffHistory()
+
+# ---------------------------------------------------------------------------
+# Catalogue Loading & Binary Snapshots
+# ---------------------------------------------------------------------------
+
+SNAPSHOT_FORMAT = 3
+_INT_COLUMNS = ("id", "closing_rank", "average_fees", "nirf_ranking", "placement_rate")
+
+
+def iter_college_records(path: str) -> Iterator[dict]:
+    """Stream college records from a .csv or .jsonl file, one row at a time."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            rows = csv.DictReader(f)
+        elif path.endswith((".jsonl", ".ndjson")):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            raise ValueError(f"Unsupported catalogue format: {path} (expected .csv or .jsonl)")
+        for row in rows:
+            yield {name: int(row[name]) if name in _INT_COLUMNS else str(row[name]) for name in COLLEGE_COLUMNS}
+
+
+def load_college_table(path: str) -> CollegeTable:
+    """Parse a catalogue file straight into columns (no per-row objects are kept)."""
+    columns = {name: array("q") if name in _INT_COLUMNS else [] for name in COLLEGE_COLUMNS}
+    for record in iter_college_records(path):
+        for name in COLLEGE_COLUMNS:
+            columns[name].append(record[name])
+    return CollegeTable.from_columns(
+        {name: np.frombuffer(col, dtype=np.int64) if name in _INT_COLUMNS else col for name, col in columns.items()}
+    )
+
+
+def _snapshot_key(source_path: str, store: VectorStore) -> dict:
+    """Everything a snapshot depends on: format, source file identity and store config."""
+    st = os.stat(source_path)
+    index = store.index
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "source": {"path": os.path.abspath(source_path), "size": st.st_size, "mtime_ns": st.st_mtime_ns},
+        "vector_store": {
+            "hashing": store.hashing,
+            "n_features": store.n_features if store.hashing else None,
+            "dtype": np.dtype(store.dtype).name,
+            "index": None if index is None else {"kind": "ivf", "nlist": index.nlist, "dim": index.dim, "seed": index.seed},
+        },
+    }
+
+
+def _snapshot_path(snapshot_dir: str, key: dict) -> str:
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+    return os.path.join(snapshot_dir, f"v{SNAPSHOT_FORMAT}-{digest}")
+
+
+class StringColumn(Sequence):
+    """Strings stored as one UTF-8 blob plus offsets; decoded only on access (mmap-friendly)."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+
+class SortedVocab(Mapping):
+    """Read-only word -> id mapping over a sorted StringColumn (binary search, no dict to build)."""
+
+    def __init__(self, words: StringColumn, ids: np.ndarray):
+        self.words = words
+        self.ids = ids
+
+    def __getitem__(self, word: str) -> int:
+        i = bisect.bisect_left(self.words, word)
+        if i < len(self.words) and self.words[i] == word:
+            return int(self.ids[i])
+        raise KeyError(word)
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def items(self):
+        return zip(self.words, self.ids.tolist())
+
+
+def _save_strings(path: str, values):
+    encoded = [v.encode("utf-8") for v in values]
+    np.save(f"{path}.npy", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    np.save(f"{path}.offsets.npy", offsets)
+
+
+def _load_strings(path: str) -> StringColumn:
+    return StringColumn(np.load(f"{path}.npy", mmap_mode="r"), np.load(f"{path}.offsets.npy", mmap_mode="r"))
+
+
+def write_snapshot(snapshot_dir: str, key: dict, table: CollegeTable, store: VectorStore) -> str:
+    """
+    Write the columnar catalogue, vocabulary, IDF, embeddings and ANN index as
+    a set of .npy files. The directory name is derived from `key`, and it is
+    written under a temporary name and renamed into place, so readers never
+    see a partial snapshot.
+    """
+    final = _snapshot_path(snapshot_dir, key)
+    tmp = f"{final}.tmp-{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+
+    for name in _INT_COLUMNS:
+        np.save(os.path.join(tmp, f"{name}.npy"), getattr(table, _TABLE_ATTRS[name]))
+    _save_strings(os.path.join(tmp, "college_name"), table.names)
+    _save_strings(os.path.join(tmp, "city"), table.cities)
+    for name in CATEGORICAL_COLUMNS:
+        np.save(os.path.join(tmp, f"{name}.npy"), getattr(table, name))
+        _save_strings(os.path.join(tmp, f"{name}.labels"), table.labels[name])
+
+    # Vocabulary sorted by word (ids need not be sorted after incremental updates)
+    vocab = sorted(store.vocab.items())
+    _save_strings(os.path.join(tmp, "vocab"), [w for w, _ in vocab])
+    np.save(os.path.join(tmp, "vocab_ids.npy"), np.array([i for _, i in vocab], dtype=np.int64))
+    np.save(os.path.join(tmp, "idf.npy"), store.idf)
+    np.save(os.path.join(tmp, "df.npy"), store.df)
+    emb = store.embeddings
+    for name in ("indptr", "indices", "data", "rows"):
+        np.save(os.path.join(tmp, f"emb_{name}.npy"), getattr(emb, name))
+    if store.index is not None:
+        store.index.save(os.path.join(tmp, "ivf"))
+
+    with open(os.path.join(tmp, "manifest.json"), "w") as f:
+        json.dump(dict(key, n_colleges=len(table), shape=list(emb.shape), created_at=time.time()), f)
+    try:
+        os.rename(tmp, final)
+    except OSError:
+        # Another worker published the same snapshot first — keep theirs.
+        shutil.rmtree(tmp, ignore_errors=True)
+    return final
+
+
+def load_snapshot(path: str, store: VectorStore) -> CollegeTable:
+    """Memory-map a snapshot written by write_snapshot into `store`; returns the table."""
+    def arr(name):
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    columns = {name: arr(name) for name in _INT_COLUMNS}
+    columns["college_name"] = _load_strings(os.path.join(path, "college_name"))
+    columns["city"] = _load_strings(os.path.join(path, "city"))
+    for name in CATEGORICAL_COLUMNS:
+        columns[name] = (arr(name), list(_load_strings(os.path.join(path, f"{name}.labels"))))
+    table = CollegeTable.from_columns(columns)
+
+    store.colleges = table.colleges
+    store.vocab = SortedVocab(_load_strings(os.path.join(path, "vocab")), arr("vocab_ids"))
+    store.idf = arr("idf")
+    store.df = arr("df")
+    store.embeddings = CSRMatrix(
+        arr("emb_indptr"), arr("emb_indices"), arr("emb_data"), tuple(manifest["shape"]), rows=arr("emb_rows")
+    )
+    if store.index is not None:
+        loaded = IVFIndex.load(os.path.join(path, "ivf"))
+        # Keep the configured (not the resolved) nlist so the snapshot key stays stable.
+        loaded.nlist, loaded.nprobe = store.index.nlist, store.index.nprobe
+        store.index = loaded
+    store.clear_query_cache()
+    return table
+
+
+def load_catalogue(source_path: str, store: VectorStore) -> CollegeTable:
+    """Parse the catalogue at `source_path` and build its embeddings into `store` (private memory)."""
+    table = load_college_table(source_path)
+    store.build(table.colleges)
+    return table
+
+
+# Shared versions: SNAPSHOT_DIR/CURRENT names the published snapshot and its
+# version. Publishing happens under an exclusive lock on SNAPSHOT_DIR/.lock,
+# so one worker builds each version and the others only attach to it.
+_CURRENT = "CURRENT"
+
+
+def read_current(snapshot_dir: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(snapshot_dir, _CURRENT)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+@contextmanager
+def snapshot_dir_lock(snapshot_dir: str):
+    """Exclusive cross-process lock on `snapshot_dir` (process-local only where fcntl is unavailable)."""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    with open(os.path.join(snapshot_dir, ".lock"), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def publish_snapshot(snapshot_dir: str, key: dict, table: CollegeTable, store: VectorStore,
+                     source_mtime: float) -> dict:
+    """
+    Write the next shared version and point CURRENT at it (caller holds
+    snapshot_dir_lock). Only the new and the previous snapshot are kept:
+    workers still mapping older ones keep their pages until they swap, as
+    unlinked files stay readable while mapped.
+    """
+    previous = read_current(snapshot_dir)
+    version = (previous["version"] if previous else 0) + 1
+    path = write_snapshot(snapshot_dir, dict(key, revision=version), table, store)
+    pointer = {
+        "version": version,
+        "snapshot": os.path.basename(path),
+        "key": key,
+        "source_mtime": source_mtime,
+        "published_at": time.time(),
+    }
+    tmp = os.path.join(snapshot_dir, f"{_CURRENT}.tmp-{os.getpid()}")
+    with open(tmp, "w") as f:
+        json.dump(pointer, f)
+    os.replace(tmp, os.path.join(snapshot_dir, _CURRENT))
+
+    keep = {pointer["snapshot"], previous["snapshot"] if previous else None}
+    for old in os.listdir(snapshot_dir):
+        if old.startswith("v") and old not in keep and ".tmp-" not in old:
+            shutil.rmtree(os.path.join(snapshot_dir, old), ignore_errors=True)
+    return pointer
+
+
+# ---------------------------------------------------------------------------
+# Catalogue Versions & Hot Reload
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Catalogue:
+    """
+    One immutable catalogue version: the table and the vector store built
+    from it. Readers take `catalogue` once per request; a reload builds the
+    next version off to the side and swaps the module reference, so every
+    request sees one consistent version and none waits on a rebuild.
+    """
+    table: CollegeTable
+    store: VectorStore
+    version: int = 0
+    source_mtime: float = 0.0
+    # cutoff_history.revision the table's projected cut-offs come from
+    cutoff_revision: int = 0
+    # shared snapshot directory the table and store are mapped from, if any
+    snapshot: Optional[str] = None
+    # /meta body, computed on first request for this version
+    meta: Optional["CachedBody"] = field(default=None, repr=False)
+
+    @property
+    def cache_tag(self) -> str:
+        """Identifies what responses are computed from: the version and its cut-offs."""
+        return f"{self.version}.{self.cutoff_revision}"
+
+
+catalogue = Catalogue(CollegeTable(COLLEGES_RAW), new_vector_store())
+reload_stats = {"reloads": 0, "last_reload_ms": None, "last_staleness_ms": None}
+_reload_lock = threading.Lock()
+
+
+def with_projected_cutoffs(table: CollegeTable) -> CollegeTable:
+    """`table` scoring against cutoff_history's projections (itself if there are none)."""
+    if not len(cutoff_history.ids):
+        return table
+    return table.with_cutoffs(cutoff_history.ids, cutoff_history.projected)
+
+
+def _publish(table: CollegeTable, store: VectorStore, changed_at: float, source_mtime: float = 0.0,
+             version: Optional[int] = None, snapshot: Optional[str] = None) -> Catalogue:
+    """Swap in a new catalogue version (caller holds _reload_lock)."""
+    global catalogue
+    catalogue = Catalogue(
+        with_projected_cutoffs(table), store, catalogue.version + 1 if version is None else version,
+        source_mtime, cutoff_history.revision, snapshot,
+    )
+    reload_stats["reloads"] += 1
+    reload_stats["last_staleness_ms"] = round((time.time() - changed_at) * 1000, 1)
+    return catalogue
+
+
+def shared_snapshot_dir() -> Optional[str]:
+    """The directory catalogue versions are shared through, if any (file-backed catalogues only)."""
+    return SNAPSHOT_DIR if COLLEGES_PATH and SNAPSHOT_DIR else None
+
+
+def _shared_lock(snapshot_dir: Optional[str]):
+    return snapshot_dir_lock(snapshot_dir) if snapshot_dir else nullcontext()
+
+
+def _attach(snapshot_dir: str, pointer: dict) -> tuple:
+    """Memory-map the snapshot `pointer` names; returns (table, store, path) backed by the shared files."""
+    path = os.path.join(snapshot_dir, pointer["snapshot"])
+    store = new_vector_store()
+    table = load_snapshot(path, store)
+    return table, store, path
+
+
+def _sync_shared(snapshot_dir: str) -> Optional[Catalogue]:
+    """Swap to the version CURRENT names if it is not the live one (caller holds _reload_lock)."""
+    pointer = read_current(snapshot_dir)
+    if pointer is None or pointer["version"] == catalogue.version:
+        return None
+    t0 = time.perf_counter()
+    table, store, path = _attach(snapshot_dir, pointer)
+    reload_stats["last_reload_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return _publish(table, store, pointer["published_at"], pointer["source_mtime"], pointer["version"], path)
+
+
+def _commit(table: CollegeTable, store: VectorStore, changed_at: float, source_mtime: float,
+            snapshot_dir: Optional[str], key: Optional[dict]) -> Catalogue:
+    """
+    Publish a freshly built version (caller holds _reload_lock and the
+    shared lock). Shared: write it to `snapshot_dir`, point CURRENT at it and
+    attach to the mapped copy, dropping this worker's private build.
+    """
+    if snapshot_dir is None:
+        return _publish(table, store, changed_at, source_mtime)
+    pointer = publish_snapshot(snapshot_dir, key, table, store, source_mtime)
+    table, store, path = _attach(snapshot_dir, pointer)
+    return _publish(table, store, changed_at, source_mtime, pointer["version"], path)
+
+
+def open_shared_catalogue(path: str, snapshot_dir: str) -> Catalogue:
+    """
+    Boot-time load for one worker. The published version is reused while its
+    source file and vector-store config still match; otherwise this worker
+    builds and publishes a new one while the others wait on the lock, then
+    attach to it.
+    """
+    with snapshot_dir_lock(snapshot_dir):
+        store = new_vector_store()
+        key = _snapshot_key(path, store)
+        pointer = read_current(snapshot_dir)
+        if pointer is None or pointer["key"] != key:
+            table = load_catalogue(path, store)
+            pointer = publish_snapshot(snapshot_dir, key, table, store, os.stat(path).st_mtime)
+        table, store, path = _attach(snapshot_dir, pointer)
+    return Catalogue(table, store, pointer["version"], pointer["source_mtime"], snapshot=path)
+
+
+def apply_catalogue_changes(upsert: List[College], delete: List[int]) -> Catalogue:
+    """Apply an upsert/delete change set to the live catalogue and publish it (to all workers when shared)."""
+    received = time.time()
+    snapshot_dir = shared_snapshot_dir()
+    with _reload_lock, _shared_lock(snapshot_dir):
+        if snapshot_dir:
+            _sync_shared(snapshot_dir)  # build on the latest shared version, not this worker's
+        t0 = time.perf_counter()
+        current = catalogue
+        table, source_rows = current.table.with_changes(upsert, delete)
+        store = current.store.with_changes(table.colleges, source_rows)
+        key = read_current(snapshot_dir)["key"] if snapshot_dir else None
+        published = _commit(table, store, received, current.source_mtime, snapshot_dir, key)
+        reload_stats["last_reload_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        return published
+
+
+def reload_catalogue_file(path: str, snapshot_dir: Optional[str]) -> Optional[Catalogue]:
+    """
+    Re-read `path` if it changed since the live version was loaded. Only rows
+    that differ by id/content are re-embedded. With a shared `snapshot_dir`
+    the first worker to notice publishes the new version and the others
+    attach to it. Returns the version this worker swapped to, or None.
+    """
+    with _reload_lock, _shared_lock(snapshot_dir):
+        attached = _sync_shared(snapshot_dir) if snapshot_dir else None
+        mtime = os.stat(path).st_mtime
+        current = catalogue
+        if mtime == current.source_mtime:
+            return attached
+        t0 = time.perf_counter()
+        table = load_college_table(path)
+        source_rows = current.table.diff(table)
+        store = current.store.with_changes(table.colleges, source_rows)
+        key = _snapshot_key(path, store) if snapshot_dir else None
+        published = _commit(table, store, mtime, mtime, snapshot_dir, key)
+        reload_stats["last_reload_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        return published
+
+
+def sync_shared_catalogue(snapshot_dir: str) -> Optional[Catalogue]:
+    with _reload_lock:
+        return _sync_shared(snapshot_dir)
+
+
+async def watch_catalogue(path: str, snapshot_dir: Optional[str], interval: float):
+    """Poll `path` every `interval` seconds and hot-reload it when it changes."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            published = await asyncio.to_thread(reload_catalogue_file, path, snapshot_dir)
+        except Exception as e:
+            print(f"⚠️ Catalogue reload failed: {e}")
+            continue
+        if published is not None:
+            print(f"🔄 Catalogue v{published.version}: {len(published.table)} colleges "
+                  f"in {reload_stats['last_reload_ms']:.0f} ms")
+
+
+def _swap_cutoffs(changed: Optional[tuple]) -> Optional[Catalogue]:
+    """
+    Swap in the live table with the (ids, cut-offs) from cutoff_history
+    replaced (caller holds _reload_lock). The catalogue version stays, as it
+    is shared across workers; cutoff_revision moves on.
+    """
+    global catalogue
+    if changed is None:
+        return None
+    current = catalogue
+    catalogue = Catalogue(
+        current.table.with_cutoffs(*changed), current.store, current.version,
+        current.source_mtime, cutoff_history.revision, current.snapshot,
+    )
+    return catalogue
+
+
+def refresh_cutoffs(path: str) -> Optional[Catalogue]:
+    """Apply cut-off rows appended to `path` since the last call; None if there were none."""
+    with _reload_lock:
+        return _swap_cutoffs(cutoff_history.tail(path))
+
+
+def add_cutoffs(rows: np.ndarray) -> Optional[Catalogue]:
+    """Apply (college_id, year, round, closing_rank) rows held in this worker's memory only."""
+    with _reload_lock:
+        return _swap_cutoffs(cutoff_history.add(rows) if len(rows) else None)
+
+
+def append_cutoff_rows(path: str, rows: np.ndarray):
+    """Append rows to the cut-off history file in its own format (and column order, for CSV)."""
+    records = [dict(zip(CUTOFF_COLUMNS, r)) for r in rows.tolist()]
+    exists = os.path.exists(path) and os.path.getsize(path) > 0
+    if path.endswith(".csv"):
+        header = list(CUTOFF_COLUMNS)
+        if exists:
+            with open(path, newline="", encoding="utf-8") as f:
+                header = next(csv.reader(f))
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+        if not exists:
+            writer.writerow(header)
+        writer.writerows([[r.get(name, "") for name in header] for r in records])
+        text = buf.getvalue()
+    else:
+        text = "".join(json.dumps(r) + "\n" for r in records)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+
+
+async def watch_cutoffs(path: str, interval: float):
+    """Poll the cut-off history every `interval` seconds for appended rounds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            refreshed = await asyncio.to_thread(refresh_cutoffs, path)
+        except Exception as e:
+            print(f"⚠️ Cut-off refresh failed: {e}")
+            continue
+        if refreshed is not None:
+            stats = cutoff_history.stats()
+            print(f"🔄 Cut-offs r{stats['revision']}: {stats['colleges']} colleges projected to "
+                  f"{stats['target_year']} round {stats['target_round']} in {stats['last_projection_ms']:.0f} ms")
+
+
+async def follow_shared_catalogue(snapshot_dir: str, interval: float):
+    """Swap to versions published by other workers: check CURRENT every `interval` seconds."""
+    current_path = os.path.join(snapshot_dir, _CURRENT)
+    seen = None
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            st = os.stat(current_path)
+        except FileNotFoundError:
+            continue
+        stamp = (st.st_ino, st.st_mtime_ns)
+        if stamp == seen:
+            continue
+        try:
+            attached = await asyncio.to_thread(sync_shared_catalogue, snapshot_dir)
+        except Exception as e:
+            # e.g. the snapshot was pruned before we mapped it; CURRENT has moved on, retry
+            print(f"⚠️ Catalogue sync failed: {e}")
+            continue
+        seen = stamp
+        if attached is not None:
+            print(f"🔄 Catalogue v{attached.version} attached: {len(attached.table)} colleges")
+
+
+@app.on_event("startup")
+async def startup():
+    global catalogue
+    t0 = time.perf_counter()
+    snapshot_dir = shared_snapshot_dir()
+    if snapshot_dir:
+        catalogue = open_shared_catalogue(COLLEGES_PATH, snapshot_dir)
+        asyncio.create_task(follow_shared_catalogue(snapshot_dir, CATALOGUE_SYNC_SECONDS))
+    elif COLLEGES_PATH:
+        store = new_vector_store()
+        table = load_catalogue(COLLEGES_PATH, store)
+        catalogue = Catalogue(table, store, source_mtime=os.stat(COLLEGES_PATH).st_mtime)
+    else:
+        store = new_vector_store()
+        store.build(catalogue.table.colleges)
+        catalogue = Catalogue(catalogue.table, store)
+    if COLLEGES_PATH and CATALOGUE_WATCH_SECONDS > 0:
+        asyncio.create_task(watch_catalogue(COLLEGES_PATH, snapshot_dir, CATALOGUE_WATCH_SECONDS))
+    if CUTOFF_HISTORY_PATH:
+        refresh_cutoffs(CUTOFF_HISTORY_PATH)
+        if CUTOFF_WATCH_SECONDS > 0:
+            asyncio.create_task(watch_cutoffs(CUTOFF_HISTORY_PATH, CUTOFF_WATCH_SECONDS))
+    print(f"✅ Catalogue v{catalogue.version} ready: {len(catalogue.table)} colleges "
+          f"in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+# ---------------------------------------------------------------------------
+# Explanation Cache (LRU + TTL in memory, SQLite on disk)
+# ---------------------------------------------------------------------------
+
+def _bucket(value: int, significant: int = 2) -> int:
+    """Round to `significant` significant figures: 5,010 and 5,040 -> 5,000."""
+    if value <= 0:
+        return 0
+    scale = 10 ** max(0, len(str(value)) - significant)
+    return round(value / scale) * scale
+
+
+def explanation_cache_key(college: College, prefs: "StudentPreferences", chance: str, score: int) -> str:
+    """Cache key: college, the closing rank it was judged on, chance, score and a bucketed student profile."""
+    return "|".join(str(p) for p in (
+        college.id, college.projected_closing_rank, chance, score,
+        prefs.exam, prefs.course, _bucket(prefs.rank), _bucket(prefs.budgetMax),
+        prefs.state, prefs.collegeType,
+    ))
+
+
+class ExplanationCache:
+    """
+    Two-level explanation cache. Lookups hit the in-memory LRU first, then the
+    SQLite store; disk hits are promoted into memory. Entries expire `ttl`
+    seconds after they were first written.
+
+    The cache never fails a request: a SQLite error counts as a miss on read
+    and is skipped on write. get_async/put_async keep the memory level on the
+    event loop and run the SQLite I/O in a worker thread.
+    """
+
+    def __init__(self, path: Optional[str], max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()     # memory level; never held across disk I/O
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.errors = 0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS explanations "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+
+    def _remember(self, key: str, value: str, created_at: float):
+        with self._lock:
+            self._memory[key] = (value, created_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _get_memory(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[1] < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[0]
+                del self._memory[key]
+            if self._db is None:
+                self.misses += 1
+            return None
+
+    def _get_disk(self, key: str, now: float) -> Optional[str]:
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM explanations WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] >= self.ttl:
+                    self._db.execute("DELETE FROM explanations WHERE key = ?", (key,))
+                    row = None
+        except sqlite3.Error as e:
+            self._failed("read", e)
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self._remember(key, row[0], row[1])
+        self.disk_hits += 1
+        return row[0]
+
+    def _put_disk(self, key: str, value: str, now: float):
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO explanations (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, value, now),
+                )
+        except sqlite3.Error as e:
+            self._failed("write", e)
+
+    def _failed(self, op: str, error: Exception):
+        self.errors += 1
+        print(f"⚠️ Explanation cache {op} failed: {error}")
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is None and self._db is not None:
+            value = self._get_disk(key, now)
+        return value
+
+    async def get_async(self, key: str) -> Optional[str]:
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is None and self._db is not None:
+            value = await asyncio.to_thread(self._get_disk, key, now)
+        return value
+
+    def put(self, key: str, value: str):
+        now = time.time()
+        self._remember(key, value, now)
+        if self._db is not None:
+            self._put_disk(key, value, now)
+
+    async def put_async(self, key: str, value: str):
+        now = time.time()
+        self._remember(key, value, now)
+        if self._db is not None:
+            await asyncio.to_thread(self._put_disk, key, value, now)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "entries_in_memory": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+explanation_cache = ExplanationCache(EXPLANATION_CACHE_PATH, EXPLANATION_CACHE_SIZE, EXPLANATION_CACHE_TTL_SECONDS)
+
+# ---------------------------------------------------------------------------
+# Response Cache (pre-serialized bodies + strong ETags)
+# ---------------------------------------------------------------------------
+
+def json_bytes(obj) -> bytes:
+    """Compact UTF-8 JSON, as pydantic's model_dump_json writes it."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+@dataclass
+class CachedBody:
+    """A serialized JSON response and its strong ETag (a digest of the exact bytes)."""
+    body: bytes
+    etag: str
+
+    @classmethod
+    def of(cls, body: bytes) -> "CachedBody":
+        return cls(body, f'"{hashlib.sha1(body).hexdigest()}"')
+
+
+def recommendation_cache_key(prefs: "StudentPreferences", cache_tag: str) -> Optional[str]:
+    """
+    Key for a deterministic /recommendations response: the catalogue's
+    cache_tag plus every preference that affects the output. None if not
+    cacheable.
+    """
+    if prefs.useAI:
+        return None
+    state = prefs.state if prefs.state and prefs.state != "Any" else "Any"
+    return "|".join(str(p) for p in (
+        cache_tag, prefs.exam, prefs.course, prefs.rank, prefs.budgetMax, state, prefs.collegeType,
+    ))
+
+
+class ResponseCache:
+    """
+    LRU of CachedBody entries, bounded by the total size of the bodies rather
+    than the entry count, so a few large responses cannot blow the budget.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.not_modified = 0
+
+    def get(self, key: str) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: CachedBody):
+        size = len(entry.body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old.body)
+            self._entries[key] = entry
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted.body)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "not_modified": self.not_modified,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/"x" matches "x"."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def cached_json_response(request: "Request", entry: CachedBody) -> Response:
+    """200 with the cached body, or 304 if the client already has it."""
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+# ---------------------------------------------------------------------------
+# Metrics (per-stage timing, Prometheus exposition, Server-Timing)
+# ---------------------------------------------------------------------------
+
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Prometheus-style histogram with one label; buckets are cumulated at render time."""
+
+    def __init__(self, name: str, help_text: str, label: str, buckets: tuple = STAGE_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series: dict = {}  # label value -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, seconds: float):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, seconds)] += 1
+            series[-1] += seconds
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for value, counts in sorted(series.items()):
+            running = 0
+            for le, n in zip(self.buckets + ("+Inf",), counts[:-1]):
+                running += n
+                lines.append(f'{self.name}_bucket{{{self.label}="{value}",le="{le}"}} {running}')
+            lines.append(f'{self.name}_sum{{{self.label}="{value}"}} {counts[-1]:.6f}')
+            lines.append(f'{self.name}_count{{{self.label}="{value}"}} {running}')
+        return lines
+
+
+class Counter:
+    """Prometheus-style counter with one label."""
+
+    def __init__(self, name: str, help_text: str, label: str):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value: str, amount: float = 1):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        lines.extend(f'{self.name}{{{self.label}="{k}"}} {v}' for k, v in sorted(values.items()))
+        return lines
+
+
+stage_seconds = Histogram("college_stage_seconds", "Time spent in each request stage.", "stage")
+request_seconds = Histogram("college_request_seconds", "HTTP request latency until response headers.", "route")
+llm_call_seconds = Histogram("college_llm_call_seconds", "Groq call latency.", "kind")
+llm_errors = Counter("college_llm_errors_total", "Groq calls that raised, by exception type.", "error")
+explanation_fallbacks = Counter(
+    "college_explanation_fallbacks_total", "AI explanations replaced by the rule-based text.", "reason"
+)
+
+def record_llm_failure(error: Exception, explanations: int = 1):
+    """Count the explanations that fell back because of `error`; genuine Groq errors also count by type."""
+    if isinstance(error, (asyncio.TimeoutError, APITimeoutError)):
+        reason = "deadline"
+    elif isinstance(error, LLMOverloaded):
+        reason = "shed"
+    else:
+        reason = "error"
+        llm_errors.inc(type(error).__name__)
+    explanation_fallbacks.inc(reason, explanations)
+
+
+# Stage durations of the current request (None outside a request); read by
+# the Server-Timing middleware. Asyncio tasks and threadpool calls started by
+# the request inherit the same dict.
+_request_timings: contextvars.ContextVar = contextvars.ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def timed(stage: str):
+    """Time a block as `stage`: summed into the request's Server-Timing and observed in stage_seconds."""
+    timings = _request_timings.get()
+    if timings is None and not METRICS_ENABLED:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+        if METRICS_ENABLED:
+            stage_seconds.observe(stage, elapsed)
+
+
+def server_timing_header(timings: dict, total: float) -> bytes:
+    parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts).encode("latin-1")
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware: gives each HTTP request a timings dict, adds the
+    Server-Timing header when the response starts and observes the request
+    latency per route template. Streaming responses report the stages done
+    before their first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timings: dict = {}
+        token = _request_timings.set(timings)
+        t0 = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - t0
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"server-timing", server_timing_header(timings, total))
+                ]
+                if METRICS_ENABLED:
+                    route = scope.get("route")
+                    request_seconds.observe(getattr(route, "path", "unmatched"), total)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+
+
+app.add_middleware(ServerTimingMiddleware)
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition: histograms and counters above plus the existing component stats."""
+    lines = []
+    for metric in (stage_seconds, request_seconds, llm_call_seconds, llm_errors, explanation_fallbacks):
+        lines.extend(metric.render())
+
+    usage = llm_usage.stats()
+    lines += ["# HELP college_llm_calls_total Completed Groq calls.", "# TYPE college_llm_calls_total counter"]
+    lines += [f'college_llm_calls_total{{kind="{k}"}} {u["calls"]}' for k, u in sorted(usage.items())]
+    lines += ["# HELP college_llm_tokens_total Groq tokens used.", "# TYPE college_llm_tokens_total counter"]
+    for kind, u in sorted(usage.items()):
+        lines.append(f'college_llm_tokens_total{{kind="{kind}",type="prompt"}} {u["prompt_tokens"]}')
+        lines.append(f'college_llm_tokens_total{{kind="{kind}",type="completion"}} {u["completion_tokens"]}')
+
+    sched = llm_scheduler.stats()
+    lines += ["# HELP college_llm_shed_total Groq calls rejected by the scheduler.",
+              "# TYPE college_llm_shed_total counter"]
+    lines += [f'college_llm_shed_total{{priority="{p}"}} {n}' for p, n in sorted(sched["shed"].items())]
+    lines += ["# HELP college_llm_queue_depth Groq calls waiting in the scheduler.",
+              "# TYPE college_llm_queue_depth gauge"]
+    lines += [f'college_llm_queue_depth{{priority="{p}"}} {n}' for p, n in sorted(sched["queue_depth"].items())]
+
+    lines += ["# HELP college_cache_lookups_total Cache lookups by cache and result.",
+              "# TYPE college_cache_lookups_total counter"]
+    ec, rc = explanation_cache.stats(), response_cache.stats()
+    for cache, result, n in (
+        ("explanation", "hit", ec["memory_hits"] + ec["disk_hits"]), ("explanation", "miss", ec["misses"]),
+        ("response", "hit", rc["hits"]), ("response", "miss", rc["misses"]),
+    ):
+        lines.append(f'college_cache_lookups_total{{cache="{cache}",result="{result}"}} {n}')
+    lines += ["# HELP college_catalogue_version Published catalogue version.",
+              "# TYPE college_catalogue_version gauge", f"college_catalogue_version {catalogue.version}"]
+    return "\n".join(lines) + "\n"
+
+# ---------------------------------------------------------------------------
+# LLM Scheduler (token buckets + priority queues + load shedding)
+# ---------------------------------------------------------------------------
+
+PRIORITY_CHAT = "chat"
+PRIORITY_EXPLANATION = "explanation"
+LLM_PRIORITIES = (PRIORITY_CHAT, PRIORITY_EXPLANATION)  # highest first
+
+
+class LLMOverloaded(RuntimeError):
+    """The scheduler's queue for this priority is full; the call was shed."""
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute, up to one minute's worth. 0 = unlimited."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (a request larger than the bucket waits for a full one)."""
+        if self.unlimited:
+            return 0.0
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float):
+        if not self.unlimited:
+            self.level -= amount
+
+    def give(self, amount: float):
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class LLMGrant:
+    """A reservation from LLMScheduler; report actual usage to refund over-estimates."""
+
+    def __init__(self, scheduler: "LLMScheduler", tokens: int):
+        self.scheduler = scheduler
+        self.tokens = tokens
+        self.used_tokens: Optional[int] = None
+
+    def used(self, response):
+        usage = getattr(response, "usage", None)
+        total = getattr(usage, "total_tokens", None)
+        if total is not None:
+            self.used_tokens = total
+
+
+class LLMScheduler:
+    """
+    Central gate for Groq calls. A call reserves one request and an estimated
+    token count. If the buckets have room and nothing of equal or higher
+    priority is waiting it proceeds at once; otherwise it joins its
+    priority's queue, and queues are served strictly in priority order as the
+    buckets refill. A full queue sheds the call with LLMOverloaded.
+
+    Waiters are concurrent.futures.Futures, so blocking threads and event
+    loops share the same queues; a cancelled waiter is skipped.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, max_queue_depth: int):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_queue_depth = max_queue_depth
+        self._queues = {p: deque() for p in LLM_PRIORITIES}
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self.granted = {p: 0 for p in LLM_PRIORITIES}
+        self.shed = {p: 0 for p in LLM_PRIORITIES}
+        self.queued_seconds = {p: 0.0 for p in LLM_PRIORITIES}
+
+    def _wait_time(self, tokens: int) -> float:
+        return max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+
+    def _take(self, tokens: int):
+        self.requests.take(1)
+        self.tokens.take(tokens)
+
+    def _acquire(self, priority: str, tokens: int) -> "concurrent.futures.Future":
+        fut: concurrent.futures.Future = concurrent.futures.Future()
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            ahead = any(self._queues[p] for p in LLM_PRIORITIES[:LLM_PRIORITIES.index(priority) + 1])
+            if not ahead and self._wait_time(tokens) == 0:
+                self._take(tokens)
+                self.granted[priority] += 1
+                fut.set_result(LLMGrant(self, tokens))
+                return fut
+            if len(self._queues[priority]) >= self.max_queue_depth:
+                self.shed[priority] += 1
+                raise LLMOverloaded(f"LLM {priority} queue is full")
+            self._queues[priority].append((fut, tokens, now))
+            self._schedule_drain()
+        return fut
+
+    def _schedule_drain(self):
+        """(Lock held) Arm a timer for when the first waiter could be served."""
+        if self._timer is not None:
+            return
+        for p in LLM_PRIORITIES:
+            if self._queues[p]:
+                delay = self._wait_time(self._queues[p][0][1])
+                self._timer = threading.Timer(delay, self._drain)
+                self._timer.daemon = True
+                self._timer.start()
+                return
+
+    def _drain(self):
+        with self._lock:
+            self._timer = None
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            for p in LLM_PRIORITIES:
+                queue = self._queues[p]
+                while queue:
+                    fut, tokens, enqueued = queue[0]
+                    if fut.cancelled():
+                        queue.popleft()
+                        continue
+                    if self._wait_time(tokens) > 0:
+                        break
+                    queue.popleft()
+                    try:
+                        fut.set_result(LLMGrant(self, tokens))
+                    except concurrent.futures.InvalidStateError:
+                        continue  # cancelled meanwhile
+                    self._take(tokens)
+                    self.granted[p] += 1
+                    self.queued_seconds[p] += now - enqueued
+                if queue:
+                    break  # lower priorities wait behind this one
+            self._schedule_drain()
+
+    def _release(self, grant: LLMGrant):
+        """Return an unused grant: its waiter gave up at the moment it was served."""
+        with self._lock:
+            self.requests.give(1)
+            self.tokens.give(grant.tokens)
+        self._drain()  # the returned capacity may serve the next waiter
+
+    def _withdraw(self, fut: "concurrent.futures.Future") -> bool:
+        """Cancel a waiter; if it was granted meanwhile, return the grant. True if it was still queued."""
+        if fut.cancel():
+            return True
+        if not fut.cancelled() and fut.exception() is None:
+            self._release(fut.result())
+        return False
+
+    def _settle(self, grant: LLMGrant):
+        """Refund (or charge) the difference between estimated and actual tokens."""
+        if grant.used_tokens is None:
+            return
+        with self._lock:
+            self.tokens.take(grant.used_tokens - grant.tokens)
+
+    @contextmanager
+    def reserve(self, priority: str, tokens: int, timeout: Optional[float] = None):
+        """Blocking reservation; raises LLMOverloaded if shed or not granted within `timeout`."""
+        fut = self._acquire(priority, tokens)
+        try:
+            grant = fut.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            self._withdraw(fut)
+            with self._lock:
+                self.shed[priority] += 1
+            raise LLMOverloaded(f"LLM {priority} call not scheduled within {timeout}s")
+        try:
+            yield grant
+        finally:
+            self._settle(grant)
+
+    @asynccontextmanager
+    async def reserve_async(self, priority: str, tokens: int):
+        """Async reservation; cancelling the caller withdraws it from the queue."""
+        fut = self._acquire(priority, tokens)
+        try:
+            grant = await asyncio.wrap_future(fut)
+        except asyncio.CancelledError:
+            self._withdraw(fut)
+            raise
+        try:
+            yield grant
+        finally:
+            self._settle(grant)
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            return {
+                "queue_depth": {p: len(q) for p, q in self._queues.items()},
+                "max_queue_depth": self.max_queue_depth,
+                "granted": dict(self.granted),
+                "shed": dict(self.shed),
+                "mean_queued_ms": {
+                    p: round(self.queued_seconds[p] / self.granted[p] * 1000, 1) if self.granted[p] else 0.0
+                    for p in LLM_PRIORITIES
+                },
+                "requests_available": None if self.requests.unlimited else round(self.requests.level, 1),
+                "tokens_available": None if self.tokens.unlimited else round(self.tokens.level),
+            }
+
+
+def estimate_tokens(messages: list, max_tokens: int) -> int:
+    """Upper-bound token reservation: ~4 characters per prompt token plus the completion limit."""
+    return sum(len(m.get("content", "")) for m in messages) // 4 + max_tokens
+
+
+llm_scheduler = LLMScheduler(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_QUEUE_DEPTH)
+
+# ---------------------------------------------------------------------------
+# Single-flight LLM calls
+# ---------------------------------------------------------------------------
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution. The
+    first caller (the leader) runs the call; everyone else — in any thread or
+    event loop — waits on the same concurrent.futures.Future and gets the same
+    result or exception. The key is released as soon as the call settles, so
+    a failure is shared with the callers already waiting but never cached.
+    """
+
+    def __init__(self):
+        self._inflight: "dict[str, concurrent.futures.Future]" = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def _claim(self, key: str) -> tuple:
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.coalesced += 1
+                return fut, False
+            fut = concurrent.futures.Future()
+            self._inflight[key] = fut
+            self.calls += 1
+            return fut, True
+
+    def _release(self, key: str, fut: "concurrent.futures.Future"):
+        with self._lock:
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+
+    def do(self, key: str, fn):
+        """Blocking: run `fn()` once for all concurrent callers of `key`."""
+        while True:
+            fut, leader = self._claim(key)
+            if not leader:
+                try:
+                    return fut.result()
+                except concurrent.futures.CancelledError:
+                    continue  # the leader was cancelled; take over
+            try:
+                result = fn()
+            except BaseException as e:
+                self._release(key, fut)
+                fut.set_exception(e)
+                raise
+            self._release(key, fut)
+            fut.set_result(result)
+            return result
+
+    async def do_async(self, key: str, fn):
+        """Async: await `fn()` once for all concurrent callers of `key`."""
+        while True:
+            fut, leader = self._claim(key)
+            if not leader:
+                # wait() neither cancels the shared call when this follower is
+                # cancelled nor raises when the shared call is cancelled
+                shared = asyncio.wrap_future(fut)
+                await asyncio.wait({shared})
+                if shared.cancelled():
+                    continue  # the leader was cancelled (e.g. its deadline hit); take over
+                return shared.result()
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                self._release(key, fut)
+                fut.cancel()
+                raise
+            except BaseException as e:
+                self._release(key, fut)
+                fut.set_exception(e)
+                raise
+            self._release(key, fut)
+            fut.set_result(result)
+            return result
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._inflight), "calls": self.calls, "coalesced": self.coalesced}
+
+
+llm_flight = SingleFlight()
+
+
+def llm_flight_key(model: str, max_tokens: int, prompt: str) -> str:
+    """Coalescing key: model, token limit and the whitespace-normalized prompt."""
+    normalized = " ".join(prompt.split())
+    return hashlib.sha1(f"{model}|{max_tokens}|{normalized}".encode()).hexdigest()
+
+class LLMUsage:
+    """Per-kind Groq call counts, token usage and latency, for comparing call strategies."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kinds: dict = {}
+
+    def record(self, kind: str, response, seconds: float):
+        usage = getattr(response, "usage", None)
+        with self._lock:
+            k = self._kinds.setdefault(kind, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "seconds": 0.0})
+            k["calls"] += 1
+            k["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+            k["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+            k["seconds"] += seconds
+        if METRICS_ENABLED:
+            llm_call_seconds.observe(kind, seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                kind: {**k, "seconds": round(k["seconds"], 3),
+                       "mean_latency_ms": round(k["seconds"] / k["calls"] * 1000, 1) if k["calls"] else 0.0}
+                for kind, k in self._kinds.items()
+            }
+
+
+llm_usage = LLMUsage()
+
+# ---------------------------------------------------------------------------
+# LLM Explanation (RAG + Groq)
+# ---------------------------------------------------------------------------
+
+def build_rag_context(colleges: List[College], prefs: "StudentPreferences") -> str:
+    """Build the retrieval context string for LLM."""
+    lines = []
+    for c in colleges:
+        lines.append(
+            f"- {c.college_name} ({c.state}): Exam={c.exam}, Course={c.course}, "
+            f"ClosingRank={closing_rank_text(c)}, Fees=₹{c.average_fees:,}, "
+            f"NIRF=#{c.nirf_ranking}, Placement={c.placement_rate}%, Type={c.college_type}"
+        )
+    return "\n".join(lines)
+
+
+def rag_query_text(college: College, prefs: "StudentPreferences") -> str:
+    """Retrieval query for one (student, college) pair."""
+    return (
+        f"Student with rank {prefs.rank} looking for {prefs.course} via {prefs.exam} "
+        f"in {prefs.state}, budget ₹{prefs.budgetMax:,}, considering {college.college_name}"
+    )
+
+
+def retrieve_similar(colleges: List[College], prefs: "StudentPreferences", k: int = 3,
+                     store: Optional[VectorStore] = None) -> List[List[College]]:
+    """RAG retrieval for several colleges in one batched vector-store pass."""
+    store = store or catalogue.store
+    with timed("rag"):
+        indices, _ = store.query_many([rag_query_text(c, prefs) for c in colleges], k=k)
+    return [[store.colleges[i] for i in row] for row in indices.tolist()]
+
+
+def build_explanation_prompt(college: College, prefs: "StudentPreferences", chance: str, score: int,
+                             similar: Optional[List[College]] = None) -> str:
+    """Build the RAG-augmented explanation prompt for one college."""
+    # Use RAG to retrieve semantically similar colleges for richer context
+    if similar is None:
+        similar = catalogue.store.query(rag_query_text(college, prefs), k=3)
+    rag_context = build_rag_context(similar, prefs)
+
+    return f"""You are an expert Indian college admission counselor.
+
+Student Profile:
+- Exam: {prefs.exam}
+- Rank: {prefs.rank:,}
+- Budget: ₹{prefs.budgetMax:,}/year
+- Preferred State: {prefs.state}
+- Course: {prefs.course}
+- College Type: {prefs.collegeType}
+
+College Being Evaluated:
+- Name: {college.college_name}
+- Location: {college.city}, {college.state}
+- Closing Rank: {closing_rank_text(college)}
+- Annual Fees: ₹{college.average_fees:,}
+- NIRF Ranking: #{college.nirf_ranking}
+- Placement Rate: {college.placement_rate}%
+- Match Score: {score}/100
+- Admission Chance: {chance}
+
+Similar Colleges (RAG context for comparison):
+{rag_context}
+
+Write a concise, personalized 2-3 sentence explanation for why this college is recommended for this student. 
+Mention: rank compatibility, fees vs budget, placement strength, and any notable advantage.
+Be specific, encouraging, and honest about risks if it's a Dream college.
+Do NOT use bullet points. Write in flowing prose. Keep it under 60 words."""
+
+
+EXPLANATION_MODEL = "llama-3.3-70b-versatile"
+EXPLANATION_MAX_TOKENS = 150
+
+
+def generate_llm_explanation(college: College, prefs: "StudentPreferences", chance: str, score: int) -> str:
+    """
+    Use Groq to generate a personalized, context-aware explanation. Queueing
+    and the call itself share the LLM_DEADLINE_SECONDS budget (without SDK
+    retries); past it the rule-based text is returned.
+    """
+    deadline = time.monotonic() + LLM_DEADLINE_SECONDS
+    key = explanation_cache_key(college, prefs, chance, score)
+    cached = explanation_cache.get(key)
+    if cached is not None:
+        return cached
+
+    with timed("prompt"):
+        prompt = build_explanation_prompt(college, prefs, chance, score)
+
+    def call() -> str:
+        messages = [{"role": "user", "content": prompt}]
+        with llm_scheduler.reserve(PRIORITY_EXPLANATION, estimate_tokens(messages, EXPLANATION_MAX_TOKENS),
+                                   timeout=max(0.0, deadline - time.monotonic())) as grant:
+            t0 = time.perf_counter()
+            remaining = max(0.0, deadline - time.monotonic())
+            response = client.with_options(timeout=remaining, max_retries=0).chat.completions.create(
+                model=EXPLANATION_MODEL,
+                max_tokens=EXPLANATION_MAX_TOKENS,
+                messages=messages
+            )
+            grant.used(response)
+        llm_usage.record("explanation", response, time.perf_counter() - t0)
+        return response.choices[0].message.content.strip()
+
+    try:
+        explanation = llm_flight.do(llm_flight_key(EXPLANATION_MODEL, EXPLANATION_MAX_TOKENS, prompt), call)
+    except Exception as e:
+        # Fallback to rule-based explanation
+        record_llm_failure(e)
+        return _fallback_explanation(college, prefs, chance, score)
+    explanation_cache.put(key, explanation)
+    return explanation
+
+
+async def generate_llm_explanation_async(college: College, prefs: "StudentPreferences", chance: str, score: int,
+                                        similar: Optional[List[College]] = None,
+                                        semaphore: Optional[asyncio.Semaphore] = None) -> str:
+    """
+    Async variant of generate_llm_explanation — does not hold a worker thread.
+    A cache miss waits for `semaphore` (if given) before calling Groq; the
+    caller bounds the overall latency.
+    """
+    key = explanation_cache_key(college, prefs, chance, score)
+    cached = await explanation_cache.get_async(key)
+    if cached is not None:
+        return cached
+
+    with timed("prompt"):
+        prompt = build_explanation_prompt(college, prefs, chance, score, similar)
+
+    async def call() -> str:
+        messages = [{"role": "user", "content": prompt}]
+        async with llm_scheduler.reserve_async(
+            PRIORITY_EXPLANATION, estimate_tokens(messages, EXPLANATION_MAX_TOKENS)
+        ) as grant:
+            t0 = time.perf_counter()
+            response = await async_client.chat.completions.create(
+                model=EXPLANATION_MODEL,
+                max_tokens=EXPLANATION_MAX_TOKENS,
+                messages=messages
+            )
+            grant.used(response)
+        llm_usage.record("explanation", response, time.perf_counter() - t0)
+        return response.choices[0].message.content.strip()
+
+    try:
+        async with semaphore or nullcontext():
+            explanation = await llm_flight.do_async(
+                llm_flight_key(EXPLANATION_MODEL, EXPLANATION_MAX_TOKENS, prompt), call
+            )
+    except Exception as e:
+        record_llm_failure(e)
+        return _fallback_explanation(college, prefs, chance, score)
+    await explanation_cache.put_async(key, explanation)
+    return explanation
+
+
+def build_batch_explanation_prompt(ranked: List[tuple], prefs: "StudentPreferences",
+                                   similar: List[List[College]]) -> str:
+    """One prompt for the whole shortlist: shared profile, one line per college, shared RAG context."""
+    shortlisted = {c.id for c, _, _ in ranked}
+    context = list({s.id: s for group in similar for s in group if s.id not in shortlisted}.values())
+    colleges = "\n".join(
+        f"- [id {c.id}] {c.college_name}, {c.city}, {c.state}: ClosingRank={closing_rank_text(c)}, "
+        f"Fees=₹{c.average_fees:,}/year, NIRF=#{c.nirf_ranking}, Placement={c.placement_rate}%, "
+        f"MatchScore={score}/100, Chance={chance}"
+        for c, score, chance in ranked
+    )
+
+    return f"""You are an expert Indian college admission counselor.
+
+Student Profile:
+- Exam: {prefs.exam}
+- Rank: {prefs.rank:,}
+- Budget: ₹{prefs.budgetMax:,}/year
+- Preferred State: {prefs.state}
+- Course: {prefs.course}
+- College Type: {prefs.collegeType}
+
+Shortlisted Colleges:
+{colleges}
+
+Similar Colleges (RAG context for comparison):
+{build_rag_context(context, prefs) or "- none"}
+
+For EACH shortlisted college, write a concise, personalized 2-3 sentence explanation for why it is recommended for this student.
+Mention: rank compatibility, fees vs budget, placement strength, and any notable advantage.
+Be specific, encouraging, and honest about risks if it's a Dream college.
+Do NOT use bullet points. Write in flowing prose. Keep each under 60 words.
+
+Reply with JSON only, in exactly this shape, with one entry per college id above:
+{{"explanations": {{"<college id>": "<explanation>"}}}}"""
+
+
+def parse_batch_explanations(text: str, ids: List[int]) -> dict:
+    """
+    Validate a batched reply. Returns {college_id: explanation} for the ids
+    that have a non-empty string; anything missing or malformed is left out.
+    """
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        return {}
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        return {}
+    items = data.get("explanations") if isinstance(data, dict) else None
+    if not isinstance(items, dict):
+        return {}
+    out = {}
+    for cid in ids:
+        value = items.get(str(cid))
+        if isinstance(value, str) and value.strip():
+            out[cid] = value.strip()
+    return out
+
+
+async def generate_batch_explanations(ranked: List[tuple], prefs: "StudentPreferences",
+                                      similar: List[List[College]]) -> dict:
+    """One Groq call for all of `ranked`; returns {college_id: explanation} for the valid entries."""
+    with timed("prompt"):
+        prompt = build_batch_explanation_prompt(ranked, prefs, similar)
+    max_tokens = EXPLANATION_MAX_TOKENS * len(ranked)
+
+    async def call() -> str:
+        messages = [{"role": "user", "content": prompt}]
+        async with llm_scheduler.reserve_async(PRIORITY_EXPLANATION, estimate_tokens(messages, max_tokens)) as grant:
+            t0 = time.perf_counter()
+            response = await async_client.chat.completions.create(
+                model=EXPLANATION_MODEL,
+                max_tokens=max_tokens,
+                response_format={"type": "json_object"},
+                messages=messages
+            )
+            grant.used(response)
+        llm_usage.record("explanation_batched", response, time.perf_counter() - t0)
+        return response.choices[0].message.content
+
+    text = await llm_flight.do_async(llm_flight_key(EXPLANATION_MODEL, max_tokens, prompt), call)
+    return parse_batch_explanations(text, [c.id for c, _, _ in ranked])
+
+
+async def _iter_batched_explanations(ranked: List[tuple], prefs: "StudentPreferences", similar: List[List[College]],
+                                     deadline: float, semaphore: asyncio.Semaphore) -> AsyncIterator[tuple]:
+    """Batched mode of iter_explanations: cached entries first, then one call for the rest."""
+    keys = [explanation_cache_key(c, prefs, chance, score) for c, score, chance in ranked]
+    missing = []
+    for i, key in enumerate(keys):
+        cached = await explanation_cache.get_async(key)
+        if cached is not None:
+            yield i, cached
+        else:
+            missing.append(i)
+    if not missing:
+        return
+
+    failed = False
+    try:
+        async with semaphore:
+            generated = await asyncio.wait_for(
+                generate_batch_explanations([ranked[i] for i in missing], prefs, [similar[i] for i in missing]),
+                timeout=deadline,
+            )
+    except Exception as e:
+        record_llm_failure(e, len(missing))
+        generated, failed = {}, True
+    for i in missing:
+        c, score, chance = ranked[i]
+        explanation = generated.get(c.id)
+        if explanation is not None:
+            await explanation_cache.put_async(keys[i], explanation)
+            yield i, explanation
+        else:
+            # A failed call was counted above; otherwise the reply had no valid entry for this college
+            if not failed:
+                explanation_fallbacks.inc("invalid")
+            yield i, _fallback_explanation(c, prefs, chance, score)
+
+
+async def iter_explanations(
+    ranked: List[tuple],
+    prefs: "StudentPreferences",
+    deadline: Optional[float] = None,
+    concurrency: Optional[int] = None,
+    store: Optional[VectorStore] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> AsyncIterator[tuple]:
+    """
+    Yield (position, explanation) for (college, score, chance) tuples in
+    completion order. At most `concurrency` Groq calls are in flight (or as
+    many as a shared `semaphore` allows); anything still running when
+    `deadline` seconds have passed is cancelled and yielded as the rule-based
+    fallback, so the whole fan-out is bounded by the deadline. Closing the
+    iterator early cancels the outstanding calls. With
+    EXPLANATION_MODE=batched the uncached colleges share one Groq call.
+    """
+    if not ranked:
+        return
+    deadline = LLM_DEADLINE_SECONDS if deadline is None else deadline
+    semaphore = semaphore or asyncio.Semaphore(concurrency or LLM_MAX_CONCURRENCY)
+    similar = retrieve_similar([c for c, _, _ in ranked], prefs, k=3, store=store)
+    if EXPLANATION_MODE == "batched":
+        async for item in _iter_batched_explanations(ranked, prefs, similar, deadline, semaphore):
+            yield item
+        return
+
+    async def explain(i: int, c: College, score: int, chance: str, context: List[College]) -> tuple:
+        # Cache hits return without waiting for a Groq slot
+        return i, await generate_llm_explanation_async(c, prefs, chance, score, context, semaphore)
+
+    tasks = [
+        asyncio.create_task(explain(i, c, score, chance, context))
+        for i, ((c, score, chance), context) in enumerate(zip(ranked, similar))
+    ]
+    unfinished = set(range(len(ranked)))
+    try:
+        for next_done in asyncio.as_completed(tasks, timeout=deadline):
+            i, explanation = await next_done
+            unfinished.discard(i)
+            yield i, explanation
+    except asyncio.TimeoutError:
+        explanation_fallbacks.inc("deadline", len(unfinished))
+    finally:
+        for t in tasks:
+            t.cancel()
+
+    for i in sorted(unfinished):
+        c, score, chance = ranked[i]
+        yield i, _fallback_explanation(c, prefs, chance, score)
+
+
+async def generate_explanations(
+    ranked: List[tuple],
+    prefs: "StudentPreferences",
+    deadline: Optional[float] = None,
+    concurrency: Optional[int] = None,
+    store: Optional[VectorStore] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> List[str]:
+    """Explanations for (college, score, chance) tuples, in input order (see iter_explanations)."""
+    explanations = [None] * len(ranked)
+    with timed("explain"):
+        async for i, explanation in iter_explanations(ranked, prefs, deadline, concurrency, store, semaphore):
+            explanations[i] = explanation
+    return explanations
+
+
+def _fallback_explanation(college: College, prefs: "StudentPreferences", chance: str, score: int) -> str:
+    parts = []
+    closing = closing_rank_text(college)
+    if chance == "Safe":
+        parts.append(f"Your rank ({prefs.rank:,}) is comfortably within the closing rank of {closing}, giving you a strong chance.")
+    elif chance == "Target":
+        parts.append(f"Your rank ({prefs.rank:,}) is close to the closing rank of {closing} — competitive but achievable.")
+    else:
+        parts.append(f"Your rank ({prefs.rank:,}) is above the closing rank of {closing} — an aspirational pick worth monitoring.")
+    if college.average_fees <= prefs.budgetMax * 0.7:
+        parts.append(f"The fees of ₹{college.average_fees:,} are well within your budget.")
+    if college.placement_rate >= 90:
+        parts.append(f"Outstanding placement record of {college.placement_rate}%.")
+    if college.nirf_ranking <= 10:
+        parts.append(f"Ranked #{college.nirf_ranking} nationally by NIRF.")
+    return " ".join(parts)
+
+# ---------------------------------------------------------------------------
+# API Models & Endpoints
+# ---------------------------------------------------------------------------
+
+class StudentPreferences(BaseModel):
+    exam: str = Field(..., example="JEE")
+    rank: int = Field(..., gt=0, example=5000)
+    budgetMin: int = Field(default=0, ge=0)
+    budgetMax: int = Field(..., gt=0, example=300000)
+    state: str = Field(default="Any", example="Any")
+    course: str = Field(..., example="BTech")
+    collegeType: str = Field(default="Any", example="Any")
+    useAI: bool = Field(default=True, description="Use Claude AI for explanations (slower but richer)")
+
+
+class RecommendedCollege(BaseModel):
+    id: int
+    college_name: str
+    state: str
+    city: str
+    course: str
+    exam: str
+    closing_rank: int
+    average_fees: int
+    college_type: str
+    nirf_ranking: int
+    placement_rate: int
+    # Closing rank the chance label and matchScore were computed against,
+    # when projected from cut-off history and different from closing_rank
+    projected_closing_rank: Optional[int] = None
+    matchScore: int
+    admissionChance: str
+    explanation: str
+
+
+class RecommendationResponse(BaseModel):
+    total_filtered: int
+    results: List[RecommendedCollege]
+    student_summary: str
+
+
+@app.get("/")
+def root():
+    return {"message": "College Admission Assistant API", "status": "running", "version": "1.0.0"}
+
+
+@app.get("/health")
+def health():
+    return {
+        "status": "ok",
+        "colleges_loaded": len(catalogue.table),
+        "catalogue_version": catalogue.version,
+        "catalogue_reloads": reload_stats,
+        "explanation_cache": explanation_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "llm_coalescing": llm_flight.stats(),
+        "llm_usage": llm_usage.stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "chat_sessions": chat_sessions.stats(),
+        "cutoff_history": cutoff_history.stats(),
+    }
+
+
+@app.get("/metrics")
+def metrics():
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED=0)")
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/meta")
+def get_meta(request: Request):
+    """Return available exams, courses, states for the frontend dropdowns."""
+    cat = catalogue
+    if cat.meta is None:
+        cat.meta = CachedBody.of(json.dumps(build_meta(cat.table)).encode())
+    return cached_json_response(request, cat.meta)
+
+
+def build_meta(table: CollegeTable) -> dict:
+    exam_labels, course_labels = table.labels["exam"], table.labels["course"]
+    pairs = np.unique(table.exam.astype(np.int64) * len(course_labels) + table.course)
+    courses_by_exam: dict = {}
+    for p in pairs.tolist():
+        courses_by_exam.setdefault(exam_labels[p // len(course_labels)], []).append(course_labels[p % len(course_labels)])
+    # Labels outlive deleted rows (with_rows keeps the union), so list only codes still in use
+    state_labels = table.labels["state"]
+    return {
+        "exams": sorted(courses_by_exam),
+        "courses": {k: sorted(v) for k, v in courses_by_exam.items()},
+        "states": sorted(state_labels[s] for s in np.unique(table.state).tolist()),
+        "college_types": ["Any", "Government", "Private"],
+    }
+
+
+@app.post("/recommendations", response_model=RecommendationResponse)
+async def get_recommendations(prefs: StudentPreferences, request: Request):
+    # One catalogue version for the whole request, even if a reload lands mid-way
+    cat = catalogue
+    # Rule-based responses are deterministic: serve repeats from the response cache
+    cache_key = recommendation_cache_key(prefs, cat.cache_tag) if response_cache.max_bytes else None
+    if cache_key is not None:
+        entry = response_cache.get(cache_key)
+        if entry is None:
+            total_filtered, top10 = cat.table.recommend(prefs, k=10)
+            explanations = [_fallback_explanation(c, prefs, chance, score) for c, score, chance in top10]
+            with timed("serialize"):
+                entry = CachedBody.of(render_recommendation_response(cat.table, total_filtered, top10, explanations))
+            response_cache.put(cache_key, entry)
+        return cached_json_response(request, entry)
+
+    # Step 1 & 2: Filter, score and take the top 10 (vectorized)
+    total_filtered, top10 = cat.table.recommend(prefs, k=10)
+
+    # Step 3: Generate explanations (AI or fallback)
+    if not total_filtered:
+        explanations = []
+    elif prefs.useAI:
+        explanations = await generate_explanations(top10, prefs, store=cat.store)
+    else:
+        explanations = [_fallback_explanation(c, prefs, chance, score) for c, score, chance in top10]
+
+    with timed("serialize"):
+        body = render_recommendation_response(cat.table, total_filtered, top10, explanations)
+    return Response(body, media_type="application/json")
+
+
+def render_recommendation_response(table: CollegeTable, total_filtered: int, ranked: List[tuple],
+                                   explanations: List[str]) -> bytes:
+    """
+    Serialized RecommendationResponse for one student from (college, score,
+    chance) tuples. Each result is the college's cached static fragment
+    (CollegeTable.fragment) with matchScore, admissionChance and explanation
+    appended, so no RecommendedCollege models are built per request.
+    """
+    if not total_filtered:
+        return json_bytes({
+            "total_filtered": 0,
+            "results": [],
+            "student_summary": "No colleges found matching your criteria. Try increasing your budget or removing the state filter.",
+        })
+
+    results = []
+    counts = {"Safe": 0, "Target": 0, "Dream": 0}
+    for (c, score, chance), explanation in zip(ranked, explanations):
+        counts[chance] += 1
+        results.append(b"%s\"projected_closing_rank\":%s,\"matchScore\":%d,\"admissionChance\":%s,\"explanation\":%s}" % (
+            table.fragment(c), json_bytes(c.projected_closing_rank), score, json_bytes(chance), json_bytes(explanation),
+        ))
+
+    # Step 4: Summary
+    summary = (
+        f"Found {total_filtered} eligible colleges from {len(table)} in our database. "
+        f"Showing top {len(results)}: {counts['Safe']} Safe, {counts['Target']} Target, {counts['Dream']} Dream colleges."
+    )
+    return b'{"total_filtered":%d,"results":[%s],"student_summary":%s}' % (
+        total_filtered, b",".join(results), json_bytes(summary),
+    )
+
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+    "Access-Control-Allow-Origin": "*",
+}
+
+
+def sse_event(data) -> str:
+    return f"data: {json.dumps(data)}\n\n"
+
+
+@app.post("/recommendations/stream")
+async def stream_recommendations(prefs: StudentPreferences):
+    """
+    Progressive /recommendations as Server-Sent Events (same framing as
+    /chat/stream). The first event is sent as soon as scoring is done:
+      {"type": "results", ...RecommendationResponse}  (rule-based explanations)
+    then, with useAI, one event per college in completion order:
+      {"type": "explanation", "index": i, "id": college_id, "explanation": "..."}
+    and finally "[DONE]".
+    """
+    cat = catalogue
+    total_filtered, top10 = cat.table.recommend(prefs, k=10)
+    fallback = [_fallback_explanation(c, prefs, chance, score) for c, score, chance in top10]
+    body = render_recommendation_response(cat.table, total_filtered, top10, fallback)
+
+    async def generate():
+        yield b'data: {"type":"results",' + body[1:] + b"\n\n"
+        if prefs.useAI:
+            async for i, explanation in iter_explanations(top10, prefs, store=cat.store):
+                yield sse_event({"type": "explanation", "index": i, "id": top10[i][0].id, "explanation": explanation})
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(generate(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+# ---------------------------------------------------------------------------
+# Cohort Batches (NDJSON)
+# ---------------------------------------------------------------------------
+
+# Per event loop: (students being explained, Groq calls in flight) across all batches
+_batch_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = weakref.WeakKeyDictionary()
+_batch_pool = None
+_batch_pool_version = None
+_batch_table: Optional[CollegeTable] = None  # set in pool workers by _init_batch_worker
+
+
+def _batch_semaphores() -> tuple:
+    """(explain slots, LLM semaphore) for the running loop, created on first use."""
+    loop = asyncio.get_running_loop()
+    limits = _batch_limits.get(loop)
+    if limits is None:
+        limits = _batch_limits[loop] = (asyncio.Semaphore(BATCH_LLM_CONCURRENCY),
+                                        asyncio.Semaphore(BATCH_LLM_CONCURRENCY))
+    return limits
+
+
+def _init_batch_worker(snapshot: Optional[str], table: Optional[CollegeTable], cutoff: Optional[np.ndarray]):
+    """
+    Pool worker initializer: memory-map the shared snapshot and apply the
+    parent's cut-off column, or take the table pickled from the parent when
+    the catalogue is not shared.
+    """
+    global _batch_table
+    if snapshot is not None:
+        table = load_snapshot(snapshot, VectorStore())
+        table = table.with_cutoffs(table.ids, cutoff)
+    _batch_table = table
+
+
+def _recommend_block(prefs_list: List[StudentPreferences], k: int) -> List[tuple]:
+    """Process-pool entry point: rank a block against this worker's table."""
+    return _batch_table.recommend_many(prefs_list, k)
+
+
+def _get_batch_pool(cat: Catalogue):
+    """
+    Worker pool for batch scoring, rebuilt when the catalogue's cache_tag
+    changes. Workers are started with forkserver (spawn where unavailable),
+    never forked from this multi-threaded process, and attach to the
+    catalogue in their initializer.
+    """
+    global _batch_pool, _batch_pool_version
+    if _batch_pool is None or _batch_pool_version != cat.cache_tag:
+        if _batch_pool is not None:
+            _batch_pool.shutdown(wait=False)
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        if cat.snapshot is not None:
+            initargs = (cat.snapshot, None, np.asarray(cat.table.cutoff))
+        else:
+            initargs = (None, cat.table, None)
+        _batch_pool = concurrent.futures.ProcessPoolExecutor(
+            BATCH_WORKERS, mp_context=multiprocessing.get_context(method),
+            initializer=_init_batch_worker, initargs=initargs,
+        )
+        _batch_pool_version = cat.cache_tag
+    return _batch_pool
+
+
+async def _rank_block(cat: Catalogue, prefs_list: List[StudentPreferences], k: int) -> List[tuple]:
+    """Score one block off the event loop — split across the pool if BATCH_WORKERS > 0."""
+    if BATCH_WORKERS <= 0 or len(prefs_list) < 2 or cat is not catalogue:
+        return await asyncio.to_thread(cat.table.recommend_many, prefs_list, k)
+    pool = _get_batch_pool(cat)
+    loop = asyncio.get_running_loop()
+    step = -(-len(prefs_list) // BATCH_WORKERS)
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(pool, _recommend_block, prefs_list[i:i + step], k)
+        for i in range(0, len(prefs_list), step)
+    ))
+    return [r for part in parts for r in part]
+
+
+def _iter_csv_records(f) -> Iterator[dict]:
+    """Rows of a binary CSV file with a header line (StudentPreferences field names)."""
+    f.seek(0)
+    text = io.TextIOWrapper(f, encoding="utf-8-sig", newline="")
+    for row in csv.DictReader(text):
+        yield {k.strip(): v for k, v in row.items() if k and v not in ("", None)}
+
+
+def _iter_ndjson_records(f) -> Iterator:
+    """Non-blank lines of a binary NDJSON file, as raw bytes (validated with model_validate_json)."""
+    f.seek(0)
+    for line in f:
+        line = line.strip()
+        if line:
+            yield line
+
+
+async def _batch_records(request: Request) -> Iterator:
+    """
+    Student records from an NDJSON body (one StudentPreferences object per
+    line), a text/csv body, a multipart CSV upload, or an application/json
+    list. NDJSON and CSV bodies are read from request.stream() into a spool
+    (on disk past 1 MB) before the response starts and parsed a record at a
+    time from there, so the body is never held as one string or JSON tree.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=422, detail="Expected a CSV upload in the 'file' field")
+        return _iter_csv_records(upload.file)
+    if content_type.startswith("application/json"):
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=422, detail="Body is not valid JSON")
+        students = body.get("students", []) if isinstance(body, dict) else body
+        if not isinstance(students, list):
+            raise HTTPException(status_code=422, detail='Expected a JSON list of students or {"students": [...]}')
+        return iter(students)
+    spool = tempfile.SpooledTemporaryFile(max_size=1 << 20)
+    async for chunk in request.stream():
+        spool.write(chunk)
+    if content_type.startswith("text/csv"):
+        return _iter_csv_records(spool)
+    return _iter_ndjson_records(spool)
+
+
+def _chunked(records: Iterator[dict], size: int) -> Iterator[List[tuple]]:
+    chunk = []
+    for index, record in enumerate(records):
+        chunk.append((index, record))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+@app.post("/recommendations/batch")
+async def get_recommendations_batch(request: Request, k: int = 10, explain: bool = False):
+    """
+    Recommendations for a cohort. Accepts NDJSON (application/x-ndjson, one
+    StudentPreferences object per line), a text/csv body, or a multipart CSV
+    upload in the "file" field, with StudentPreferences field names as the
+    header. A JSON list (or {"students": [...]}) sent as application/json is
+    still accepted but is parsed whole, so use NDJSON for large cohorts.
+
+    Streams one NDJSON line per student, in input order, as each block of
+    BATCH_CHUNK_SIZE students is scored:
+    {"index": i, ...RecommendationResponse} or {"index": i, "error": [...]}.
+    Per-record useAI is ignored:
+    Groq explanations are opt-in with ?explain=true. At most
+    BATCH_LLM_CONCURRENCY students across all batches are being explained at
+    once, and each student's deadline starts when its turn comes.
+    """
+    cat = catalogue
+    records = await _batch_records(request)
+
+    async def stream():
+        for chunk in _chunked(records, BATCH_CHUNK_SIZE):
+            valid, errors = [], {}
+            for index, record in chunk:
+                try:
+                    if isinstance(record, bytes):
+                        valid.append((index, StudentPreferences.model_validate_json(record)))
+                    else:
+                        valid.append((index, StudentPreferences.model_validate(record)))
+                except ValidationError as e:
+                    errors[index] = [
+                        # An unparsable NDJSON line is reported with its text
+                        dict(err, input=err["input"].decode("utf-8", "replace"))
+                        if isinstance(err.get("input"), bytes) else err
+                        for err in e.errors(include_url=False, include_context=False)
+                    ]
+            ranked = await _rank_block(cat, [p for _, p in valid], k)
+
+            if explain:
+                explain_slots, llm_semaphore = _batch_semaphores()
+
+                async def explain_student(p: StudentPreferences, top: List[tuple]) -> List[str]:
+                    async with explain_slots:
+                        return await generate_explanations(top, p, store=cat.store, semaphore=llm_semaphore)
+
+                explanations = await asyncio.gather(*(
+                    explain_student(p, top) for (_, p), (_, top) in zip(valid, ranked)
+                ))
+            else:
+                explanations = [
+                    [_fallback_explanation(c, p, chance, score) for c, score, chance in top]
+                    for (_, p), (_, top) in zip(valid, ranked)
+                ]
+
+            lines = {index: json_bytes({"index": index, "error": err}) for index, err in errors.items()}
+            for (index, _), (total, top), texts in zip(valid, ranked, explanations):
+                body = render_recommendation_response(cat.table, total, top, texts)
+                lines[index] = b'{"index":%d,%s' % (index, body[1:])
+            yield b"".join(lines[index] + b"\n" for index, _ in chunk)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+class SweepRequest(BaseModel):
+    exam: str = Field(..., example="JEE")
+    course: str = Field(..., example="BTech")
+    state: str = Field(default="Any", example="Any")
+    collegeType: str = Field(default="Any", example="Any")
+    ranks: List[Annotated[int, Field(gt=0)]] = Field(..., min_length=1, example=[3000, 5000, 8000])
+    budgets: List[Annotated[int, Field(gt=0)]] = Field(..., min_length=1, example=[200000, 300000, 500000])
+    k: int = Field(default=10, ge=1, le=50)
+
+
+@app.post("/recommendations/sweep")
+def sweep_recommendations(req: SweepRequest, request: Request):
+    """
+    What-if grid for one profile: top-k and Safe/Target/Dream counts for
+    every (rank, budget) pair, scored exactly as /recommendations would.
+    Colleges appear once in "colleges"; each scenario's "top" holds
+    [id, matchScore, admissionChance] triples. Deterministic, so responses
+    are cached per catalogue version and carry an ETag.
+    """
+    scenarios = len(req.ranks) * len(req.budgets)
+    if scenarios > SWEEP_MAX_SCENARIOS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"{scenarios} scenarios requested; at most {SWEEP_MAX_SCENARIOS} (len(ranks) * len(budgets))",
+        )
+    cat = catalogue
+    cache_key = f"sweep|{cat.cache_tag}|{req.model_dump_json()}" if response_cache.max_bytes else None
+    entry = response_cache.get(cache_key) if cache_key is not None else None
+    if entry is None:
+        prefs = StudentPreferences(
+            exam=req.exam, course=req.course, state=req.state, collegeType=req.collegeType,
+            rank=1, budgetMax=1, useAI=False,
+        )
+        with timed("sweep"):
+            grid = cat.table.sweep(prefs, req.ranks, req.budgets, k=req.k)
+        with timed("serialize"):
+            colleges, results = {}, []
+            pairs = [(rank, budget) for rank in req.ranks for budget in req.budgets]
+            for (rank, budget), (total, counts, top) in zip(pairs, grid):
+                for row, _, _ in top:
+                    if row not in colleges:
+                        c = cat.table.ranked_college(row)
+                        colleges[row] = {name: getattr(c, name) for name in COLLEGE_COLUMNS}
+                        colleges[row]["projected_closing_rank"] = c.projected_closing_rank
+                results.append({
+                    "rank": rank, "budgetMax": budget, "total_filtered": total,
+                    "safe": counts[0], "target": counts[1], "dream": counts[2],
+                    "top": [[cat.table.colleges[row].id, score, chance] for row, score, chance in top],
+                })
+            entry = CachedBody.of(json_bytes({
+                "ranks": req.ranks,
+                "budgets": req.budgets,
+                "colleges": {str(c["id"]): c for c in colleges.values()},
+                "scenarios": results,
+            }))
+        if cache_key is not None:
+            response_cache.put(cache_key, entry)
+    return cached_json_response(request, entry)
+
+
+class CollegeRecord(BaseModel):
+    id: int
+    college_name: str
+    state: str
+    city: str
+    course: str
+    exam: str
+    closing_rank: int
+    average_fees: int
+    college_type: str
+    nirf_ranking: int
+    placement_rate: int
+
+
+class CatalogueChanges(BaseModel):
+    upsert: List[CollegeRecord] = []
+    delete: List[int] = []
+
+
+def require_admin(x_admin_token: str = Header("")):
+    """Dependency for /admin routes: the X-Admin-Token header must match ADMIN_TOKEN (compared in constant time)."""
+    if not ADMIN_TOKEN or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@app.post("/admin/catalogue", dependencies=[Depends(require_admin)])
+async def update_catalogue(changes: CatalogueChanges):
+    """
+    Upsert/delete colleges by id without a restart. Only the changed rows are
+    re-embedded, and in-flight requests keep the version they started with.
+    With a shared SNAPSHOT_DIR the change is published as a new snapshot and
+    every worker attaches to it within CATALOGUE_SYNC_SECONDS; otherwise it
+    applies to this process only.
+    """
+    published = await asyncio.to_thread(
+        apply_catalogue_changes,
+        [College(**r.model_dump()) for r in changes.upsert],
+        changes.delete,
+    )
+    return {
+        "version": published.version,
+        "colleges_loaded": len(published.table),
+        **reload_stats,
+    }
+
+
+class CutoffRecord(BaseModel):
+    college_id: int
+    year: int
+    round: int = Field(..., ge=1)
+    closing_rank: int = Field(..., gt=0)
+
+
+@app.post("/admin/cutoffs", dependencies=[Depends(require_admin)])
+async def update_cutoffs(records: List[CutoffRecord]):
+    """
+    Add counselling-round closing ranks and re-project the colleges they
+    touch. With CUTOFF_HISTORY_PATH they are appended to that file, which
+    other workers pick up within CUTOFF_WATCH_SECONDS; without it they are
+    kept in this worker's memory only.
+    """
+    rows = np.array([[r.college_id, r.year, r.round, r.closing_rank] for r in records], dtype=np.int64).reshape(-1, 4)
+    if CUTOFF_HISTORY_PATH:
+        await asyncio.to_thread(append_cutoff_rows, CUTOFF_HISTORY_PATH, rows)
+        await asyncio.to_thread(refresh_cutoffs, CUTOFF_HISTORY_PATH)
+    else:
+        await asyncio.to_thread(add_cutoffs, rows)
+    return {"cache_tag": catalogue.cache_tag, **cutoff_history.stats()}
+
+
+# ---------------------------------------------------------------------------
+# Chat Streaming Endpoint (ChatGPT-style SSE)
+# ---------------------------------------------------------------------------
+
+class CollegeInfo(BaseModel):
+    college_name: str
+    state: str
+    city: str
+    course: str
+    exam: str
+    closing_rank: int
+    projected_closing_rank: Optional[int] = None
+    average_fees: int
+    college_type: str
+    nirf_ranking: int
+    placement_rate: int
+    matchScore: int
+    admissionChance: str
+
+
+class ChatStreamRequest(BaseModel):
+    college: CollegeInfo
+    student_rank: Optional[int] = None
+    student_budget: Optional[int] = None
+    system_prompt: str
+    user_message: str
+
+
+CHAT_MODEL = "llama-3.3-70b-versatile"
+CHAT_MAX_TOKENS = 800
+_STREAM_END = object()
+
+
+async def relay_chat_stream(request: Request, messages: list, max_tokens: int = CHAT_MAX_TOKENS,
+                            on_complete: Optional[Callable[[str], Awaitable[None]]] = None) -> AsyncIterator[str]:
+    """
+    Relay a streaming Groq completion as SSE events in the /chat/stream format.
+
+    A reader task pulls the upstream stream into a queue; this side batches
+    deltas (CHAT_COALESCE_CHARS / CHAT_COALESCE_MS), sends a heartbeat comment
+    after CHAT_HEARTBEAT_SECONDS of silence, and checks for a client
+    disconnect while idle. However the response ends — finished, failed,
+    disconnected or cancelled — the upstream stream is closed, so Groq stops
+    generating tokens nobody will read. `on_complete` is awaited with the full reply
+    only when the stream finished cleanly.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def read_upstream():
+        try:
+            async with llm_scheduler.reserve_async(PRIORITY_CHAT, estimate_tokens(messages, max_tokens)):
+                stream = await async_client.chat.completions.create(
+                    model=CHAT_MODEL,
+                    max_tokens=max_tokens,
+                    stream=True,
+                    messages=messages,
+                )
+                try:
+                    async for chunk in stream:
+                        delta = chunk.choices[0].delta if chunk.choices else None
+                        if delta is not None and delta.content:
+                            queue.put_nowait(delta.content)
+                finally:
+                    await stream.close()
+            queue.put_nowait(_STREAM_END)
+        except Exception as e:
+            queue.put_nowait(e)
+
+    reader = asyncio.create_task(read_upstream())
+    pending: List[str] = []
+    pending_chars = 0
+    first_pending = 0.0
+    reply: List[str] = []
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            if pending:
+                timeout = max(0.0, first_pending + CHAT_COALESCE_MS / 1000 - loop.time())
+            else:
+                timeout = CHAT_HEARTBEAT_SECONDS
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                if pending:
+                    yield sse_event({"choices": [{"delta": {"content": "".join(pending)}}]})
+                    pending, pending_chars = [], 0
+                else:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keep-alive\n\n"
+                continue
+
+            if item is _STREAM_END or isinstance(item, Exception):
+                if pending:
+                    yield sse_event({"choices": [{"delta": {"content": "".join(pending)}}]})
+                if isinstance(item, Exception):
+                    yield sse_event({"choices": [{"delta": {"content": f"\n\n[Error: {str(item)}]"}}]})
+                elif on_complete is not None:
+                    await on_complete("".join(reply))
+                yield "data: [DONE]\n\n"
+                return
+
+            if not pending:
+                first_pending = loop.time()
+            pending.append(item)
+            reply.append(item)
+            pending_chars += len(item)
+            if pending_chars >= CHAT_COALESCE_CHARS:
+                yield sse_event({"choices": [{"delta": {"content": "".join(pending)}}]})
+                pending, pending_chars = [], 0
+    finally:
+        reader.cancel()
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatStreamRequest, request: Request):
+    """
+    Streams a Groq LLM response as Server-Sent Events (SSE).
+    The frontend reads chunks token-by-token and appends them — ChatGPT style.
+    Runs on the event loop (no worker thread per chat); a client disconnect
+    cancels the upstream completion.
+    """
+    messages = [
+        {"role": "system", "content": req.system_prompt},
+        {"role": "user", "content": req.user_message},
+    ]
+    return StreamingResponse(relay_chat_stream(request, messages), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+# ---------------------------------------------------------------------------
+# Chat Sessions (server-side history with a token budget)
+# ---------------------------------------------------------------------------
+
+def approx_tokens(text: str) -> int:
+    """Rough prompt-token count (~4 characters per token plus message overhead)."""
+    return len(text) // 4 + 4
+
+
+@dataclass
+class ChatSession:
+    id: str
+    college: dict
+    student_rank: Optional[int]
+    student_budget: Optional[int]
+    summary: List[str] = field(default_factory=list)  # one line per compacted turn
+    turns: List[dict] = field(default_factory=list)   # {"role", "content"}, oldest first
+    created_at: float = 0.0
+    updated_at: float = 0.0
+
+
+class ChatSessionStore:
+    """
+    Chat sessions in an in-memory LRU, optionally written through to SQLite so
+    sessions survive restarts and memory eviction. Sessions idle for longer
+    than `ttl` seconds are dropped from both.
+    """
+
+    def __init__(self, path: Optional[str], max_sessions: int, ttl: float):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.created = 0
+        self.evicted = 0
+        self.expired = 0
+        self.disk_hits = 0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS chat_sessions "
+                "(id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS chat_sessions_updated ON chat_sessions (updated_at)")
+
+    def _remember(self, session: ChatSession):
+        self._memory[session.id] = session
+        self._memory.move_to_end(session.id)
+        while len(self._memory) > self.max_sessions:
+            self._memory.popitem(last=False)
+            self.evicted += 1
+
+    def create(self, college: dict, student_rank: Optional[int], student_budget: Optional[int]) -> ChatSession:
+        now = time.time()
+        session = ChatSession(os.urandom(12).hex(), college, student_rank, student_budget,
+                              created_at=now, updated_at=now)
+        with self._lock:
+            self.created += 1
+            if self._db is not None:
+                cur = self._db.execute("DELETE FROM chat_sessions WHERE updated_at < ?", (now - self.ttl,))
+                self.expired += cur.rowcount
+        self.save(session)
+        return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        now = time.time()
+        with self._lock:
+            session = self._memory.get(session_id)
+            if session is None and self._db is not None:
+                row = self._db.execute("SELECT data FROM chat_sessions WHERE id = ?", (session_id,)).fetchone()
+                if row is not None:
+                    session = ChatSession(**json.loads(row[0]))
+                    self.disk_hits += 1
+            if session is None:
+                return None
+            if now - session.updated_at >= self.ttl:
+                self._memory.pop(session_id, None)
+                if self._db is not None:
+                    self._db.execute("DELETE FROM chat_sessions WHERE id = ?", (session_id,))
+                self.expired += 1
+                return None
+            self._remember(session)
+            return session
+
+    def save(self, session: ChatSession):
+        session.updated_at = time.time()
+        with self._lock:
+            self._remember(session)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO chat_sessions (id, data, updated_at) VALUES (?, ?, ?)",
+                    (session.id, json.dumps(session.__dict__), session.updated_at),
+                )
+
+    def update(self, session: ChatSession) -> bool:
+        """
+        save() for a session that must still exist: returns False without
+        writing anything if it was deleted or expired in the meantime.
+        """
+        now = time.time()
+        with self._lock:
+            stored = self._memory.get(session.id)
+            if stored is not None:
+                last = stored.updated_at
+            elif self._db is not None:
+                row = self._db.execute("SELECT updated_at FROM chat_sessions WHERE id = ?", (session.id,)).fetchone()
+                last = row[0] if row is not None else None
+            else:
+                last = None
+            if last is None or now - last >= self.ttl:
+                return False
+            session.updated_at = now
+            self._remember(session)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO chat_sessions (id, data, updated_at) VALUES (?, ?, ?)",
+                    (session.id, json.dumps(session.__dict__), session.updated_at),
+                )
+            return True
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            found = self._memory.pop(session_id, None) is not None
+            if self._db is not None:
+                found = self._db.execute("DELETE FROM chat_sessions WHERE id = ?", (session_id,)).rowcount > 0 or found
+            return found
+
+    def stats(self) -> dict:
+        prompts = college_system_prompt.cache_info()
+        return {
+            "sessions_in_memory": len(self._memory),
+            "created": self.created,
+            "evicted": self.evicted,
+            "expired": self.expired,
+            "disk_hits": self.disk_hits,
+            "system_prompts_cached": prompts.currsize,
+            "system_prompt_hits": prompts.hits,
+        }
+
+
+chat_sessions = ChatSessionStore(CHAT_SESSION_PATH, CHAT_SESSION_MAX, CHAT_SESSION_TTL_SECONDS)
+
+# One lock per session with a turn in flight; an entry disappears with its last holder.
+_session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+_COLLEGE_PROMPT_FIELDS = ("college_name", "city", "state", "college_type", "course", "exam",
+                          "closing_rank", "projected_closing_rank", "average_fees", "nirf_ranking", "placement_rate")
+
+
+@functools.lru_cache(maxsize=1024)
+def college_system_prompt(facts: tuple) -> str:
+    """
+    System prompt for one college, built once and reused by every session on
+    that college. `facts` is the _COLLEGE_PROMPT_FIELDS values in order; the
+    prefix stays byte-identical across sessions, so upstream prompt caching
+    can reuse it too.
+    """
+    c = dict(zip(_COLLEGE_PROMPT_FIELDS, facts))
+    return (
+        f"You are an expert Indian college admission counselor specializing in {c['college_name']}. "
+        "Answer questions specifically about this college. Be informative, accurate, and conversational, "
+        "using natural paragraphs with occasional bullet points for lists.\n\n"
+        f"College: {c['college_name']} ({c['college_type']}), {c['city']}, {c['state']}\n"
+        f"Course: {c['course']} via {c['exam']}, closing rank {closing_rank_text(c)}\n"
+        f"Average fees: ₹{c['average_fees']:,}/year | NIRF rank #{c['nirf_ranking']} | "
+        f"Placement rate: {c['placement_rate']}%"
+    )
+
+
+def _summary_line(turn: dict, max_chars: int = 160) -> str:
+    """First sentence of a turn, clipped — the extractive summary kept for compacted turns."""
+    text = " ".join(turn["content"].split())
+    end = text.find(". ")
+    if 0 < end < max_chars:
+        text = text[:end + 1]
+    elif len(text) > max_chars:
+        text = text[:max_chars - 1].rstrip() + "…"
+    return f"{'Student' if turn['role'] == 'user' else 'You'}: {text}"
+
+
+def build_session_messages(session: ChatSession, user_message: str,
+                           budget: int = CHAT_CONTEXT_TOKENS) -> "tuple[list, List[str], List[dict]]":
+    """
+    Assemble the upstream prompt for the next turn within `budget` prompt tokens.
+
+    The cached college prompt, the student line, the summary and the new
+    message always go in; the newest turns that still fit are sent verbatim.
+    Older turns are folded into the summary, which keeps its newest lines
+    within a quarter of the budget. The session itself is not modified: the
+    compacted (summary, turns) are returned alongside the messages for the
+    caller to store once the turn succeeds, so each turn is compacted once.
+    """
+    c = session.college
+    system = college_system_prompt(tuple(c.get(f) for f in _COLLEGE_PROMPT_FIELDS))
+    rank = f"{session.student_rank:,}" if session.student_rank is not None else "unknown"
+    budget_text = f"₹{session.student_budget:,}/year" if session.student_budget is not None else "unknown"
+    student = (
+        f"The student has rank {rank} and a budget of {budget_text}; their admission chance here is "
+        f"{c['admissionChance']} (match score {c['matchScore']}/100)."
+    )
+
+    summary_budget = budget // 4
+    remaining = budget - approx_tokens(system) - approx_tokens(student) - approx_tokens(user_message)
+    summary, turns = list(session.summary), list(session.turns)
+    costs = [approx_tokens(t["content"]) for t in turns]
+    if summary or sum(costs) > remaining:
+        remaining -= summary_budget
+        keep = len(costs)
+        while keep and costs[keep - 1] <= remaining:
+            keep -= 1
+            remaining -= costs[keep]
+        summary.extend(_summary_line(t) for t in turns[:keep])
+        turns = turns[keep:]
+        while summary and approx_tokens("\n".join(summary)) > summary_budget:
+            summary.pop(0)
+
+    messages = [{"role": "system", "content": system}, {"role": "system", "content": student}]
+    if summary:
+        messages.append({"role": "system",
+                         "content": "Earlier in this conversation:\n" + "\n".join(summary)})
+    messages.extend({"role": t["role"], "content": t["content"]} for t in turns)
+    messages.append({"role": "user", "content": user_message})
+    return messages, summary, turns
+
+
+class ChatSessionCreate(BaseModel):
+    college: CollegeInfo
+    student_rank: Optional[int] = None
+    student_budget: Optional[int] = None
+
+
+class ChatSessionMessage(BaseModel):
+    content: str = Field(..., min_length=1)
+
+
+def _get_session(session_id: str) -> ChatSession:
+    session = chat_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Chat session not found or expired")
+    return session
+
+
+@app.post("/chat/sessions")
+def create_chat_session(req: ChatSessionCreate):
+    """Store the college context once; follow-up messages only send their text."""
+    session = chat_sessions.create(req.college.model_dump(), req.student_rank, req.student_budget)
+    return {"session_id": session.id, "expires_in": int(chat_sessions.ttl)}
+
+
+@app.get("/chat/sessions/{session_id}")
+def get_chat_session(session_id: str):
+    session = _get_session(session_id)
+    return {"session_id": session.id, "college": session.college, "summary": session.summary, "turns": session.turns}
+
+
+@app.delete("/chat/sessions/{session_id}")
+def delete_chat_session(session_id: str):
+    if not chat_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Chat session not found or expired")
+    return {"deleted": session_id}
+
+
+@app.post("/chat/sessions/{session_id}/messages")
+async def post_chat_message(session_id: str, req: ChatSessionMessage, request: Request):
+    """
+    Streams the reply to one message in the /chat/stream SSE format. The
+    exchange is appended to the session only when the reply completes, so an
+    aborted or failed turn leaves the history unchanged.
+    """
+    # Session reads and writes may hit SQLite, so they run off the event loop
+    await asyncio.to_thread(_get_session, session_id)
+    lock = _session_locks.setdefault(session_id, asyncio.Lock())
+
+    async def relay():
+        # Held for the whole turn (taken inside the stream, so a response that
+        # never starts never holds it): a second message waits for this reply
+        # and is built on the history it recorded.
+        async with lock:
+            current = await asyncio.to_thread(chat_sessions.get, session_id)
+            if current is None:
+                # Deleted or expired while waiting for the previous turn
+                yield sse_event({"choices": [{"delta": {"content": "[Error: Chat session not found or expired]"}}]})
+                yield "data: [DONE]\n\n"
+                return
+            messages, summary, turns = build_session_messages(current, req.content)
+
+            async def record(reply: str):
+                # update(), not save(): a session deleted or expired during the turn stays gone
+                await asyncio.to_thread(chat_sessions.update, replace(
+                    current, summary=summary,
+                    turns=turns + [{"role": "user", "content": req.content}, {"role": "assistant", "content": reply}],
+                ))
+
+            async for event in relay_chat_stream(request, messages, on_complete=record):
+                yield event
+
+    return StreamingResponse(relay(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,35 @@
+"""
+Synthetic college catalogue generator for benchmarks.
+==========================================
+Samples from the real COLLEGES_RAW: each synthetic row takes a real college as
+a template (so exam/course/state/type keep their joint distribution) and
+perturbs closing rank, fees, NIRF and placement with multiplicative noise.
+Names and cities get unique suffixes so the vocabulary grows with the corpus,
+as it would with a real all-India catalogue.
+"""
+
+import random
+from typing import List
+
+from main import College, COLLEGES_RAW
+
+
+def generate_colleges(n: int, seed: int = 0) -> List[College]:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        t = rng.choice(COLLEGES_RAW)
+        out.append(College(
+            id=100000 + i,
+            college_name=f"{t.college_name} Campus {i}",
+            state=t.state,
+            city=f"{t.city} Sector {rng.randint(1, max(10, n // 50))}",
+            course=t.course,
+            exam=t.exam,
+            closing_rank=max(1, int(t.closing_rank * rng.lognormvariate(0, 0.5))),
+            average_fees=max(5000, int(t.average_fees * rng.lognormvariate(0, 0.3)) // 1000 * 1000),
+            college_type=t.college_type,
+            nirf_ranking=max(1, min(300, int(t.nirf_ranking * rng.lognormvariate(0, 0.4)))),
+            placement_rate=max(20, min(100, t.placement_rate + rng.randint(-10, 10))),
+        ))
+    return out
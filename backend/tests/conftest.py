@@ -0,0 +1,27 @@
+import os
+import sys
+
+# Offline: no Groq key, nothing written to disk, metrics on.
+os.environ.setdefault("GROQ_API_KEY", "offline-tests")
+os.environ["EXPLANATION_CACHE_PATH"] = ""
+os.environ["CHAT_SESSION_PATH"] = ""
+os.environ["COLLEGES_PATH"] = ""
+os.environ["CUTOFF_HISTORY_PATH"] = ""
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """App on the built-in catalogue with fresh caches, cut-off history and an admin token."""
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "test-admin")
+    monkeypatch.setattr(main, "cutoff_history", main.CutoffHistory())
+    monkeypatch.setattr(main, "response_cache", main.ResponseCache(main.RESPONSE_CACHE_MAX_BYTES))
+    monkeypatch.setattr(main, "catalogue", main.Catalogue(main.CollegeTable(main.COLLEGES_RAW), main.new_vector_store()))
+    with TestClient(main.app) as c:
+        yield c
@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+import main
+
+STUDENTS = [
+    {"exam": "JEE", "course": "BTech", "rank": rank, "budgetMax": budget}
+    for rank in (500, 5000, 20000) for budget in (150000, 400000)
+]
+
+
+def post_batch(client, content, content_type, **params):
+    r = client.post("/recommendations/batch", content=content, headers={"content-type": content_type},
+                    params=params)
+    assert r.status_code == 200
+    return [json.loads(line) for line in r.content.splitlines()]
+
+
+def test_ndjson_matches_json_list(client):
+    ndjson = b"".join(json.dumps(s).encode() + b"\n" for s in STUDENTS)
+    assert post_batch(client, ndjson, "application/x-ndjson") == \
+        post_batch(client, json.dumps(STUDENTS), "application/json")
+
+
+def test_ndjson_errors_are_per_line(client):
+    ndjson = b'{"exam": "JEE", "course": "BTech", "rank": 900, "budgetMax": 300000}\n\n{not json\n{"exam": "JEE"}\n'
+    lines = post_batch(client, ndjson, "application/x-ndjson")
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert "results" in lines[0]
+    assert lines[1]["error"][0]["type"] == "json_invalid" and lines[1]["error"][0]["input"] == "{not json"
+    assert {e["loc"][0] for e in lines[2]["error"]} >= {"rank", "budgetMax"}
+
+
+def test_explain_admits_students_up_to_the_concurrency(client, monkeypatch):
+    monkeypatch.setattr(main, "BATCH_LLM_CONCURRENCY", 2)
+    running, peak = 0, 0
+
+    async def fake_generate(ranked, prefs, **kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return ["explained"] * len(ranked)
+
+    monkeypatch.setattr(main, "generate_explanations", fake_generate)
+    ndjson = b"".join(json.dumps(s).encode() + b"\n" for s in STUDENTS)
+    lines = post_batch(client, ndjson, "application/x-ndjson", explain="true")
+
+    assert peak == 2
+    assert all(r["explanation"] == "explained" for line in lines for r in line["results"])
+
+
+def test_json_body_must_be_a_list(client):
+    for body in ("5", '"abc"', '{"students": 5}', '{"students": "abc"}', "{not json"):
+        r = client.post("/recommendations/batch", content=body, headers={"content-type": "application/json"})
+        assert r.status_code == 422, body
+    assert post_batch(client, '{"students": []}', "application/json") == []
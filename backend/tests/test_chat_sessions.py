@@ -0,0 +1,128 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import main
+
+COLLEGE = {
+    "college_name": "Test Institute of Technology", "state": "Maharashtra", "city": "Pune",
+    "course": "BTech", "exam": "JEE", "closing_rank": 1000, "average_fees": 200000,
+    "college_type": "Government", "nirf_ranking": 10, "placement_rate": 90,
+    "matchScore": 80, "admissionChance": "Target",
+}
+
+
+class FakeStream:
+    def __init__(self, words, delay):
+        self.words, self.delay = words, delay
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        for word in self.words:
+            await asyncio.sleep(self.delay)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word))])
+
+    async def close(self):
+        pass
+
+
+class FakeUpstream:
+    """Stands in for AsyncGroq: replies echo the last user message, or fail."""
+
+    def __init__(self, fail=False, delay=0.0):
+        self.fail, self.delay = fail, delay
+        self.prompts = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages, **kwargs):
+        self.prompts.append(messages)
+        if self.fail:
+            raise RuntimeError("upstream unavailable")
+        return FakeStream(["re: ", messages[-1]["content"]], self.delay)
+
+
+@pytest.fixture
+def sessions(client, monkeypatch):
+    store = main.ChatSessionStore(None, 100, 3600)
+    monkeypatch.setattr(main, "chat_sessions", store)
+    return store
+
+
+def post(session_id, content):
+    async def go():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            r = await http.post(f"/chat/sessions/{session_id}/messages", json={"content": content})
+            return r.text
+    return go()
+
+
+def test_failed_turn_keeps_uncompacted_history(sessions, monkeypatch):
+    session = sessions.create(COLLEGE, 900, 300000)
+    # Enough history that the next prompt has to compact the oldest turns
+    session.turns = [{"role": role, "content": f"turn {i}. " + "x" * 2000}
+                     for i, role in enumerate(["user", "assistant"] * 4)]
+    before = (list(session.summary), [dict(t) for t in session.turns])
+
+    upstream = FakeUpstream(fail=True)
+    monkeypatch.setattr(main, "async_client", upstream)
+    text = asyncio.run(post(session.id, "What about hostels?"))
+
+    assert "[Error: upstream unavailable]" in text
+    assert any(m["content"].startswith("Earlier in this conversation") for m in upstream.prompts[0])
+    assert (session.summary, session.turns) == before
+
+
+def test_successful_turn_commits_compaction(sessions, monkeypatch):
+    session = sessions.create(COLLEGE, 900, 300000)
+    session.turns = [{"role": role, "content": f"turn {i}. " + "x" * 2000}
+                     for i, role in enumerate(["user", "assistant"] * 4)]
+
+    monkeypatch.setattr(main, "async_client", FakeUpstream())
+    asyncio.run(post(session.id, "What about hostels?"))
+    session = sessions.get(session.id)
+
+    assert session.summary and session.summary[0].startswith("Student: turn 0.")
+    assert len(session.turns) < 10
+    assert session.turns[-2:] == [{"role": "user", "content": "What about hostels?"},
+                                  {"role": "assistant", "content": "re: What about hostels?"}]
+
+
+def test_concurrent_messages_do_not_interleave(sessions, monkeypatch):
+    session = sessions.create(COLLEGE, 900, 300000)
+    upstream = FakeUpstream(delay=0.05)
+    monkeypatch.setattr(main, "async_client", upstream)
+
+    async def both():
+        return await asyncio.gather(post(session.id, "first"), post(session.id, "second"))
+
+    asyncio.run(both())
+
+    session = sessions.get(session.id)
+    contents = [t["content"] for t in session.turns]
+    assert len(contents) == 4
+    first, second = contents[0], contents[2]
+    assert contents == [first, f"re: {first}", second, f"re: {second}"]
+    # The second prompt was built on the history the first turn recorded
+    assert [m["content"] for m in upstream.prompts[1][-3:]] == [first, f"re: {first}", second]
+    assert json.loads(json.dumps(session.turns)) == session.turns
+
+
+def test_reply_does_not_resurrect_a_deleted_session(sessions, monkeypatch):
+    session = sessions.create(COLLEGE, 900, 300000)
+    monkeypatch.setattr(main, "async_client", FakeUpstream(delay=0.05))
+
+    async def delete_mid_turn():
+        turn = asyncio.ensure_future(post(session.id, "first"))
+        await asyncio.sleep(0.03)
+        assert sessions.delete(session.id)
+        return await turn
+
+    text = asyncio.run(delete_mid_turn())
+    assert "[DONE]" in text and "first" in text
+    assert sessions.get(session.id) is None
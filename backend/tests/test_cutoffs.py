@@ -0,0 +1,53 @@
+import main
+
+STUDENT = {"exam": "JEE", "course": "BTech", "rank": 700, "budgetMax": 300000, "state": "Maharashtra", "useAI": False}
+
+
+def upload(client, rows):
+    r = client.post("/admin/cutoffs", json=rows, headers={"X-Admin-Token": "test-admin"})
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_label_and_explanation_use_the_projected_cutoff(client):
+    # IIT Bombay is listed at 1200; its cut-offs have been falling
+    upload(client, [{"college_id": 1, "year": y, "round": 1, "closing_rank": rank}
+                    for y, rank in ((2021, 1100), (2022, 1000), (2023, 900), (2024, 800))])
+
+    results = client.post("/recommendations", json=STUDENT).json()["results"]
+    bombay = next(r for r in results if r["id"] == 1)
+    assert bombay["closing_rank"] == 1200
+    assert bombay["projected_closing_rank"] == 800
+    # Safe against the listed 1200, Target against the projected 800
+    assert bombay["admissionChance"] == main.classify_chance(STUDENT["rank"], 800) == "Target"
+    assert "close to the closing rank of 800" in bombay["explanation"]
+
+    for r in results:
+        closing = r["projected_closing_rank"] or r["closing_rank"]
+        assert r["admissionChance"] == main.classify_chance(STUDENT["rank"], closing)
+        assert f"closing rank of {closing:,}" in r["explanation"]
+
+
+def test_unprojected_colleges_keep_the_listed_cutoff(client):
+    results = client.post("/recommendations", json=STUDENT).json()["results"]
+    assert results and all(r["projected_closing_rank"] is None for r in results)
+
+
+def test_cutoff_upload_invalidates_cached_responses(client):
+    before = client.post("/recommendations", json=STUDENT)
+    upload(client, [{"college_id": 1, "year": 2024, "round": 1, "closing_rank": 800}])
+    after = client.post("/recommendations", json=STUDENT, headers={"If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200
+    assert after.headers["etag"] != before.headers["etag"]
+
+
+def test_admin_routes_require_the_token(client, monkeypatch):
+    rows = [{"college_id": 1, "year": 2024, "round": 1, "closing_rank": 900}]
+    for headers in ({}, {"X-Admin-Token": "wrong"}, {"X-Admin-Token": "test-admin-"}):
+        assert client.post("/admin/cutoffs", json=rows, headers=headers).status_code == 403
+        assert client.post("/admin/catalogue", json={"delete": [1]}, headers=headers).status_code == 403
+    assert client.post("/admin/catalogue", json={"delete": [1]},
+                       headers={"X-Admin-Token": "test-admin"}).status_code == 200
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "")
+    assert client.post("/admin/cutoffs", json=rows, headers={"X-Admin-Token": ""}).status_code == 403
@@ -0,0 +1,39 @@
+import asyncio
+
+import main
+
+
+def test_disk_level_round_trip(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    main.ExplanationCache(path, 10, 3600).put("k", "cached reply")
+
+    fresh = main.ExplanationCache(path, 10, 3600)
+    assert asyncio.run(fresh.get_async("k")) == "cached reply"
+    assert fresh.get("k") == "cached reply"
+    assert fresh.stats()["disk_hits"] == 1 and fresh.stats()["memory_hits"] == 1
+
+
+def test_sqlite_errors_are_misses_and_skipped_writes(tmp_path):
+    cache = main.ExplanationCache(str(tmp_path / "cache.sqlite3"), 10, 3600)
+    cache._db.close()
+
+    assert cache.get("missing") is None
+    assert asyncio.run(cache.get_async("missing")) is None
+    asyncio.run(cache.put_async("k", "kept in memory"))
+    assert cache.get("k") == "kept in memory"
+    assert cache.stats()["errors"] == 3
+
+
+def test_llm_reply_survives_a_failing_cache(tmp_path, monkeypatch):
+    cache = main.ExplanationCache(str(tmp_path / "cache.sqlite3"), 10, 3600)
+    cache._db.close()
+    monkeypatch.setattr(main, "explanation_cache", cache)
+
+    async def fake_flight(key, call):
+        return "from the model"
+
+    monkeypatch.setattr(main.llm_flight, "do_async", fake_flight)
+    college = main.CollegeTable(main.COLLEGES_RAW).ranked_college(0)
+    prefs = main.StudentPreferences(exam=college.exam, course=college.course, rank=1000, budgetMax=500000)
+
+    assert asyncio.run(main.generate_llm_explanation_async(college, prefs, "Target", 70)) == "from the model"
@@ -0,0 +1,97 @@
+import asyncio
+
+import main
+
+PREFS = main.StudentPreferences(exam="JEE", course="BTech", rank=5000, budgetMax=300000)
+
+
+def shortlist():
+    table = main.CollegeTable(main.COLLEGES_RAW)
+    store = main.new_vector_store()
+    store.build(table.colleges)
+    return table.recommend(PREFS)[1][:3], store
+
+
+def explain_batched(monkeypatch, reply=None, error=None):
+    """Batched explanations for a 3-college shortlist; returns (ranked, texts, fallback counts)."""
+    monkeypatch.setattr(main, "EXPLANATION_MODE", "batched")
+    monkeypatch.setattr(main, "explanation_cache", main.ExplanationCache(None, 100, 3600))
+    monkeypatch.setattr(main, "explanation_fallbacks", main.Counter("fallbacks", "test", "reason"))
+
+    async def fake_flight(key, call):
+        if error is not None:
+            raise error
+        return reply
+
+    monkeypatch.setattr(main.llm_flight, "do_async", fake_flight)
+    ranked, store = shortlist()
+    texts = asyncio.run(main.generate_explanations(ranked, PREFS, store=store))
+    return ranked, texts, main.explanation_fallbacks._values
+
+
+def test_unparsable_reply_counts_every_fallback(monkeypatch):
+    ranked, texts, counts = explain_batched(monkeypatch, reply="not json at all")
+    assert counts == {"invalid": 3}
+    assert texts == [main._fallback_explanation(c, PREFS, chance, score) for c, score, chance in ranked]
+
+
+def test_partial_reply_counts_missing_entries(monkeypatch):
+    first = shortlist()[0][0][0]
+    _, texts, counts = explain_batched(monkeypatch, reply='{"explanations": {"%d": "A good fit."}}' % first.id)
+    assert counts == {"invalid": 2}
+    assert texts[0] == "A good fit."
+
+
+def test_failed_call_is_counted_once_per_item(monkeypatch):
+    _, _, counts = explain_batched(monkeypatch, error=RuntimeError("boom"))
+    assert counts == {"error": 3}
+
+
+def test_cache_hits_do_not_wait_for_a_groq_slot(monkeypatch):
+    monkeypatch.setattr(main, "EXPLANATION_MODE", "per_college")
+    monkeypatch.setattr(main, "explanation_cache", main.ExplanationCache(None, 100, 3600))
+    monkeypatch.setattr(main, "explanation_fallbacks", main.Counter("fallbacks", "test", "reason"))
+    ranked, store = shortlist()
+    for c, score, chance in ranked[:2]:
+        main.explanation_cache.put(main.explanation_cache_key(c, PREFS, chance, score), f"cached {c.id}")
+
+    async def explain():
+        # No slots at all: only cache hits can finish before the deadline
+        return await main.generate_explanations(ranked, PREFS, deadline=0.2, store=store,
+                                                semaphore=asyncio.Semaphore(0))
+
+    texts = asyncio.run(explain())
+    c, score, chance = ranked[2]
+    assert texts == [f"cached {ranked[0][0].id}", f"cached {ranked[1][0].id}",
+                     main._fallback_explanation(c, PREFS, chance, score)]
+    assert main.explanation_fallbacks._values == {"deadline": 1}
+
+
+def test_sync_explanation_is_bounded_by_the_deadline(monkeypatch):
+    monkeypatch.setattr(main, "explanation_cache", main.ExplanationCache(None, 100, 3600))
+    monkeypatch.setattr(main, "explanation_fallbacks", main.Counter("fallbacks", "test", "reason"))
+    monkeypatch.setattr(main, "LLM_DEADLINE_SECONDS", 0.5)
+    options = []
+
+    class TimingOutGroq:
+        def with_options(self, **kwargs):
+            options.append(kwargs)
+            return self
+
+        @property
+        def chat(self):
+            return self
+
+        @property
+        def completions(self):
+            return self
+
+        def create(self, **kwargs):
+            raise main.APITimeoutError(request=main.httpx.Request("POST", "http://groq.test"))
+
+    monkeypatch.setattr(main, "client", TimingOutGroq())
+    c, score, chance = shortlist()[0][0]
+
+    assert main.generate_llm_explanation(c, PREFS, chance, score) == main._fallback_explanation(c, PREFS, chance, score)
+    assert options[0]["max_retries"] == 0 and 0 < options[0]["timeout"] <= 0.5
+    assert main.explanation_fallbacks._values == {"deadline": 1}
@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+import pytest
+
+import main
+
+
+def exhausted(requests_per_minute=6000, max_queue_depth=10):
+    """A scheduler whose request bucket is empty, refilling at requests_per_minute."""
+    scheduler = main.LLMScheduler(requests_per_minute, 0, max_queue_depth)
+    scheduler.requests.level = 0.0
+    return scheduler
+
+
+def test_higher_priority_waiters_are_served_first():
+    scheduler = exhausted()
+    served = []
+    waiters = [(p, scheduler._acquire(p, 10)) for p in
+               (main.PRIORITY_EXPLANATION, main.PRIORITY_EXPLANATION, main.PRIORITY_CHAT)]
+    for priority, fut in waiters:
+        fut.add_done_callback(lambda _, p=priority: served.append(p))
+    for _, fut in waiters:
+        fut.result(timeout=2)
+
+    assert served == [main.PRIORITY_CHAT, main.PRIORITY_EXPLANATION, main.PRIORITY_EXPLANATION]
+
+
+def test_full_queue_sheds():
+    scheduler = exhausted(requests_per_minute=1, max_queue_depth=2)
+    for _ in range(2):
+        scheduler._acquire(main.PRIORITY_EXPLANATION, 10)
+
+    with pytest.raises(main.LLMOverloaded):
+        scheduler._acquire(main.PRIORITY_EXPLANATION, 10)
+    assert scheduler.shed[main.PRIORITY_EXPLANATION] == 1
+    # Other priorities have their own queue
+    scheduler._acquire(main.PRIORITY_CHAT, 10)
+    assert scheduler.stats()["queue_depth"] == {main.PRIORITY_CHAT: 1, main.PRIORITY_EXPLANATION: 2}
+
+
+def test_timed_out_waiter_leaves_the_queue():
+    scheduler = exhausted(requests_per_minute=1)
+    with pytest.raises(main.LLMOverloaded):
+        with scheduler.reserve(main.PRIORITY_CHAT, 10, timeout=0.01):
+            pass
+    scheduler._drain()
+    assert scheduler.stats()["queue_depth"][main.PRIORITY_CHAT] == 0
+
+
+def test_waiter_cancelled_as_it_is_granted_returns_the_grant():
+    scheduler = main.LLMScheduler(1, 0, 10)  # one request, refilling once a minute
+
+    async def cancel_at_grant():
+        async def call():
+            async with scheduler.reserve_async(main.PRIORITY_CHAT, 10):
+                pass
+
+        task = asyncio.ensure_future(call())
+        # The grant is taken synchronously; the task is cancelled before it sees it
+        await asyncio.sleep(0)
+        assert scheduler.requests.level < 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        start = time.monotonic()
+        async with scheduler.reserve_async(main.PRIORITY_CHAT, 10):
+            return time.monotonic() - start
+
+    assert asyncio.run(asyncio.wait_for(cancel_at_grant(), 2)) < 0.5
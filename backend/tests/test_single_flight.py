@@ -0,0 +1,63 @@
+import asyncio
+
+import main
+
+
+def test_concurrent_identical_calls_run_once():
+    flight = main.SingleFlight()
+    runs = []
+
+    async def call():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "reply"
+
+    async def many():
+        return await asyncio.gather(*(flight.do_async("k", call) for _ in range(5)))
+
+    assert asyncio.run(many()) == ["reply"] * 5
+    assert len(runs) == 1
+    assert flight.stats() == {"in_flight": 0, "calls": 1, "coalesced": 4}
+
+
+def test_cancelled_follower_leaves_the_shared_call_running():
+    flight = main.SingleFlight()
+    runs = []
+
+    async def call():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return f"reply {len(runs)}"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.do_async("k", call))
+        follower = asyncio.ensure_future(flight.do_async("k", call))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        await asyncio.gather(follower, return_exceptions=True)
+        assert follower.cancelled()
+        return await leader, await flight.do_async("k", call)
+
+    assert asyncio.run(scenario()) == ("reply 1", "reply 2")
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_follower_takes_over_from_a_cancelled_leader():
+    flight = main.SingleFlight()
+    runs = []
+
+    async def call():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return f"reply {len(runs)}"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.do_async("k", call))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(flight.do_async("k", call))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        await asyncio.gather(leader, return_exceptions=True)
+        return await follower, await flight.do_async("k", call)
+
+    assert asyncio.run(scenario()) == ("reply 2", "reply 3")
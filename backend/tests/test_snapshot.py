@@ -0,0 +1,28 @@
+import numpy as np
+
+import main
+
+QUERIES = ["JEE BTech Maharashtra Government", "NEET MBBS Karnataka Private", "engineering Delhi top placement"]
+
+
+def ivf_store():
+    return main.VectorStore(index=main.IVFIndex(nlist=8, nprobe=2))
+
+
+def test_snapshot_memory_maps_the_ivf_index(tmp_path):
+    table = main.CollegeTable(main.COLLEGES_RAW)
+    store = ivf_store()
+    store.build(table.colleges)
+    path = main.write_snapshot(str(tmp_path), {"format": main.SNAPSHOT_FORMAT, "test": "ivf"}, table, store)
+
+    loaded = ivf_store()
+    main.load_snapshot(path, loaded)
+
+    for name in ("centroids", "list_offsets", "list_rows"):
+        arr = getattr(loaded.index, name)
+        assert isinstance(arr, np.memmap) and not arr.flags.writeable
+        np.testing.assert_array_equal(arr, getattr(store.index, name))
+    indices, scores = loaded.query_many(QUERIES, k=5)
+    expected_indices, expected_scores = store.query_many(QUERIES, k=5)
+    np.testing.assert_array_equal(indices, expected_indices)
+    np.testing.assert_allclose(scores, expected_scores)
@@ -0,0 +1,87 @@
+"""CollegeTable against the original per-college filter_colleges / score_college / classify_chance."""
+import random
+
+import pytest
+
+import main
+from synthetic import generate_colleges
+
+CATALOGUES = {"bundled": main.COLLEGES_RAW, "synthetic": generate_colleges(3000, seed=7)}
+
+
+def random_prefs(rng: random.Random, colleges, n: int) -> list:
+    """Profiles built around random colleges, plus some that match nothing."""
+    prefs = []
+    for _ in range(n):
+        c = rng.choice(colleges)
+        prefs.append(main.StudentPreferences(
+            exam=c.exam if rng.random() < 0.9 else "GATE",
+            course=c.course,
+            rank=rng.randint(1, 2 * c.closing_rank),
+            budgetMax=rng.randint(c.average_fees // 2, 2 * c.average_fees),
+            state=rng.choice(["Any", "Any", c.state, "Tamil Nadu"]),
+            collegeType=rng.choice(["Any", "Any", c.college_type]),
+            useAI=False,
+        ))
+    return prefs
+
+
+def legacy_recommend(colleges, prefs, k=10):
+    """The original endpoint: filter_colleges, score_college, classify_chance, stable sort by score."""
+    filtered = main.filter_colleges(colleges, prefs)
+    scored = [(c, main.score_college(c, prefs), main.classify_chance(prefs.rank, c.closing_rank)) for c in filtered]
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return len(filtered), [(c.id, score, chance) for c, score, chance in scored[:k]]
+
+
+def as_ids(result):
+    total, top = result
+    return total, [(c.id, score, chance) for c, score, chance in top]
+
+
+@pytest.mark.parametrize("name", CATALOGUES)
+def test_table_matches_legacy_filter_and_score(name):
+    colleges = CATALOGUES[name]
+    table = main.CollegeTable(colleges)
+    prefs_list = random_prefs(random.Random(name), colleges, 300)
+
+    expected = [legacy_recommend(colleges, p) for p in prefs_list]
+    assert [as_ids(table.recommend(p)) for p in prefs_list] == expected
+    assert [as_ids(r) for r in table.recommend_many(prefs_list)] == expected
+    assert sum(total > 0 for total, _ in expected) > 150
+
+
+def test_meta_drops_a_state_whose_last_college_is_deleted():
+    table = main.CollegeTable(main.COLLEGES_RAW)
+    assert "Maharashtra" in main.build_meta(table)["states"]
+    gone = [c.id for c in main.COLLEGES_RAW if c.state == "Maharashtra"]
+
+    changed, _ = table.with_changes([], gone)
+    meta = main.build_meta(changed)
+    assert "Maharashtra" not in meta["states"]
+    assert meta["states"] == sorted({c.state for c in main.COLLEGES_RAW if c.state != "Maharashtra"})
+    assert meta["exams"] == sorted({c.exam for c in main.COLLEGES_RAW if c.state != "Maharashtra"})
+
+
+@pytest.mark.parametrize("name", CATALOGUES)
+@pytest.mark.parametrize("max_cells", [1 << 22, 1000])
+def test_sweep_matches_recommend_for_every_cell(name, max_cells):
+    colleges = CATALOGUES[name]
+    table = main.CollegeTable(colleges)
+    rng = random.Random(f"sweep {name}")
+    matched = 0
+    for prefs in random_prefs(rng, colleges, 40):
+        ranks = sorted(rng.randint(1, 2 * prefs.rank) for _ in range(6))
+        budgets = sorted(rng.randint(prefs.budgetMax // 3, 3 * prefs.budgetMax) for _ in range(5))
+        cells = table.sweep(prefs, ranks, budgets, k=10, max_cells=max_cells)
+        assert len(cells) == len(ranks) * len(budgets)
+
+        for (total, counts, top), (rank, budget) in zip(cells, [(r, b) for r in ranks for b in budgets]):
+            cell = prefs.model_copy(update={"rank": rank, "budgetMax": budget})
+            expected_total, expected_top = as_ids(table.recommend(cell))
+            assert total == expected_total
+            assert [(table.ranked_college(row).id, score, chance) for row, score, chance in top] == expected_top
+            chances = [main.classify_chance(rank, c.closing_rank) for c in main.filter_colleges(colleges, cell)]
+            assert counts == [chances.count(label) for label in ("Safe", "Target", "Dream")]
+            matched += total > 0
+    assert matched > 200
@@ -0,0 +1,74 @@
+"""The sparse vector store and its IVF index against the original dense TF-IDF retrieval."""
+import random
+
+import numpy as np
+import pytest
+
+import main
+from synthetic import generate_colleges
+
+CATALOGUES = {"bundled": main.COLLEGES_RAW, "synthetic": generate_colleges(3000, seed=7)}
+
+
+def legacy_dense_embeddings(colleges):
+    """The original dense TF-IDF: sorted vocabulary, smoothed IDF, L2-normalized term frequencies."""
+    texts = [main.build_college_text(c) for c in colleges]
+    vocab = {w: i for i, w in enumerate(sorted({w for t in texts for w in t.lower().split()}))}
+    df = np.zeros(len(vocab))
+    for t in texts:
+        for w in set(t.lower().split()):
+            df[vocab[w]] += 1
+    idf = np.log((len(texts) + 1) / (df + 1)) + 1
+
+    def embed(text):
+        words = text.lower().split()
+        vec = np.zeros(len(vocab))
+        for w in set(words):
+            if w in vocab:
+                vec[vocab[w]] = words.count(w) / len(words) * idf[vocab[w]]
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    return np.array([embed(t) for t in texts]), embed
+
+
+def retrieval_queries(colleges):
+    """RAG queries for random (student, college) pairs, as retrieve_similar builds them."""
+    rng = random.Random(1)
+    queries = []
+    for c in rng.sample(list(colleges), 40):
+        prefs = main.StudentPreferences(exam=c.exam, course=c.course, rank=rng.randint(1, 50000),
+                                        budgetMax=rng.randint(50000, 900000), state=rng.choice(["Any", c.state]))
+        queries.append(main.rag_query_text(c, prefs))
+    return queries
+
+
+@pytest.mark.parametrize("name", CATALOGUES)
+def test_sparse_store_matches_dense_tfidf(name):
+    colleges = CATALOGUES[name]
+    store = main.VectorStore()
+    store.build(colleges)
+    dense, embed = legacy_dense_embeddings(colleges)
+    queries = retrieval_queries(colleges)
+
+    indices, scores = store.query_many(queries, k=5)
+    for query, rows, got in zip(queries, indices, scores):
+        sims = dense @ embed(query)
+        # Same scores for the chosen rows, and they are a top 5 (ties may pick either row)
+        np.testing.assert_allclose(got, sims[rows], atol=1e-6)
+        np.testing.assert_allclose(got, np.sort(sims)[::-1][:5], atol=1e-6)
+
+
+@pytest.mark.parametrize("name", CATALOGUES)
+def test_ivf_probing_every_list_is_exact(name):
+    colleges = CATALOGUES[name]
+    exact = main.VectorStore()
+    exact.build(colleges)
+    ivf = main.VectorStore(index=main.IVFIndex(nlist=16, nprobe=16))
+    ivf.build(colleges)
+    queries = retrieval_queries(colleges)
+
+    exact_indices, exact_scores = exact.query_many(queries, k=5)
+    ivf_indices, ivf_scores = ivf.query_many(queries, k=5)
+    np.testing.assert_array_equal(ivf_indices, exact_indices)
+    np.testing.assert_allclose(ivf_scores, exact_scores, atol=1e-6)
@@ -52,7 +52,11 @@ export default function CollegeCard({ college, index, onChat, onAnalyze }: Colle
 
       {/* Stats grid */}
       <div className="mt-4 grid grid-cols-2 gap-3 sm:grid-cols-4">
-        <Stat icon={<Hash      className="h-3.5 w-3.5" />} label="Closing Rank" value={college.closing_rank.toLocaleString()} />
+        <Stat
+          icon={<Hash className="h-3.5 w-3.5" />}
+          label={college.projected_closing_rank != null ? "Projected Cutoff" : "Closing Rank"}
+          value={(college.projected_closing_rank ?? college.closing_rank).toLocaleString()}
+        />
         <Stat icon={<IndianRupee className="h-3.5 w-3.5" />} label="Annual Fees" value={`₹${college.average_fees.toLocaleString()}`} />
         <Stat icon={<Award     className="h-3.5 w-3.5" />} label="NIRF Rank"    value={`#${college.nirf_ranking}`}              />
         <Stat icon={<TrendingUp className="h-3.5 w-3.5" />} label="Placement"   value={`${college.placement_rate}%`}            />
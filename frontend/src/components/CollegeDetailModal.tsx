@@ -42,6 +42,7 @@ export default function CollegeDetailModal({
   const bottomRef = useRef<HTMLDivElement>(null);
   const inputRef = useRef<HTMLInputElement>(null);
   const abortRef = useRef<AbortController | null>(null);
+  const sessionRef = useRef<string | null>(null);
 
   // Auto-scroll to bottom
   useEffect(() => {
@@ -55,42 +56,92 @@ export default function CollegeDetailModal({
     }
   }, [college]);
 
-  // Generate initial AI overview when modal opens
+  // Each college gets its own session: switching colleges or closing the modal
+  // ends the previous one, then the initial AI overview is generated afresh
   useEffect(() => {
-    if (college && !initialized) {
+    abortRef.current?.abort();
+    endSession();
+    setMessages([]);
+    setInput("");
+    setLoading(false);
+    setInitialized(false);
+    if (college) {
       setInitialized(true);
       generateInitialOverview();
     }
   }, [college]);
 
   // Cleanup on unmount
-  useEffect(() => () => abortRef.current?.abort(), []);
+  useEffect(() => () => {
+    abortRef.current?.abort();
+    endSession();
+  }, []);
+
+  // The college context is sent once per session; messages carry only their text
+  const startSession = async (signal: AbortSignal): Promise<string> => {
+    const res = await fetch(`${API_BASE}/chat/sessions`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      signal,
+      body: JSON.stringify({
+        college: {
+          college_name: college!.college_name,
+          state: college!.state,
+          city: college!.city,
+          course: college!.course,
+          exam: college!.exam,
+          closing_rank: college!.closing_rank,
+          projected_closing_rank: college!.projected_closing_rank ?? null,
+          average_fees: college!.average_fees,
+          college_type: college!.college_type,
+          nirf_ranking: college!.nirf_ranking,
+          placement_rate: college!.placement_rate,
+          matchScore: college!.matchScore,
+          admissionChance: college!.admissionChance,
+        },
+        student_rank: studentRank,
+        student_budget: studentBudget,
+      }),
+    });
+    if (!res.ok) throw new Error(`API error ${res.status}`);
+    const { session_id } = await res.json();
+    sessionRef.current = session_id;
+    return session_id;
+  };
+
+  const endSession = () => {
+    if (sessionRef.current) {
+      fetch(`${API_BASE}/chat/sessions/${sessionRef.current}`, { method: "DELETE" }).catch(() => {});
+      sessionRef.current = null;
+    }
+  };
 
   const generateInitialOverview = async () => {
     if (!college) return;
     setLoading(true);
 
-    const systemPrompt = `You are an expert Indian college admission counselor with deep knowledge of all colleges, courses, placements, campus life, and admission processes. You give detailed, accurate, and personalized advice.`;
-
-    const userPrompt = `Give me a comprehensive overview of ${college.college_name} for a student with rank ${studentRank ?? "unknown"} and budget ₹${studentBudget?.toLocaleString() ?? "unknown"}/year. The student's admission chance here is "${college.admissionChance}" with a match score of ${college.matchScore}/100.
+    // College and student details live in the session's system prompt
+    const userPrompt = `Give me a comprehensive overview of ${college.college_name}.
 
 Cover these in a flowing, conversational format (like ChatGPT would respond):
-1. Quick college snapshot (type, location, NIRF rank #${college.nirf_ranking})  
-2. Why this college suits this student (rank ${studentRank} vs closing rank ${college.closing_rank})
-3. Fees (₹${college.average_fees.toLocaleString()}/yr) and scholarship opportunities
-4. Placement highlights (${college.placement_rate}% rate) and top recruiters
+1. Quick college snapshot (type, location, NIRF rank)
+2. Why this college suits me (my rank vs the closing rank)
+3. Fees and scholarship opportunities
+4. Placement highlights and top recruiters
 5. Campus life & culture
-6. Key tips for this student
+6. Key tips for me
 
 Be warm, specific, and encouraging. Use natural paragraph breaks.`;
 
-    await streamMessage(systemPrompt, userPrompt, true);
-    setLoading(false);
+    // A superseded request must not clear the loading state of its successor
+    if (await streamMessage(userPrompt, true)) setLoading(false);
   };
 
-  const streamMessage = async (systemPrompt: string, userMessage: string, isInitial = false) => {
+  // Resolves to false when the request was aborted by a newer one
+  const streamMessage = async (userMessage: string, isInitial = false): Promise<boolean> => {
     abortRef.current?.abort();
-    abortRef.current = new AbortController();
+    const controller = new AbortController();
+    abortRef.current = controller;
 
     if (!isInitial) {
       setMessages((prev) => [...prev, { role: "user", content: userMessage }]);
@@ -100,31 +151,19 @@ Be warm, specific, and encouraging. Use natural paragraph breaks.`;
     setMessages((prev) => [...prev, assistantMsg]);
 
     try {
-      const res = await fetch(`${API_BASE}/chat/stream`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        signal: abortRef.current.signal,
-        body: JSON.stringify({
-          college: {
-            college_name: college!.college_name,
-            state: college!.state,
-            city: college!.city,
-            course: college!.course,
-            exam: college!.exam,
-            closing_rank: college!.closing_rank,
-            average_fees: college!.average_fees,
-            college_type: college!.college_type,
-            nirf_ranking: college!.nirf_ranking,
-            placement_rate: college!.placement_rate,
-            matchScore: college!.matchScore,
-            admissionChance: college!.admissionChance,
-          },
-          student_rank: studentRank,
-          student_budget: studentBudget,
-          system_prompt: systemPrompt,
-          user_message: userMessage,
-        }),
-      });
+      const send = async (sessionId: string) =>
+        fetch(`${API_BASE}/chat/sessions/${sessionId}/messages`, {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          signal: controller.signal,
+          body: JSON.stringify({ content: userMessage }),
+        });
+
+      let res = await send(sessionRef.current ?? (await startSession(controller.signal)));
+      if (res.status === 404) {
+        // Session expired or was evicted server-side — start a fresh one
+        res = await send(await startSession(controller.signal));
+      }
 
       if (!res.ok || !res.body) {
         throw new Error(`API error ${res.status}`);
@@ -133,35 +172,33 @@ Be warm, specific, and encouraging. Use natural paragraph breaks.`;
       const reader = res.body.getReader();
       const decoder = new TextDecoder();
       let fullText = "";
+      let buffer = "";
 
-      while (true) {
+      reading: while (true) {
         const { done, value } = await reader.read();
         if (done) break;
 
-        const chunk = decoder.decode(value, { stream: true });
-        // Parse SSE lines
-        const lines = chunk.split("\n");
-        for (const line of lines) {
-          if (line.startsWith("data: ")) {
-            const data = line.slice(6).trim();
-            if (data === "[DONE]") break;
-            if (data) {
-              try {
-                const parsed = JSON.parse(data);
-                const token = parsed.choices?.[0]?.delta?.content ?? "";
-                fullText += token;
-                setMessages((prev) => {
-                  const updated = [...prev];
-                  updated[updated.length - 1] = {
-                    role: "assistant",
-                    content: fullText,
-                    streaming: true,
-                  };
-                  return updated;
-                });
-              } catch {}
-            }
-          }
+        buffer += decoder.decode(value, { stream: true });
+        // SSE events are separated by a blank line; keep any partial event
+        const events = buffer.split("\n\n");
+        buffer = events.pop() ?? "";
+        for (const event of events) {
+          // Heartbeats are SSE comments (": ...") and carry no data
+          if (!event.startsWith("data: ")) continue;
+          const data = event.slice(6).trim();
+          if (data === "[DONE]") break reading;
+          const parsed = JSON.parse(data);
+          const token = parsed.choices?.[0]?.delta?.content ?? "";
+          fullText += token;
+          setMessages((prev) => {
+            const updated = [...prev];
+            updated[updated.length - 1] = {
+              role: "assistant",
+              content: fullText,
+              streaming: true,
+            };
+            return updated;
+          });
         }
       }
 
@@ -172,7 +209,7 @@ Be warm, specific, and encouraging. Use natural paragraph breaks.`;
         return updated;
       });
     } catch (err: any) {
-      if (err.name === "AbortError") return;
+      if (err.name === "AbortError") return false;
       setMessages((prev) => {
         const updated = [...prev];
         updated[updated.length - 1] = {
@@ -183,6 +220,7 @@ Be warm, specific, and encouraging. Use natural paragraph breaks.`;
         return updated;
       });
     }
+    return !controller.signal.aborted;
   };
 
   const handleSend = async (text?: string) => {
@@ -191,13 +229,12 @@ Be warm, specific, and encouraging. Use natural paragraph breaks.`;
     setInput("");
     setLoading(true);
 
-    const systemPrompt = `You are an expert Indian college admission counselor specializing in ${college?.college_name}. Answer questions specifically about this college. Be informative, accurate, and conversational — like ChatGPT would respond. Use natural paragraphs with occasional bullet points for lists.`;
-
-    await streamMessage(systemPrompt, msg);
-    setLoading(false);
+    if (await streamMessage(msg)) setLoading(false);
   };
 
   const handleReset = () => {
+    abortRef.current?.abort();
+    endSession();
     setMessages([]);
     setInitialized(false);
     setLoading(false);
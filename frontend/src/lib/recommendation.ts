@@ -16,6 +16,8 @@ export interface StudentPreferences {
 export type AdmissionChance = "Safe" | "Target" | "Dream";
 
 export interface RecommendedCollege extends College {
+  /** Closing rank the label and score used, when projected from cut-off history */
+  projected_closing_rank?: number | null;
   matchScore: number;
   admissionChance: AdmissionChance;
   explanation: string;
@@ -51,4 +53,109 @@ export async function getRecommendationsFull(
   }
 
   return res.json();
-}
\ No newline at end of file
+}
+
+export interface RecommendationStreamHandlers {
+  onResults: (data: RecommendationResponse) => void;
+  /** `id` is the college id; match on it rather than on the list position */
+  onExplanation: (id: number, explanation: string) => void;
+}
+
+/**
+ * Progressive variant of getRecommendationsFull: the ranked list arrives as
+ * soon as scoring is done, then each AI explanation as it completes.
+ */
+export async function streamRecommendations(
+  prefs: StudentPreferences,
+  handlers: RecommendationStreamHandlers,
+  signal?: AbortSignal
+): Promise<void> {
+  const res = await fetch(`${API_BASE}/recommendations/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ ...prefs, useAI: prefs.useAI ?? true }),
+    signal,
+  });
+
+  if (!res.ok || !res.body) {
+    const err = await res.text();
+    throw new Error(`API error ${res.status}: ${err}`);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+
+    buffer += decoder.decode(value, { stream: true });
+    // SSE events are separated by a blank line; keep any partial event
+    const events = buffer.split("\n\n");
+    buffer = events.pop() ?? "";
+    for (const event of events) {
+      if (!event.startsWith("data: ")) continue;
+      const data = event.slice(6).trim();
+      if (data === "[DONE]") return;
+      const parsed = JSON.parse(data);
+      if (parsed.type === "results") {
+        handlers.onResults(parsed);
+      } else if (parsed.type === "explanation") {
+        handlers.onExplanation(parsed.id, parsed.explanation);
+      }
+    }
+  }
+}
+
+export interface SweepRequest {
+  exam: string;
+  course: string;
+  state?: string;
+  collegeType?: string;
+  ranks: number[];
+  budgets: number[];
+  k?: number;
+}
+
+export interface SweepScenario {
+  rank: number;
+  budgetMax: number;
+  total_filtered: number;
+  safe: number;
+  target: number;
+  dream: number;
+  /** [college id, matchScore, admissionChance], best first */
+  top: [number, number, AdmissionChance][];
+}
+
+export interface SweepResponse {
+  ranks: number[];
+  budgets: number[];
+  colleges: Record<string, College>;
+  /** Rank-major: scenarios[i * budgets.length + j] is (ranks[i], budgets[j]) */
+  scenarios: SweepScenario[];
+}
+
+/**
+ * Every (rank, budget) combination in one call — drives rank/budget sliders
+ * without a /recommendations round-trip per position.
+ */
+export async function sweepRecommendations(
+  req: SweepRequest,
+  signal?: AbortSignal
+): Promise<SweepResponse> {
+  const res = await fetch(`${API_BASE}/recommendations/sweep`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(req),
+    signal,
+  });
+
+  if (!res.ok) {
+    const err = await res.text();
+    throw new Error(`API error ${res.status}: ${err}`);
+  }
+
+  return res.json();
+}
@@ -1,12 +1,12 @@
 // Drop this into frontend/src/pages/Index.tsx
 
-import { useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import FilterForm from "@/components/FilterForm";
 import CollegeCard from "@/components/CollegeCard";
 import CollegeDetailModal from "@/components/CollegeDetailModal";
 import CollegeAnalyticsModal from "@/components/CollegeAnalyticsModal";
 import {
-  getRecommendationsFull,
+  streamRecommendations,
   RecommendedCollege,
   StudentPreferences,
   RecommendationResponse,
@@ -30,17 +30,37 @@ const Index = () => {
   // Analytics modal
   const [analyzeCollege, setAnalyzeCollege]   = useState<RecommendedCollege | null>(null);
 
+  // Only the latest submission's stream may touch the results
+  const streamRef = useRef<AbortController | null>(null);
+  useEffect(() => () => streamRef.current?.abort(), []);
+
   const handleSubmit = async (p: StudentPreferences) => {
+    streamRef.current?.abort();
+    const controller = new AbortController();
+    streamRef.current = controller;
+
     setIsLoading(true);
     setError(null);
     setLastPrefs(p);
     try {
-      const data = await getRecommendationsFull({ ...p, useAI });
-      setResponse(data);
+      // Show the ranked list as soon as it is scored; AI explanations fill in as they arrive
+      await streamRecommendations({ ...p, useAI }, {
+        onResults: (data) => {
+          setResponse(data);
+          setIsLoading(false);
+        },
+        onExplanation: (id, explanation) =>
+          setResponse((prev) => {
+            if (!prev) return prev;
+            const results = prev.results.map((c) => (c.id === id ? { ...c, explanation } : c));
+            return { ...prev, results };
+          }),
+      }, controller.signal);
     } catch (e: any) {
+      if (e.name === "AbortError") return;
       setError(e.message ?? "Failed to fetch recommendations");
     } finally {
-      setIsLoading(false);
+      if (streamRef.current === controller) setIsLoading(false);
     }
   };
 